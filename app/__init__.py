@@ -1,7 +1,10 @@
+import os
 from flask import Flask
 from app.routes.routes import main as main_blueprint
 
 def create_app():
     application = Flask(__name__)
+    # Signs the upload tokens of presigned submissions
+    application.secret_key = os.getenv('SECRET_KEY')
     application.register_blueprint(main_blueprint)
     return application
\ No newline at end of file
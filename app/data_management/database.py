@@ -1,9 +1,13 @@
 import os
+import time
 import logging
+from collections.abc import Mapping
 
-from sqlalchemy import create_engine, Column, String, JSON
+import numpy as np
+from sqlalchemy import (create_engine, event, inspect, text, or_, and_, Column, ForeignKey, Index,
+                        String, Float, Integer, JSON)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import relationship, sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 
 # Configure logging
@@ -12,9 +16,33 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 BaseRequests = declarative_base()
 BaseResults = declarative_base()
 
-instance_dir = os.path.join('.', 'instance')
+instance_dir = os.getenv('METRICA_INSTANCE_DIR', os.path.join('.', 'instance'))
 os.makedirs(instance_dir, exist_ok=True)
 
+# SQLite journal mode; WAL lets readers proceed while a writer commits
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+# Seconds a connection waits for a lock held by another process before failing
+SQLITE_BUSY_TIMEOUT_SECONDS = 30
+# Connections kept open per engine and process
+SQLITE_POOL_SIZE = 5
+
+# Prediction arrays of stored results, one compressed .npz file per request
+RESULT_ARRAYS_DIR = os.path.join(instance_dir, 'result_arrays')
+# Scalar metrics stored in their own indexed columns of model_results
+METRIC_COLUMNS = ['accuracy', 'precision', 'recall', 'f1_score', 'roc_auc', 'average_precision',
+                  'mae', 'mse', 'r2_score']
+# Metrics for which a lower value ranks higher on leaderboards
+LOWER_IS_BETTER_METRICS = ['mae', 'mse']
+# Per-model evaluation entries holding one value per test row
+ARRAY_KEYS = ['predictions', 'y_scores']
+
+# How long a worker may hold a request before other workers can reclaim it
+LEASE_DURATION_SECONDS = 3600
+# How many claimable requests a worker tries before giving up on a busy queue
+CLAIM_CANDIDATES = 10
+# How long a mail sender may hold a delivery before other senders can reclaim it
+DELIVERY_LEASE_SECONDS = 600
+
 
 class Request(BaseRequests):
     __tablename__ = 'requests'
@@ -23,14 +51,94 @@ class Request(BaseRequests):
     submission_time = Column(String, nullable=False)
     status = Column(String, default='PENDING')
     task_type = Column(String, default='classification')
+    worker_id = Column(String, nullable=True)
+    lease_expires_at = Column(Float, nullable=True)
+
+    # Workers look up pending requests oldest first
+    __table_args__ = (Index('ix_requests_status_submission_time', 'status', 'submission_time'),)
 
     def __repr__(self):
         return f"<Request(user_id='{self.user_id}', email='{self.email}', \
             submission_time='{self.submission_time}', status='{self.status}', \
-                task_type='{self.task_type}')>"
+                task_type='{self.task_type}', worker_id='{self.worker_id}')>"
+
+
+class Delivery(BaseRequests):
+    """An email with a request's results waiting to be sent by the mail sender."""
+    __tablename__ = 'deliveries'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, nullable=False)
+    email = Column(String, nullable=False)
+    task_type = Column(String, nullable=False)
+    attachment_path = Column(String, nullable=False)
+    status = Column(String, default='PENDING')
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(Float, default=0.0)
+    last_error = Column(String, nullable=True)
+    sender_id = Column(String, nullable=True)
+    lease_expires_at = Column(Float, nullable=True)
+
+    __table_args__ = (Index('ix_deliveries_status_next_attempt_at', 'status', 'next_attempt_at'),)
+
+    def __repr__(self):
+        return f"<Delivery(id={self.id}, user_id='{self.user_id}', email='{self.email}', \
+            status='{self.status}', attempts={self.attempts})>"
+
+
+def _add_missing_columns(engine, table):
+    """
+    Adds columns introduced after a table was created, since create_all only creates
+    missing tables.
+    """
+    existing_columns = {column['name'] for column in inspect(engine).get_columns(table.name)}
+    with engine.begin() as connection:
+        for column in table.columns:
+            if column.name not in existing_columns:
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                logging.info("Added column %s to table %s", column.name, table.name)
+
+
+def _add_missing_indexes(engine, table):
+    """Creates indexes introduced after a table was created."""
+    for index in table.indexes:
+        index.create(engine, checkfirst=True)
+
+
+def _configure_connection(dbapi_connection, connection_record):
+    """Applies the journal mode and busy timeout to every new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT_SECONDS * 1000)}")
+    if SQLITE_JOURNAL_MODE.upper() == 'WAL':
+        # Durable across application crashes; only a power loss can drop the last commits
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def create_sqlite_engine(path):
+    """
+    Creates an engine for a SQLite database shared by several processes.
+
+    Connections are pooled and reused across sessions, use the configured journal
+    mode and wait up to SQLITE_BUSY_TIMEOUT_SECONDS for locks instead of failing.
 
-engine_requests = create_engine(f"sqlite:///{instance_dir}/requests.db")
+    Args:
+        path (str): Path of the database file.
+
+    Returns:
+        sqlalchemy.engine.Engine: The engine.
+    """
+    engine = create_engine(f"sqlite:///{path}", pool_size=SQLITE_POOL_SIZE,
+                           connect_args={'timeout': SQLITE_BUSY_TIMEOUT_SECONDS})
+    event.listen(engine, 'connect', _configure_connection)
+    return engine
+
+
+engine_requests = create_sqlite_engine(f"{instance_dir}/requests.db")
 BaseRequests.metadata.create_all(engine_requests)
+_add_missing_columns(engine_requests, Request.__table__)
+_add_missing_indexes(engine_requests, Request.__table__)
 SessionRequests = sessionmaker(bind=engine_requests)
 
 
@@ -40,13 +148,58 @@ class Result(BaseResults):
     user_id = Column(String, primary_key=True)
     task_type = Column(String, nullable=False)
     performance_metrics = Column(JSON)
+    email = Column(String, nullable=True)
+    dataset_key = Column(String, nullable=True)
+    created_at = Column(Float, nullable=True)
+    arrays_path = Column(String, nullable=True)
+
+    model_results = relationship('ModelResult', cascade='all, delete-orphan')
+
+    __table_args__ = (Index('ix_results_email_created_at', 'email', 'created_at'),)
 
     def __repr__(self):
         return f"<Result(user_id='{self.user_id}', task_type='{self.task_type}', performance_metrics='{self.performance_metrics}')>"
 
 
-engine_results = create_engine(f"sqlite:///{instance_dir}/results.db")
+class ModelResult(BaseResults):
+    """The scalar metrics of one model evaluated for a request."""
+    __tablename__ = 'model_results'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, ForeignKey('results.user_id'), nullable=False, index=True)
+    model_name = Column(String, nullable=False)
+    task_type = Column(String, nullable=False)
+    dataset_key = Column(String, nullable=True)
+    created_at = Column(Float, nullable=True)
+    accuracy = Column(Float, nullable=True)
+    precision = Column(Float, nullable=True)
+    recall = Column(Float, nullable=True)
+    f1_score = Column(Float, nullable=True)
+    roc_auc = Column(Float, nullable=True)
+    average_precision = Column(Float, nullable=True)
+    mae = Column(Float, nullable=True)
+    mse = Column(Float, nullable=True)
+    r2_score = Column(Float, nullable=True)
+
+    # Leaderboards rank the models of one dataset by one metric, usually only the submitted ones
+    __table_args__ = tuple(Index(f'ix_model_results_model_{metric}', 'dataset_key', 'task_type',
+                                 'model_name', metric)
+                           for metric in METRIC_COLUMNS)
+
+    def __repr__(self):
+        return f"<ModelResult(user_id='{self.user_id}', model_name='{self.model_name}', \
+            dataset_key='{self.dataset_key}')>"
+
+
+engine_results = create_sqlite_engine(f"{instance_dir}/results.db")
 BaseResults.metadata.create_all(engine_results)
+_add_missing_columns(engine_results, Result.__table__)
+_add_missing_indexes(engine_results, Result.__table__)
+_add_missing_indexes(engine_results, ModelResult.__table__)
+with engine_results.begin() as connection:
+    # Superseded by the indexes that include model_name
+    for metric in METRIC_COLUMNS:
+        connection.execute(text(f"DROP INDEX IF EXISTS ix_model_results_{metric}"))
 SessionResults = sessionmaker(bind=engine_results)
 
 
@@ -84,6 +237,34 @@ def update_request_status(user_id, new_status):
         session.close()
 
 
+def update_request_statuses(user_ids, new_status):
+    """
+    Sets the status of several requests in one statement.
+
+    Args:
+        user_ids (list of str): The IDs of the requests.
+        new_status (str): The new status.
+
+    Returns:
+        int: The number of requests updated.
+    """
+    if not user_ids:
+        return 0
+    session = SessionRequests()
+    try:
+        updated = session.query(Request).filter(Request.user_id.in_(user_ids)) \
+            .update({'status': new_status}, synchronize_session=False)
+        session.commit()
+        logging.info("Updated status of %d requests to %s", updated, new_status)
+        return updated
+    except SQLAlchemyError as e:
+        logging.error("Error updating status of %d requests to %s: %s", len(user_ids), new_status, e)
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
 def get_pending_requests():
     session = SessionRequests()
     try:
@@ -95,10 +276,305 @@ def get_pending_requests():
         session.close()
 
 
-def add_result(user_id, task_type, performance_metrics):
+def _claimable(now):
+    """Filter matching requests that are pending or whose lease has expired."""
+    return or_(Request.status == 'PENDING',
+               and_(Request.status == 'RUNNING', Request.lease_expires_at < now))
+
+
+def claim_request(worker_id, lease_duration=LEASE_DURATION_SECONDS):
+    """
+    Atomically claims the oldest pending request, or one whose lease has expired.
+
+    The claim is a conditional update that only succeeds if the request is still
+    claimable, so concurrent workers never claim the same request.
+
+    Args:
+        worker_id (str): Identifier of the claiming worker.
+        lease_duration (float): Seconds until the claim expires unless renewed.
+
+    Returns:
+        Request: The claimed request, now RUNNING, or None if there is nothing to claim.
+    """
+    session = SessionRequests()
+    try:
+        now = time.time()
+        candidates = session.query(Request.user_id).filter(_claimable(now)) \
+            .order_by(Request.submission_time).limit(CLAIM_CANDIDATES).all()
+        for (user_id,) in candidates:
+            claimed = session.query(Request) \
+                .filter(Request.user_id == user_id, _claimable(now)) \
+                .update({'status': 'RUNNING', 'worker_id': worker_id,
+                         'lease_expires_at': now + lease_duration},
+                        synchronize_session=False)
+            session.commit()
+            if claimed:
+                logging.info("Worker %s claimed request %s", worker_id, user_id)
+                return session.query(Request).get(user_id)
+        return None
+    except SQLAlchemyError as e:
+        logging.error("Error claiming request for worker %s: %s", worker_id, e)
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def renew_lease(user_id, worker_id, lease_duration=LEASE_DURATION_SECONDS):
+    """
+    Extends the lease of a request held by a worker.
+
+    Args:
+        user_id (str): The ID of the claimed request.
+        worker_id (str): Identifier of the worker holding the lease.
+        lease_duration (float): Seconds from now until the lease expires.
+
+    Returns:
+        bool: True if the lease was renewed, False if the worker no longer holds it.
+    """
+    session = SessionRequests()
+    try:
+        renewed = session.query(Request) \
+            .filter(Request.user_id == user_id, Request.worker_id == worker_id,
+                    Request.status == 'RUNNING') \
+            .update({'lease_expires_at': time.time() + lease_duration},
+                    synchronize_session=False)
+        session.commit()
+        if not renewed:
+            logging.warning("Worker %s no longer holds the lease on request %s", worker_id, user_id)
+        return bool(renewed)
+    except SQLAlchemyError as e:
+        logging.error("Error renewing lease on request %s: %s", user_id, e)
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def update_claimed_request_status(user_id, worker_id, new_status):
+    """
+    Sets the status of a request, provided the worker still holds its lease.
+
+    A worker whose lease expired must not overwrite the status set by the worker that
+    reclaimed the request, so the update is conditional like renew_lease.
+
+    Args:
+        user_id (str): The ID of the claimed request.
+        worker_id (str): Identifier of the worker holding the lease.
+        new_status (str): The new status.
+
+    Returns:
+        bool: True if the status was updated, False if the worker no longer holds the lease.
+    """
+    session = SessionRequests()
+    try:
+        updated = session.query(Request) \
+            .filter(Request.user_id == user_id, Request.worker_id == worker_id,
+                    Request.status == 'RUNNING') \
+            .update({'status': new_status}, synchronize_session=False)
+        session.commit()
+        if updated:
+            logging.info("Updated status of request %s to %s", user_id, new_status)
+        else:
+            logging.warning("Worker %s no longer holds the lease on request %s, not setting it to %s",
+                            worker_id, user_id, new_status)
+        return bool(updated)
+    except SQLAlchemyError as e:
+        logging.error("Error updating status of request %s to %s: %s", user_id, new_status, e)
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def enqueue_delivery(user_id, email, task_type, attachment_path):
+    """
+    Queues the results email of a request for the mail sender.
+
+    Args:
+        user_id (str): The ID of the request.
+        email (str): The recipient's email address.
+        task_type (str): The type of the task, which determines the attachments.
+        attachment_path (str): Directory holding the files to attach.
+    """
+    session = SessionRequests()
+    delivery = Delivery(user_id=user_id, email=email, task_type=task_type,
+                        attachment_path=attachment_path, next_attempt_at=time.time())
+    try:
+        session.add(delivery)
+        session.commit()
+        logging.info("Queued results email for request %s", user_id)
+    except SQLAlchemyError as e:
+        logging.error("Error queuing results email for request %s: %s", user_id, e)
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def _deliverable(now):
+    """Filter matching deliveries that are due, or whose sender's lease has expired."""
+    return or_(and_(Delivery.status == 'PENDING', Delivery.next_attempt_at <= now),
+               and_(Delivery.status == 'SENDING', Delivery.lease_expires_at < now))
+
+
+def claim_deliveries(sender_id, batch_size, lease_duration=DELIVERY_LEASE_SECONDS):
+    """
+    Atomically claims a batch of due deliveries, oldest first.
+
+    Args:
+        sender_id (str): Identifier of the claiming mail sender.
+        batch_size (int): The maximum number of deliveries to claim.
+        lease_duration (float): Seconds until the claims expire.
+
+    Returns:
+        list of Delivery: The claimed deliveries, now SENDING.
+    """
+    session = SessionRequests()
+    try:
+        now = time.time()
+        candidates = [delivery_id for (delivery_id,) in
+                      session.query(Delivery.id).filter(_deliverable(now))
+                      .order_by(Delivery.next_attempt_at).limit(batch_size).all()]
+        if not candidates:
+            return []
+        session.query(Delivery) \
+            .filter(Delivery.id.in_(candidates), _deliverable(now)) \
+            .update({'status': 'SENDING', 'sender_id': sender_id,
+                     'lease_expires_at': now + lease_duration},
+                    synchronize_session=False)
+        session.commit()
+        return session.query(Delivery) \
+            .filter(Delivery.id.in_(candidates), Delivery.sender_id == sender_id,
+                    Delivery.status == 'SENDING') \
+            .order_by(Delivery.next_attempt_at).all()
+    except SQLAlchemyError as e:
+        logging.error("Error claiming deliveries for sender %s: %s", sender_id, e)
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def mark_delivery_sent(delivery_id):
+    """Records that a delivery was sent."""
+    _update_delivery(delivery_id, {'status': 'SENT', 'attempts': Delivery.attempts + 1,
+                                   'last_error': None, 'lease_expires_at': None})
+
+
+def record_delivery_failure(delivery_id, error, next_attempt_at):
+    """
+    Records a failed attempt at sending a delivery.
+
+    Args:
+        delivery_id (int): The ID of the delivery.
+        error (str): Description of the failure.
+        next_attempt_at (float or None): Epoch time of the next attempt, or None to
+            give up on the delivery.
+    """
+    values = {'attempts': Delivery.attempts + 1, 'last_error': error, 'lease_expires_at': None}
+    if next_attempt_at is None:
+        values['status'] = 'FAILED'
+    else:
+        values.update({'status': 'PENDING', 'next_attempt_at': next_attempt_at})
+    _update_delivery(delivery_id, values)
+
+
+def _update_delivery(delivery_id, values):
+    session = SessionRequests()
+    try:
+        session.query(Delivery).filter(Delivery.id == delivery_id) \
+            .update(values, synchronize_session=False)
+        session.commit()
+    except SQLAlchemyError as e:
+        logging.error("Error updating delivery %s: %s", delivery_id, e)
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def _is_evaluation_results(performance_metrics):
+    """
+    Checks whether metrics are the per-model evaluation results of a RequestProcessor,
+    either as an EvaluationResults or as a dictionary of per-model dictionaries.
+    """
+    return isinstance(performance_metrics, Mapping) and bool(performance_metrics) and \
+        all(isinstance(evaluation, Mapping) for evaluation in performance_metrics.values())
+
+
+def _to_storable_array(values):
+    """Converts an array-like to a NumPy array that can be saved without pickling."""
+    array = np.asarray(values)
+    return array.astype(str) if array.dtype == object else array
+
+
+def _split_results(results):
+    """
+    Splits evaluation results into the scalar metrics and the per-row arrays of each model.
+
+    Returns:
+        tuple: (metrics, arrays) where metrics maps model names to their scalar metrics
+        and arrays maps .npz entry names to arrays. The test labels are stored once.
+    """
+    metrics = {}
+    arrays = {}
+    for model_name, evaluation in results.items():
+        metrics[model_name] = {}
+        for key, value in evaluation.items():
+            if key == 'y_test':
+                arrays.setdefault('y_test', _to_storable_array(value))
+            elif key in ARRAY_KEYS:
+                if value is not None:
+                    arrays[f'{key}__{model_name}'] = _to_storable_array(value)
+            elif isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+                metrics[model_name][key] = float(value)
+    return metrics, arrays
+
+
+def _save_result_arrays(user_id, arrays):
+    """Writes the arrays of a result to its compressed sidecar file and returns its path."""
+    os.makedirs(RESULT_ARRAYS_DIR, exist_ok=True)
+    arrays_path = os.path.join(RESULT_ARRAYS_DIR, f"{user_id}.npz")
+    temp_path = f"{arrays_path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(temp_path, **arrays)
+    os.replace(temp_path, arrays_path)
+    return arrays_path
+
+
+def add_result(user_id, task_type, performance_metrics, email=None, dataset_key=None):
+    """
+    Stores the results of a request.
+
+    When given the evaluation results of a RequestProcessor, the scalar metrics of each
+    model are stored in indexed columns of model_results, the prediction arrays in a
+    compressed .npz sidecar file and only the scalar metrics in performance_metrics.
+    Other metrics are stored in performance_metrics as they are.
+
+    Args:
+        user_id (str): The ID of the request.
+        task_type (str): The type of the task.
+        performance_metrics: The evaluation results of every model, or JSON-serializable metrics.
+        email (str, optional): The email address the request was submitted with.
+        dataset_key (str, optional): Key identifying the training and test sets, which
+            groups results into leaderboards.
+    """
     session = SessionResults()
+    created_at = time.time()
+    arrays_path = None
+    model_results = []
+    if _is_evaluation_results(performance_metrics):
+        performance_metrics, arrays = _split_results(performance_metrics)
+        arrays_path = _save_result_arrays(user_id, arrays)
+        for model_name, metrics in performance_metrics.items():
+            model_results.append(ModelResult(
+                user_id=user_id, model_name=model_name, task_type=task_type, dataset_key=dataset_key,
+                created_at=created_at,
+                **{metric: value for metric, value in metrics.items() if metric in METRIC_COLUMNS}))
+
     new_result = Result(user_id=user_id, task_type=task_type,
-                        performance_metrics=performance_metrics)
+                        performance_metrics=performance_metrics, email=email, dataset_key=dataset_key,
+                        created_at=created_at, arrays_path=arrays_path, model_results=model_results)
     try:
         session.add(new_result)
         session.commit()
@@ -106,11 +582,117 @@ def add_result(user_id, task_type, performance_metrics):
     except SQLAlchemyError as e:
         logging.error("Error adding result for user %s to database: %s", user_id, e)
         session.rollback()
+        if arrays_path is not None and os.path.exists(arrays_path):
+            os.remove(arrays_path)
+        raise
+    finally:
+        session.close()
+
+
+def get_leaderboard(dataset_key, task_type, metric, limit=10, include_baselines=False):
+    """
+    Ranks the models evaluated on a dataset by a metric.
+
+    Only the indexed metric columns are read, never the prediction arrays.
+
+    Args:
+        dataset_key (str): Key identifying the training and test sets.
+        task_type (str): The type of the task.
+        metric (str): The metric to rank by, one of METRIC_COLUMNS.
+        limit (int, optional): The maximum number of entries.
+        include_baselines (bool, optional): Whether to rank the baseline models as well
+            as the submitted ones.
+
+    Returns:
+        list of dict: The entries, best first, with the request's user_id, the model
+        name, the metric's value and the time the result was stored.
+
+    Raises:
+        ValueError: If the metric is not stored in its own column.
+    """
+    if metric not in METRIC_COLUMNS:
+        raise ValueError(f"Unsupported leaderboard metric: {metric}")
+    column = getattr(ModelResult, metric)
+    order = column.asc() if metric in LOWER_IS_BETTER_METRICS else column.desc()
+
+    session = SessionResults()
+    try:
+        query = session.query(ModelResult.user_id, ModelResult.model_name, column, ModelResult.created_at) \
+            .filter(ModelResult.dataset_key == dataset_key, ModelResult.task_type == task_type,
+                    column.isnot(None))
+        if not include_baselines:
+            query = query.filter(ModelResult.model_name == 'user_model')
+        rows = query.order_by(order).limit(limit).all()
+        return [{'user_id': user_id, 'model_name': model_name, metric: value, 'created_at': created_at}
+                for user_id, model_name, value, created_at in rows]
+    except SQLAlchemyError as e:
+        logging.error("Error fetching %s leaderboard for dataset %s: %s", metric, dataset_key, e)
         raise
     finally:
         session.close()
 
 
+def get_user_history(email, limit=50):
+    """
+    Returns the most recent results of the requests submitted with an email address.
+
+    Only the indexed metric columns are read, never the prediction arrays.
+
+    Args:
+        email (str): The email address the requests were submitted with.
+        limit (int, optional): The maximum number of requests.
+
+    Returns:
+        list of dict: One entry per request, newest first, with its user_id, task type,
+        dataset key, creation time and the metrics of each model under 'models'.
+    """
+    session = SessionResults()
+    try:
+        requests = session.query(Result.user_id, Result.task_type, Result.dataset_key, Result.created_at) \
+            .filter(Result.email == email).order_by(Result.created_at.desc()).limit(limit).all()
+        history = {user_id: {'user_id': user_id, 'task_type': task_type, 'dataset_key': dataset_key,
+                             'created_at': created_at, 'models': {}}
+                   for user_id, task_type, dataset_key, created_at in requests}
+        if history:
+            metric_columns = [getattr(ModelResult, metric) for metric in METRIC_COLUMNS]
+            rows = session.query(ModelResult.user_id, ModelResult.model_name, *metric_columns) \
+                .filter(ModelResult.user_id.in_(list(history))).order_by(ModelResult.id).all()
+            for user_id, model_name, *values in rows:
+                history[user_id]['models'][model_name] = {
+                    metric: value for metric, value in zip(METRIC_COLUMNS, values) if value is not None}
+        return list(history.values())
+    except SQLAlchemyError as e:
+        logging.error("Error fetching result history for %s: %s", email, e)
+        raise
+    finally:
+        session.close()
+
+
+def load_result_arrays(user_id):
+    """
+    Loads the prediction arrays stored with a result.
+
+    Args:
+        user_id (str): The ID of the request.
+
+    Returns:
+        dict or None: 'y_test' and, for each of ARRAY_KEYS, a dict of arrays keyed by
+        model name. None if the result has no stored arrays.
+    """
+    arrays_path = os.path.join(RESULT_ARRAYS_DIR, f"{user_id}.npz")
+    if not os.path.exists(arrays_path):
+        return None
+    arrays = {key: {} for key in ARRAY_KEYS}
+    with np.load(arrays_path) as stored:
+        for name in stored.files:
+            if name == 'y_test':
+                arrays['y_test'] = stored[name]
+            else:
+                key, model_name = name.split('__', 1)
+                arrays[key][model_name] = stored[name]
+    return arrays
+
+
 def get_result_by_id(user_id):
     session = SessionResults()
     try:
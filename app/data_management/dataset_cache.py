@@ -0,0 +1,253 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Bump when the on-disk layout changes so stale entries are ignored
+CACHE_FORMAT_VERSION = 2
+
+
+class DatasetCache:
+    """
+    On-disk cache of parsed datasets, keyed by the content hash of the source file
+    and the loading mode, since lean loading parses the same file into other dtypes.
+
+    Each entry stores the feature columns as column-major (Fortran ordered) .npy
+    blocks, one block per run of consecutive columns sharing a dtype, plus the
+    target column and a small JSON metadata file. Numeric data is memory-mapped
+    back on a hit, so neither the CSV parse nor the dtype inference is repeated.
+    Categorical columns are stored as their integer codes, with the categories in
+    the metadata. Object (string) columns cannot be memory-mapped and are loaded eagerly.
+    Sparse feature matrices are stored as the data, indices and indptr arrays of
+    their CSR form, with the feature names in the metadata.
+
+    Attributes:
+        cache_dir (str): The directory where cached datasets are stored.
+    """
+
+    def __init__(self, cache_dir):
+        """
+        Initializes the DatasetCache with the directory to store entries in.
+
+        Args:
+            cache_dir (str): The directory where cached datasets are stored.
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, content_hash, loading_mode):
+        """Returns the directory of the cache entry for a content hash and loading mode."""
+        digest = hashlib.sha256(f"{CACHE_FORMAT_VERSION}:{loading_mode}:{content_hash}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, digest)
+
+    def _read_metadata(self, content_hash, loading_mode):
+        """Returns the metadata of a cache entry, or None if it is missing or unreadable."""
+        metadata_path = os.path.join(self._entry_path(content_hash, loading_mode), 'metadata.json')
+        try:
+            with open(metadata_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _save_array(path, values):
+        """Saves an array, pickling it only when it holds Python objects."""
+        values = np.asarray(values)
+        np.save(path, values, allow_pickle=values.dtype == object)
+
+    @staticmethod
+    def _load_array(path):
+        """Loads an array, memory-mapping it unless it holds Python objects."""
+        try:
+            # A plain ndarray view keeps the memory map without leaking np.memmap into pandas
+            return np.asarray(np.load(path, mmap_mode='r'))
+        except ValueError:
+            # Object arrays are pickled and can only be read into memory
+            return np.load(path, allow_pickle=True)
+
+    def _load_frame(self, entry_path, metadata):
+        """Rebuilds the feature DataFrame of an entry from its column blocks."""
+        frames = []
+        for block in metadata['blocks']:
+            values = self._load_array(os.path.join(entry_path, block['file']))
+            if 'categories' in block:
+                categorical_dtype = pd.CategoricalDtype(block['categories'])
+                frames.append(pd.DataFrame({
+                    column: pd.Categorical.from_codes(values[:, index], dtype=categorical_dtype)
+                    for index, column in enumerate(block['columns'])}, copy=False))
+                continue
+            frames.append(pd.DataFrame(values, columns=block['columns'], copy=False))
+        if len(frames) == 1:
+            return frames[0]
+        if frames:
+            return pd.concat(frames, axis=1)
+        return pd.DataFrame(index=pd.RangeIndex(metadata['num_rows']))
+
+    def contains(self, content_hash, loading_mode='default'):
+        """
+        Checks whether a dataset is cached.
+
+        Args:
+            content_hash (str): The content hash of the source file.
+            loading_mode (str, optional): How the dataset was parsed, 'default' or 'lean'.
+
+        Returns:
+            bool: True if the dataset is cached, False otherwise.
+        """
+        return os.path.exists(os.path.join(self._entry_path(content_hash, loading_mode), 'metadata.json'))
+
+    def load(self, content_hash, loading_mode='default'):
+        """
+        Loads a cached dataset.
+
+        Args:
+            content_hash (str): The content hash of the source file.
+            loading_mode (str, optional): How the dataset was parsed, 'default' or 'lean'.
+
+        Returns:
+            tuple or None: (X, y) as a pd.DataFrame, or a scipy.sparse.csr_matrix for
+            sparse datasets, and a pd.Series, backed by memory-mapped arrays, or None
+            if the dataset is not cached.
+        """
+        if not self.contains(content_hash, loading_mode):
+            return None
+        entry_path = self._entry_path(content_hash, loading_mode)
+        metadata_path = os.path.join(entry_path, 'metadata.json')
+
+        try:
+            with open(metadata_path, 'r', encoding='utf-8') as file:
+                metadata = json.load(file)
+
+            if 'sparse' in metadata:
+                X = sparse.csr_matrix(tuple(self._load_array(os.path.join(entry_path, f"{name}.npy"))
+                                            for name in ['data', 'indices', 'indptr']),
+                                      shape=tuple(metadata['sparse']['shape']))
+            else:
+                X = self._load_frame(entry_path, metadata)
+
+            y_values = self._load_array(os.path.join(entry_path, 'target.npy'))
+            if 'target_categories' in metadata:
+                y_values = pd.Categorical.from_codes(y_values, metadata['target_categories'])
+            y = pd.Series(y_values, name=metadata['target'], copy=False)
+        except Exception as e:
+            logging.warning("Ignoring unreadable dataset cache entry %s: %s", entry_path, e)
+            return None
+
+        logging.info("Loaded dataset %s from cache", content_hash)
+        return X, y
+
+    def feature_names(self, content_hash, loading_mode='default'):
+        """
+        Returns the feature names of a cached sparse dataset.
+
+        Args:
+            content_hash (str): The content hash of the source file.
+            loading_mode (str, optional): How the dataset was parsed, 'default' or 'lean'.
+
+        Returns:
+            list of str or None: The names of the sparse matrix's columns, or None if the
+            dataset is not cached or not sparse.
+        """
+        metadata = self._read_metadata(content_hash, loading_mode)
+        return metadata.get('sparse', {}).get('columns') if metadata else None
+
+    def memory_usage(self, content_hash, loading_mode='default'):
+        """
+        Returns the memory report stored with a cached dataset.
+
+        Args:
+            content_hash (str): The content hash of the source file.
+            loading_mode (str, optional): How the dataset was parsed, 'default' or 'lean'.
+
+        Returns:
+            dict or None: The report passed to store, or None if the dataset is not
+            cached or was stored without one.
+        """
+        metadata = self._read_metadata(content_hash, loading_mode)
+        return metadata.get('memory') if metadata else None
+
+    def store(self, content_hash, X, y, feature_names=None, loading_mode='default', memory=None):
+        """
+        Stores a parsed dataset in the cache.
+
+        The entry is written to a temporary directory first and moved into place,
+        so concurrent workers never observe a partially written entry.
+
+        Args:
+            content_hash (str): The content hash of the source file.
+            X (pd.DataFrame or scipy.sparse matrix): The feature columns.
+            y (pd.Series): The target column.
+            feature_names (list of str, optional): The column names of a sparse X.
+            loading_mode (str, optional): How the dataset was parsed, 'default' or 'lean'.
+            memory (dict, optional): The memory report of a lean-loaded dataset, returned
+                by memory_usage on later hits.
+        """
+        entry_path = self._entry_path(content_hash, loading_mode)
+        if os.path.exists(entry_path):
+            return
+
+        temp_path = tempfile.mkdtemp(dir=self.cache_dir)
+        try:
+            # Group consecutive columns with the same dtype so concatenating the
+            # blocks on load restores the original column order without a copy
+            blocks = []
+            dtypes = [] if sparse.issparse(X) else X.dtypes
+            for position, dtype in enumerate(dtypes):
+                if blocks and blocks[-1]['dtype'] == dtype:
+                    blocks[-1]['positions'].append(position)
+                else:
+                    blocks.append({'dtype': dtype, 'positions': [position]})
+
+            metadata = {
+                'num_rows': X.shape[0],
+                'target': y.name,
+                'blocks': [],
+            }
+            if sparse.issparse(X):
+                X = X.tocsr()
+                for name in ['data', 'indices', 'indptr']:
+                    self._save_array(os.path.join(temp_path, f"{name}.npy"), getattr(X, name))
+                metadata['sparse'] = {'shape': list(X.shape), 'columns': feature_names}
+            if memory is not None:
+                metadata['memory'] = {key: int(value) for key, value in memory.items()}
+            for idx, block in enumerate(blocks):
+                file_name = f"block_{idx}.npy"
+                block_metadata = {
+                    'file': file_name,
+                    'columns': [X.columns[position] for position in block['positions']],
+                }
+                if isinstance(block['dtype'], pd.CategoricalDtype):
+                    values = np.column_stack([X.iloc[:, position].cat.codes.to_numpy()
+                                              for position in block['positions']])
+                    block_metadata['categories'] = block['dtype'].categories.tolist()
+                else:
+                    values = X.iloc[:, block['positions']].to_numpy()
+                self._save_array(os.path.join(temp_path, file_name), np.asfortranarray(values))
+                metadata['blocks'].append(block_metadata)
+
+            if isinstance(y.dtype, pd.CategoricalDtype):
+                self._save_array(os.path.join(temp_path, 'target.npy'), y.cat.codes.to_numpy())
+                metadata['target_categories'] = y.cat.categories.tolist()
+            else:
+                self._save_array(os.path.join(temp_path, 'target.npy'), y.to_numpy())
+
+            with open(os.path.join(temp_path, 'metadata.json'), 'w', encoding='utf-8') as file:
+                json.dump(metadata, file)
+
+            os.rename(temp_path, entry_path)
+            logging.info("Stored dataset %s in cache", content_hash)
+        except OSError as e:
+            # Another worker may have stored the same dataset in the meantime
+            logging.warning("Could not store dataset %s in cache: %s", content_hash, e)
+        finally:
+            if os.path.exists(temp_path):
+                shutil.rmtree(temp_path, ignore_errors=True)
@@ -0,0 +1,295 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Rows parsed at a time, which bounds the memory used beyond the loaded dataset
+LEAN_CHUNK_ROWS = 100_000
+# String columns with at most this many distinct values are stored as categoricals
+MAX_CATEGORIES = 1024
+
+# Signed integer types tried in order when downcasting an integer column
+INTEGER_TYPES = [np.int8, np.int16, np.int32, np.int64]
+# Integers up to this magnitude are exactly representable as float32
+FLOAT32_EXACT_INTEGER_LIMIT = 2 ** 24
+
+# Feature matrices with at most this fraction of non-zero values are loaded as sparse matrices
+SPARSE_DENSITY_THRESHOLD = 0.1
+# Datasets with fewer feature columns are always loaded densely
+SPARSE_MIN_FEATURES = 100
+# Rows inspected to decide whether a dataset is sparse
+SPARSITY_SAMPLE_ROWS = 1000
+# Values parsed at a time when loading a sparse dataset
+SPARSE_CHUNK_CELLS = 5_000_000
+
+
+def _is_float32_exact(values):
+    """Checks whether float64 values survive a round trip through float32."""
+    with np.errstate(over='ignore', invalid='ignore'):
+        return np.array_equal(values.astype(np.float32).astype(np.float64), values, equal_nan=True)
+
+
+class _ColumnProfile:
+    """
+    What the first pass has learned about a column, and the lean dtype derived from it.
+
+    A column is 'numeric' while every chunk parses as integers or floats, 'bool' while
+    every chunk parses as booleans and 'string' otherwise. String columns keep the set
+    of their distinct values until it grows beyond MAX_CATEGORIES.
+    """
+    __slots__ = ['kind', 'min', 'max', 'has_float', 'float32_exact', 'categories']
+
+    def __init__(self):
+        self.kind = None
+        self.min = None
+        self.max = None
+        self.has_float = False
+        self.float32_exact = True
+        self.categories = set()
+
+    def update(self, values, max_categories):
+        if pd.api.types.is_bool_dtype(values):
+            kind = 'bool'
+        elif pd.api.types.is_integer_dtype(values) or pd.api.types.is_float_dtype(values):
+            kind = 'numeric'
+        else:
+            kind = 'string'
+
+        if self.kind is not None and kind != self.kind:
+            # Mixed chunks parse as strings when read at once; values seen so far as
+            # numbers or booleans were not collected, so no categories can be built
+            self.kind = 'string'
+            self.categories = None
+            return
+        self.kind = kind
+
+        if kind == 'numeric':
+            array = values.to_numpy()
+            if pd.api.types.is_float_dtype(values):
+                self.has_float = True
+                self.float32_exact = self.float32_exact and _is_float32_exact(array)
+                array = array[~np.isnan(array)]
+            if len(array):
+                self.min = array.min() if self.min is None else min(self.min, array.min())
+                self.max = array.max() if self.max is None else max(self.max, array.max())
+            if not self.has_float and self.min is not None and \
+                    self.min < 0 and self.max > np.iinfo(np.int64).max:
+                # No integer dtype holds both; read at once, pandas parses such a column as strings
+                self.kind = 'string'
+                self.categories = None
+        elif kind == 'string' and self.categories is not None:
+            self.categories.update(values.dropna().unique())
+            if len(self.categories) > max_categories:
+                self.categories = None
+
+    def numeric_dtype(self):
+        """Returns the smallest dtype holding every value of a numeric column exactly."""
+        if self.has_float:
+            integers_exact = self.min is None or max(-self.min, self.max) <= FLOAT32_EXACT_INTEGER_LIMIT
+            return np.dtype(np.float32 if self.float32_exact and integers_exact else np.float64)
+        if self.min is None:
+            return np.dtype(np.int8)
+        for integer_type in INTEGER_TYPES:
+            info = np.iinfo(integer_type)
+            if info.min <= self.min and self.max <= info.max:
+                return np.dtype(integer_type)
+        # Non-negative values beyond the int64 range, which pandas parses as uint64
+        if self.min >= 0 and self.max <= np.iinfo(np.uint64).max:
+            return np.dtype(np.uint64)
+        # update turns columns mixing negative and uint64-only values into strings
+        raise ValueError(f"No integer dtype holds values from {self.min} to {self.max}")
+
+
+def _profile_csv(path, chunk_size, max_categories):
+    """
+    Scans a CSV file chunk by chunk and profiles its columns.
+
+    Returns:
+        tuple: (columns, profiles, num_rows, default_bytes) where default_bytes is the
+        memory pd.read_csv would have used for the parsed data.
+    """
+    columns = None
+    profiles = None
+    num_rows = 0
+    default_bytes = 0
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        if profiles is None:
+            columns = list(chunk.columns)
+            profiles = [_ColumnProfile() for _ in columns]
+        for column, profile in zip(columns, profiles):
+            profile.update(chunk[column], max_categories)
+        num_rows += len(chunk)
+        default_bytes += int(chunk.memory_usage(index=False, deep=True).sum())
+    return columns, profiles, num_rows, default_bytes
+
+
+def _allocate_numeric_columns(profiles, num_rows):
+    """
+    Allocates the numeric columns as views of one contiguous buffer.
+
+    Columns are grouped by their lean dtype into column-major blocks laid out one
+    after another, widest dtype first so every block stays aligned.
+
+    Returns:
+        tuple: (buffer, columns) where columns maps column positions to 1-D views.
+    """
+    groups = {}
+    for position, profile in enumerate(profiles):
+        if profile.kind == 'numeric':
+            groups.setdefault(profile.numeric_dtype(), []).append(position)
+    groups = sorted(groups.items(), key=lambda group: -group[0].itemsize)
+
+    buffer = np.empty(sum(dtype.itemsize * len(positions) * num_rows for dtype, positions in groups),
+                      dtype=np.uint8)
+    columns = {}
+    offset = 0
+    for dtype, positions in groups:
+        size = dtype.itemsize * len(positions) * num_rows
+        block = buffer[offset:offset + size].view(dtype).reshape((num_rows, len(positions)), order='F')
+        for index, position in enumerate(positions):
+            columns[position] = block[:, index]
+        offset += size
+    return buffer, columns
+
+
+def load_lean_csv(path, chunk_size=LEAN_CHUNK_ROWS, max_categories=MAX_CATEGORIES):
+    """
+    Loads a dataset whose last column is the target with as little memory as possible.
+
+    The file is read twice, one chunk at a time. The first pass infers the smallest
+    dtype holding every value of each column exactly; the second writes the values
+    straight into their final arrays, so the default float64/int64 frame is never
+    materialized. The numeric columns of X and y are views of one contiguous buffer,
+    holding a column-major block per dtype. String columns with at most
+    max_categories distinct values become categoricals; other string columns are
+    kept as Python objects.
+
+    Args:
+        path (str): Path of the CSV file.
+        chunk_size (int, optional): Rows parsed at a time.
+        max_categories (int, optional): The most distinct values a string column may
+            have to be stored as a categorical.
+
+    Returns:
+        tuple: (X, y, memory) where X is a pd.DataFrame, y a pd.Series and memory a dict
+        with the bytes pd.read_csv would have used ('default_bytes') and the bytes used
+        by X and y ('lean_bytes').
+    """
+    columns, profiles, num_rows, default_bytes = _profile_csv(path, chunk_size, max_categories)
+    if profiles is None:
+        # No rows to profile
+        dataset = pd.read_csv(path)
+        memory = int(dataset.memory_usage(index=False, deep=True).sum())
+        return dataset.iloc[:, :-1], dataset.iloc[:, -1], {'default_bytes': memory, 'lean_bytes': memory}
+
+    _, arrays = _allocate_numeric_columns(profiles, num_rows)
+    categories = {}
+    for position, profile in enumerate(profiles):
+        if profile.kind == 'numeric':
+            continue
+        if profile.kind == 'bool':
+            arrays[position] = np.empty(num_rows, dtype=bool)
+        elif profile.categories is not None:
+            categories[position] = sorted(profile.categories, key=str)
+            code_dtype = np.int8 if len(categories[position]) < 128 else np.int16
+            arrays[position] = np.empty(num_rows, dtype=code_dtype)
+        else:
+            arrays[position] = np.empty(num_rows, dtype=object)
+
+    # The chunks match those of the first pass, so categorical columns parse to the
+    # values profiled; other string columns are read as strings throughout, as
+    # pd.read_csv would read them at once
+    object_columns = {columns[position]: object for position, profile in enumerate(profiles)
+                      if profile.kind == 'string' and position not in categories}
+    start = 0
+    for chunk in pd.read_csv(path, chunksize=chunk_size, dtype=object_columns):
+        stop = start + len(chunk)
+        for position, column in enumerate(columns):
+            values = chunk[column]
+            if position in categories:
+                arrays[position][start:stop] = pd.Categorical(values, categories=categories[position]).codes
+            else:
+                arrays[position][start:stop] = values.to_numpy(dtype=arrays[position].dtype)
+        start = stop
+
+    def column_values(position):
+        if position in categories:
+            return pd.Categorical.from_codes(arrays[position], categories[position])
+        return arrays[position]
+
+    X = pd.DataFrame({column: column_values(position) for position, column in enumerate(columns[:-1])},
+                     copy=False)
+    y = pd.Series(column_values(len(columns) - 1), name=columns[-1], copy=False)
+
+    lean_bytes = int(X.memory_usage(index=False, deep=True).sum() + y.memory_usage(index=False, deep=True))
+    return X, y, {'default_bytes': default_bytes, 'lean_bytes': lean_bytes}
+
+
+def is_sparse_csv(path, density_threshold=SPARSE_DENSITY_THRESHOLD, sample_rows=SPARSITY_SAMPLE_ROWS,
+                  min_features=SPARSE_MIN_FEATURES):
+    """
+    Checks whether a dataset's features are better stored as a sparse matrix.
+
+    The decision is made on the first sample_rows rows: the features must all be
+    numeric, there must be at least min_features of them and at most
+    density_threshold of their values may be non-zero.
+
+    Args:
+        path (str): Path of the CSV file, whose last column is the target.
+        density_threshold (float, optional): The highest fraction of non-zero values.
+        sample_rows (int, optional): Rows inspected.
+        min_features (int, optional): The fewest feature columns worth storing sparsely.
+
+    Returns:
+        bool: True if the features should be loaded with load_sparse_csv.
+    """
+    features = pd.read_csv(path, nrows=sample_rows).iloc[:, :-1]
+    if features.shape[1] < min_features or features.empty:
+        return False
+    if features.select_dtypes(include=[np.number, bool]).shape[1] != features.shape[1]:
+        return False
+    # Missing values are stored explicitly, so they count as non-zero
+    return np.count_nonzero(features.to_numpy(dtype=np.float64)) / features.size <= density_threshold
+
+
+def load_sparse_csv(path, chunk_cells=SPARSE_CHUNK_CELLS):
+    """
+    Loads a dataset whose last column is the target with the features as a CSR matrix.
+
+    The file is parsed in chunks of about chunk_cells values, each of which is
+    converted to CSR before the next is read, so the dense matrix is never held
+    in full.
+
+    Args:
+        path (str): Path of the CSV file.
+        chunk_cells (int, optional): Values parsed at a time.
+
+    Returns:
+        tuple: (X, y, feature_names) with X a scipy.sparse.csr_matrix of float64, y a
+        pd.Series and feature_names the names of X's columns.
+
+    Raises:
+        ValueError: If a feature column holds a non-numeric value.
+    """
+    columns = list(pd.read_csv(path, nrows=0).columns)
+    feature_names = columns[:-1]
+    chunk_size = max(1, chunk_cells // len(columns))
+
+    blocks = []
+    targets = []
+    feature_dtypes = {column: np.float64 for column in feature_names}
+    for chunk in pd.read_csv(path, chunksize=chunk_size, dtype=feature_dtypes):
+        blocks.append(sparse.csr_matrix(chunk[feature_names].to_numpy()))
+        targets.append(chunk[columns[-1]])
+
+    if blocks:
+        X = sparse.vstack(blocks, format='csr')
+        y = pd.concat(targets, ignore_index=True)
+    else:
+        X = sparse.csr_matrix((0, len(feature_names)))
+        y = pd.Series([], name=columns[-1])
+    return X, y, feature_names
@@ -0,0 +1,307 @@
+import os
+import sys
+import json
+import time
+import logging
+import resource
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# File the per-request records are appended to as JSON lines, if set
+RECORDS_PATH = os.getenv('INSTRUMENTATION_RECORDS_PATH')
+
+# Upper bounds of the histogram buckets for durations in seconds and peak RSS in MB
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+RSS_BUCKETS_MB = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+_local = threading.local()
+_lock = threading.Lock()
+# Stage records of the request being processed by this process, if any
+_current_records = None
+
+
+def _read_peak_rss_mb():
+    """Returns the peak RSS of the process in MB since it was last reset."""
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Peak over the process's lifetime; kilobytes on Linux, bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+
+
+def _reset_peak_rss():
+    """Resets the peak RSS of the process to its current RSS where Linux allows it."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+    except OSError:
+        pass
+
+
+class _Frame:
+    """An open stage on a thread's stack, tracking the peak RSS seen while it runs."""
+    __slots__ = ['peak_rss_mb']
+
+    def __init__(self):
+        self.peak_rss_mb = 0.0
+
+
+@contextmanager
+def stage(name, **labels):
+    """
+    Records the wall time, CPU time and peak RSS of a block of code.
+
+    Stages nest: an enclosing stage's peak RSS includes the peaks of the stages run
+    inside it. The peak is reset when a stage starts on the main thread, so each stage
+    reports its own high-water mark; stages on other threads report the process's peak
+    since the enclosing stage started. CPU time is that of the whole process on the
+    main thread, including threads the stage starts, and of the thread otherwise.
+
+    Inside record_request the record is added to the request's records; otherwise it
+    is aggregated into REGISTRY right away.
+
+    Args:
+        name (str): The name of the stage, e.g. 'train' or 's3_download'.
+        **labels: Low-cardinality labels distinguishing instances of the stage, e.g.
+            model='AdaBoost'.
+    """
+    on_main_thread = threading.current_thread() is threading.main_thread()
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    if on_main_thread:
+        if stack:
+            # The reset below would lose the peak the enclosing stage has reached so far
+            stack[-1].peak_rss_mb = max(stack[-1].peak_rss_mb, _read_peak_rss_mb())
+        _reset_peak_rss()
+    frame = _Frame()
+    stack.append(frame)
+
+    cpu_clock = time.process_time if on_main_thread else time.thread_time
+    started_at = time.time()
+    wall_start = time.perf_counter()
+    cpu_start = cpu_clock()
+    status = 'ok'
+    try:
+        yield
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        wall_seconds = time.perf_counter() - wall_start
+        cpu_seconds = cpu_clock() - cpu_start
+        frame.peak_rss_mb = max(frame.peak_rss_mb, _read_peak_rss_mb())
+        stack.pop()
+        if stack:
+            stack[-1].peak_rss_mb = max(stack[-1].peak_rss_mb, frame.peak_rss_mb)
+        add_records([{
+            'stage': name,
+            'labels': labels,
+            'status': status,
+            'started_at': started_at,
+            'wall_seconds': wall_seconds,
+            'cpu_seconds': cpu_seconds,
+            'peak_rss_mb': frame.peak_rss_mb,
+        }])
+
+
+def add_records(records):
+    """
+    Adds stage records, e.g. ones returned by run_recorded from another process.
+
+    Args:
+        records (list of dict): The stage records.
+    """
+    with _lock:
+        if _current_records is not None:
+            _current_records.extend(records)
+            return
+    REGISTRY.observe_records(records)
+
+
+@contextmanager
+def record_request(request_id, **fields):
+    """
+    Collects the records of every stage run while a request is processed.
+
+    The whole block is recorded as the 'request' stage. The request record is not
+    exported; pass it to export_request once it has reached the process exposing
+    the metrics.
+
+    Args:
+        request_id (str): The ID of the request.
+        **fields: Additional fields of the request record, e.g. task_type.
+
+    Yields:
+        dict: The request record, with the stage records under 'stages'.
+    """
+    global _current_records
+    records = []
+    request_record = dict(fields, request_id=request_id, stages=records)
+    with _lock:
+        previous_records, _current_records = _current_records, records
+    try:
+        with stage('request'):
+            yield request_record
+    finally:
+        with _lock:
+            _current_records = previous_records
+
+
+def run_recorded(function, *args):
+    """
+    Calls a function and returns its result together with the records of its stages.
+
+    Used to bring back the records of stages run in worker processes, which have their
+    own records and registry.
+
+    Returns:
+        tuple: (result, records).
+    """
+    global _current_records
+    records = []
+    with _lock:
+        previous_records, _current_records = _current_records, records
+    try:
+        return function(*args), records
+    finally:
+        with _lock:
+            _current_records = previous_records
+
+
+def export_request(request_record):
+    """
+    Aggregates a request record into REGISTRY and appends it to RECORDS_PATH.
+
+    Args:
+        request_record (dict): A record yielded by record_request.
+    """
+    REGISTRY.observe_records(request_record['stages'])
+    total = next((record for record in request_record['stages'] if record['stage'] == 'request'), None)
+    if total is not None:
+        logging.info("Request %s took %.2fs wall, %.2fs CPU, %.0f MB peak RSS", request_record['request_id'],
+                     total['wall_seconds'], total['cpu_seconds'], total['peak_rss_mb'])
+    if RECORDS_PATH:
+        with _lock, open(RECORDS_PATH, 'a') as file:
+            file.write(json.dumps(request_record, default=str) + '\n')
+
+
+class Histogram:
+    """
+    A cumulative histogram per label set, in the Prometheus exposition format.
+
+    Attributes:
+        name (str): The metric name.
+        help_text (str): Description of the metric.
+        buckets (tuple): Upper bounds of the buckets.
+    """
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        """
+        Adds an observation.
+
+        Args:
+            labels (dict): The labels of the series the observation belongs to.
+            value (float): The observed value.
+        """
+        key = tuple(sorted((name, str(label)) for name, label in labels.items()))
+        counts, total, count = self.series.get(key, ([0] * len(self.buckets), 0.0, 0))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+        self.series[key] = (counts, total + value, count + 1)
+
+    def render(self):
+        """Returns the lines describing the histogram."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self.series.items()):
+            label_text = ','.join(f'{name}="{value}"' for name, value in key)
+            bucket_prefix = f'{label_text},' if label_text else ''
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{bucket_prefix}le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{bucket_prefix}le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Aggregates stage records into wall time, CPU time and peak RSS histograms."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {
+            'wall_seconds': Histogram('metrica_stage_wall_seconds', "Wall time of pipeline stages.",
+                                      SECONDS_BUCKETS),
+            'cpu_seconds': Histogram('metrica_stage_cpu_seconds', "CPU time of pipeline stages.",
+                                     SECONDS_BUCKETS),
+            'peak_rss_mb': Histogram('metrica_stage_peak_rss_megabytes', "Peak RSS during pipeline stages.",
+                                     RSS_BUCKETS_MB),
+        }
+
+    def observe_records(self, records):
+        """Adds stage records to the histograms."""
+        with self.lock:
+            for record in records:
+                labels = dict(record['labels'], stage=record['stage'], status=record['status'])
+                for field, histogram in self.histograms.items():
+                    histogram.observe(labels, record[field])
+
+    def render(self):
+        """Returns the histograms in the Prometheus text exposition format."""
+        with self.lock:
+            lines = []
+            for histogram in self.histograms.values():
+                lines.extend(histogram.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+def start_metrics_server(port, registry=REGISTRY, host=''):
+    """
+    Serves the registry's histograms at /metrics for scraping, on a background thread.
+
+    Args:
+        port (int): The port to listen on.
+        registry (MetricsRegistry, optional): The registry to serve.
+        host (str, optional): The address to bind to; all interfaces by default.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call shutdown() to stop it.
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info("Serving metrics on port %d", server.server_address[1])
+    return server
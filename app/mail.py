@@ -0,0 +1,264 @@
+import os
+import time
+import logging
+import smtplib
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.mime.base import MIMEBase
+from email import encoders
+from dotenv import load_dotenv
+
+from app.data_management import database
+from app.instrumentation import stage
+
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', 'true').lower() not in ('0', 'false', 'no')
+
+# Deliveries claimed and sent over one connection at a time
+DELIVERY_BATCH_SIZE = 20
+# Attempts after which a delivery is given up on
+MAX_DELIVERY_ATTEMPTS = 5
+# Delay before retrying a failed delivery, doubled after every further failure
+RETRY_BACKOFF_SECONDS = 60
+MAX_RETRY_BACKOFF_SECONDS = 3600
+
+# Failures that retrying the same delivery cannot fix
+PERMANENT_ERRORS = (FileNotFoundError, smtplib.SMTPRecipientsRefused)
+
+# Files attached to the results email of each task type
+ATTACHMENT_FILES = {
+    'classification': [
+        "all_confusion_matrices.png",
+        "precision_recall_curve.png",
+        "results_table.png",
+        "roc_curve.png",
+        "model_evaluation_report.pdf",
+    ],
+    'regression': [
+        "results_table.png",
+        "prediction_vs_actual_all_models.png",
+        "residuals_all_models.png",
+        "model_evaluation_report.pdf",
+    ]
+}
+
+
+def build_message(sender_email, receiver_email, file_directory_path, task_type):
+    """
+    Builds the results email with the visualizations and report attached.
+
+    Args:
+        sender_email (str): The sender's email address.
+        receiver_email (str): The recipient's email address.
+        file_directory_path (str): Directory holding the files to attach.
+        task_type (str): The type of the task, which determines the attachments.
+
+    Returns:
+        MIMEMultipart: The message.
+
+    Raises:
+        FileNotFoundError: If any of the files to attach does not exist.
+    """
+    subject = "Model Processing Results"
+    email_body = "Your model processing is completed. Please find the results attached."
+
+    message = MIMEMultipart()
+    message['From'] = sender_email
+    message['To'] = receiver_email
+    message['Subject'] = subject
+    message.attach(MIMEText(email_body, 'plain'))
+
+    # Attach each file
+    for file_name in ATTACHMENT_FILES[task_type]:
+        file_path = os.path.join(file_directory_path, file_name)
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File {file_path} not found. Email sending aborted.")
+        part = MIMEBase('application', "octet-stream")
+        with open(file_path, 'rb') as file:
+            part.set_payload(file.read())
+        encoders.encode_base64(part)
+        part.add_header('Content-Disposition', f'attachment; filename="{file_name}"')
+        message.attach(part)
+
+    return message
+
+
+class SMTPConnection:
+    """
+    An authenticated SMTP connection that is opened on first use and reused.
+
+    If the server has dropped the connection in the meantime, it is reopened once
+    before a message is given up on.
+
+    Attributes:
+        host (str): The SMTP server's host name.
+        port (int): The SMTP server's port.
+        username (str): The login, or None to send without authenticating.
+        password (str): The login's password.
+        starttls (bool): Whether to upgrade the connection with STARTTLS.
+    """
+
+    def __init__(self, username, password, host=SMTP_HOST, port=SMTP_PORT, starttls=SMTP_STARTTLS):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.server = None
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+        logging.info("Connected to SMTP server %s:%s", self.host, self.port)
+
+    def send(self, message):
+        """
+        Sends a message.
+
+        Args:
+            message (email.message.Message): The message, with From and To headers set.
+        """
+        with stage('smtp_send'):
+            self._send(message)
+
+    def _send(self, message):
+        if self.server is None:
+            self._connect()
+        try:
+            self.server.sendmail(message['From'], message['To'], message.as_string())
+        except smtplib.SMTPServerDisconnected:
+            logging.info("SMTP server closed the connection, reconnecting")
+            self.server = None
+            self._connect()
+            self.server.sendmail(message['From'], message['To'], message.as_string())
+
+    def close(self):
+        """Closes the connection if it is open."""
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except smtplib.SMTPException:
+            self.server.close()
+        self.server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def retry_delay(attempts):
+    """Returns the seconds to wait before the next attempt after the given number of failed ones."""
+    return min(RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_RETRY_BACKOFF_SECONDS)
+
+
+class MailSender:
+    """
+    Sends the queued results emails, decoupled from the workers evaluating requests.
+
+    Deliveries are claimed from the database in batches and sent over one SMTP
+    connection. Failed deliveries are retried with exponential backoff until they
+    have been attempted max_attempts times.
+
+    Attributes:
+        connection (SMTPConnection): The connection the emails are sent over.
+        sender_email (str): The sender's email address.
+        sender_id (str): Identifier of this sender, recorded on claimed deliveries.
+        batch_size (int): The maximum number of deliveries claimed at once.
+        max_attempts (int): Attempts after which a delivery is given up on.
+    """
+
+    def __init__(self, connection, sender_email, sender_id, batch_size=DELIVERY_BATCH_SIZE,
+                 max_attempts=MAX_DELIVERY_ATTEMPTS):
+        self.connection = connection
+        self.sender_email = sender_email
+        self.sender_id = sender_id
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+
+    def _deliver(self, delivery):
+        try:
+            message = build_message(self.sender_email, delivery.email, delivery.attachment_path,
+                                    delivery.task_type)
+            self.connection.send(message)
+        except Exception as e:
+            attempts = delivery.attempts + 1
+            if isinstance(e, PERMANENT_ERRORS) or attempts >= self.max_attempts:
+                logging.error("Giving up on results email for request %s after %d attempts: %s",
+                              delivery.user_id, attempts, e)
+                next_attempt_at = None
+            else:
+                delay = retry_delay(attempts)
+                logging.warning("Results email for request %s failed, retrying in %ds: %s",
+                                delivery.user_id, delay, e)
+                next_attempt_at = time.time() + delay
+            if not isinstance(e, smtplib.SMTPResponseException):
+                # The connection may be unusable, so start from a fresh one
+                self.connection.close()
+            database.record_delivery_failure(delivery.id, str(e), next_attempt_at)
+            return False
+
+        database.mark_delivery_sent(delivery.id)
+        logging.info("Sent results email for request %s", delivery.user_id)
+        return True
+
+    def send_batch(self):
+        """
+        Claims and sends one batch of due deliveries.
+
+        Returns:
+            int: The number of deliveries attempted.
+        """
+        deliveries = database.claim_deliveries(self.sender_id, self.batch_size)
+        for delivery in deliveries:
+            self._deliver(delivery)
+        return len(deliveries)
+
+    def drain(self):
+        """
+        Sends batches until no delivery is due.
+
+        Returns:
+            int: The number of deliveries attempted.
+        """
+        attempted = 0
+        while True:
+            batch_attempted = self.send_batch()
+            if not batch_attempted:
+                return attempted
+            attempted += batch_attempted
+
+    def run(self, poll_interval, stop_event):
+        """
+        Sends deliveries as they become due until stop_event is set.
+
+        The connection is closed while the queue is empty, since servers drop idle
+        connections, and reopened for the next delivery.
+
+        Args:
+            poll_interval (float): Seconds to wait between checks for due deliveries.
+            stop_event (threading.Event): Event that stops the sender when set.
+        """
+        while not stop_event.is_set():
+            try:
+                self.drain()
+            except Exception as e:
+                logging.error("Error sending queued emails: %s", e)
+            self.connection.close()
+            stop_event.wait(poll_interval)
@@ -0,0 +1,125 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+
+import joblib
+import sklearn
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Bump when the stored evaluation or the way baselines are trained changes
+CACHE_FORMAT_VERSION = 4
+
+# Evaluation entries that depend on the request rather than on the trained model
+REQUEST_SPECIFIC_KEYS = ['y_test', 'task_type']
+
+
+class BaselineCache:
+    """
+    On-disk cache of trained baseline models and their evaluations.
+
+    Entries are keyed by the content hashes of the training and test sets, the task
+    type, the model name and its hyperparameters, so requests submitting different
+    user models against the same datasets reuse the baselines trained for earlier ones.
+
+    Attributes:
+        cache_dir (str): The directory where cached baselines are stored.
+    """
+
+    def __init__(self, cache_dir):
+        """
+        Initializes the BaselineCache with the directory to store entries in.
+
+        Args:
+            cache_dir (str): The directory where cached baselines are stored.
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(dataset_hashes, task_type, model_name, params, sparse_features=False,
+                 loading_mode='default'):
+        """
+        Builds the cache key of a baseline model.
+
+        Args:
+            dataset_hashes (dict): Content hashes of the 'train' and 'test' datasets.
+            task_type (str): The type of the task.
+            model_name (str): The name of the model in the registry.
+            params (dict): The hyperparameters the model is constructed with.
+            sparse_features (bool, optional): Whether the model was trained on the sparse
+                feature matrix, which is preprocessed differently.
+            loading_mode (str, optional): How the datasets were parsed, 'default' or 'lean';
+                lean loading downcasts the features the model is fitted on.
+
+        Returns:
+            str: The cache key.
+        """
+        key_fields = {
+            'version': CACHE_FORMAT_VERSION,
+            'sklearn': sklearn.__version__,
+            'train': dataset_hashes['train'],
+            'test': dataset_hashes['test'],
+            'task_type': task_type,
+            'model_name': model_name,
+            'params': params,
+            'sparse_features': sparse_features,
+            'loading_mode': loading_mode,
+        }
+        serialized = json.dumps(key_fields, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode()).hexdigest()
+
+    def load(self, key):
+        """
+        Loads a cached baseline.
+
+        Args:
+            key (str): The cache key returned by make_key.
+
+        Returns:
+            tuple or None: (model_path, evaluation) with the path of the persisted fitted
+            model and its evaluation without the request-specific entries, or None if
+            the baseline is not cached.
+        """
+        entry_path = os.path.join(self.cache_dir, key)
+        model_path = os.path.join(entry_path, 'model.joblib')
+        evaluation_path = os.path.join(entry_path, 'evaluation.joblib')
+        if not (os.path.exists(model_path) and os.path.exists(evaluation_path)):
+            return None
+
+        try:
+            evaluation = joblib.load(evaluation_path)
+        except Exception as e:
+            logging.warning("Ignoring unreadable baseline cache entry %s: %s", entry_path, e)
+            return None
+        return model_path, evaluation
+
+    def store(self, key, model_path, evaluation):
+        """
+        Stores a trained baseline and its evaluation.
+
+        Args:
+            key (str): The cache key returned by make_key.
+            model_path (str): Path of the persisted fitted model.
+            evaluation (dict): The evaluation scores of the model.
+        """
+        entry_path = os.path.join(self.cache_dir, key)
+        if os.path.exists(entry_path):
+            return
+
+        temp_path = tempfile.mkdtemp(dir=self.cache_dir)
+        try:
+            shutil.copyfile(model_path, os.path.join(temp_path, 'model.joblib'))
+            cached_evaluation = {k: v for k, v in evaluation.items() if k not in REQUEST_SPECIFIC_KEYS}
+            joblib.dump(cached_evaluation, os.path.join(temp_path, 'evaluation.joblib'))
+            os.rename(temp_path, entry_path)
+        except OSError as e:
+            # Another worker may have stored the same baseline in the meantime
+            logging.warning("Could not store baseline %s in cache: %s", key, e)
+        finally:
+            if os.path.exists(temp_path):
+                shutil.rmtree(temp_path, ignore_errors=True)
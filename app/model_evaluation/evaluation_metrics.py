@@ -1,23 +1,453 @@
 import logging
+from abc import ABC, abstractmethod
+
+import numpy as np
 from sklearn.metrics import (
     accuracy_score, precision_score, recall_score, f1_score,
     mean_squared_error, mean_absolute_error, r2_score
 )
 
+from app.instrumentation import stage
+
 # Configure logging
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
 
+# Integer labels spanning at most this many values are counted directly instead of sorted
+MAX_DIRECT_LABEL_RANGE = 1 << 16
+
+# Maximum number of vertices kept per ROC or precision-recall curve
+MAX_CURVE_POINTS = 512
+
+
+def _label_kinds(values):
+    """Returns the kinds of labels ('string' or 'number') an array holds."""
+    if len(values) == 0:
+        return set()
+    if values.dtype.kind in 'US':
+        return {'string'}
+    if values.dtype != object:
+        return {'number'}
+    return {'string' if isinstance(label, str) else 'number' for label in set(values.tolist())}
+
+
+def _check_label_kinds(*label_arrays):
+    """Raises ValueError if string and numeric labels are mixed, as sklearn's unique_labels does."""
+    kinds = set().union(*(_label_kinds(labels) for labels in label_arrays))
+    if len(kinds) > 1:
+        raise ValueError('Mix of label input types (string and number)')
+
+
+def classification_statistics(y_true, y_pred):
+    """
+    Builds the confusion matrix of a set of predictions in a single pass.
+
+    Labels are the sorted union of the true and predicted labels, as in sklearn.
+
+    Args:
+        y_true (array-like): True labels.
+        y_pred (array-like): Predicted labels.
+
+    Returns:
+        tuple: (labels, confusion) where confusion[i, j] counts the samples with
+        true label labels[i] that were predicted as labels[j].
+
+    Raises:
+        ValueError: If y_true and y_pred have different lengths, or mix string and
+            numeric labels.
+    """
+    y_true = np.asarray(y_true).ravel()
+    y_pred = np.asarray(y_pred).ravel()
+    if y_true.shape != y_pred.shape:
+        raise ValueError(f'Found inconsistent numbers of samples: {len(y_true)}, {len(y_pred)}')
+    # np.concatenate would turn numbers into strings, which could then match string labels
+    _check_label_kinds(y_true, y_pred)
+
+    integer_labels = all(np.issubdtype(values.dtype, np.integer) or values.dtype == bool
+                         for values in (y_true, y_pred))
+    if integer_labels and len(y_true):
+        low = min(y_true.min(), y_pred.min())
+        high = max(y_true.max(), y_pred.max())
+        label_range = int(high) - int(low) + 1
+        if label_range <= MAX_DIRECT_LABEL_RANGE:
+            # Count offsets directly and drop the labels that never occur
+            true_codes = y_true.astype(np.int64) - int(low)
+            pred_codes = y_pred.astype(np.int64) - int(low)
+            confusion = np.bincount(true_codes * label_range + pred_codes,
+                                    minlength=label_range * label_range)
+            confusion = confusion.reshape(label_range, label_range)
+            present = np.flatnonzero(confusion.sum(axis=0) + confusion.sum(axis=1))
+            labels = (present + int(low)).astype(np.result_type(y_true, y_pred))
+            return labels, confusion[np.ix_(present, present)]
+
+    labels, codes = np.unique(np.concatenate((y_true, y_pred)), return_inverse=True)
+    num_labels = len(labels)
+    codes = codes.ravel()
+    confusion = np.bincount(codes[:len(y_true)] * num_labels + codes[len(y_true):],
+                            minlength=num_labels * num_labels)
+    return labels, confusion.reshape(num_labels, num_labels)
+
+
+def regression_statistics(y_true, y_pred):
+    """
+    Reduces a set of predictions to the sums every regression metric is derived from.
+
+    Args:
+        y_true (array-like): True values.
+        y_pred (array-like): Predicted values.
+
+    Returns:
+        dict: The number of samples, the sums of absolute and squared residuals, and
+        the mean and sum of squared deviations of the true values.
+
+    Raises:
+        ValueError: If y_true and y_pred have different lengths.
+    """
+    y_true = np.asarray(y_true, dtype=np.float64).ravel()
+    y_pred = np.asarray(y_pred, dtype=np.float64).ravel()
+    if y_true.shape != y_pred.shape:
+        raise ValueError(f'Found inconsistent numbers of samples: {len(y_true)}, {len(y_pred)}')
+
+    residuals = y_true - y_pred
+    y_mean = y_true.mean() if len(y_true) else 0.0
+    deviations = y_true - y_mean
+    return {
+        'count': len(y_true),
+        'absolute_error_sum': float(np.abs(residuals).sum()),
+        'squared_error_sum': float(np.dot(residuals, residuals)),
+        'y_mean': float(y_mean),
+        'y_squared_deviation_sum': float(np.dot(deviations, deviations)),
+    }
+
+
+def _weighted_average(per_class_scores, confusion):
+    """Averages per-class scores weighted by class support, as sklearn's 'weighted' average."""
+    support = confusion.sum(axis=1)
+    if support.sum() == 0:
+        return 0.0
+    return float(np.average(per_class_scores, weights=support))
+
+
+def _safe_divide(numerator, denominator):
+    """Divides element-wise, returning 0 where the denominator is 0 (zero_division=0)."""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    result = np.zeros_like(numerator)
+    np.divide(numerator, denominator, out=result, where=denominator != 0)
+    return result
+
+
+def _accuracy(statistics):
+    _, confusion = statistics
+    total = confusion.sum()
+    return float(np.trace(confusion) / total) if total else 0.0
+
+
+def _weighted_precision(statistics):
+    _, confusion = statistics
+    return _weighted_average(_safe_divide(np.diag(confusion), confusion.sum(axis=0)), confusion)
+
+
+def _weighted_recall(statistics):
+    _, confusion = statistics
+    return _weighted_average(_safe_divide(np.diag(confusion), confusion.sum(axis=1)), confusion)
+
+
+def _weighted_f1_score(statistics):
+    _, confusion = statistics
+    f1_scores = _safe_divide(2 * np.diag(confusion), confusion.sum(axis=0) + confusion.sum(axis=1))
+    return _weighted_average(f1_scores, confusion)
+
+
+def _mean_absolute_error(statistics):
+    return statistics['absolute_error_sum'] / statistics['count'] if statistics['count'] else float('nan')
+
+
+def _mean_squared_error(statistics):
+    return statistics['squared_error_sum'] / statistics['count'] if statistics['count'] else float('nan')
+
+
+def _r2_score(statistics):
+    if statistics['count'] < 2:
+        return float('nan')
+    if statistics['y_squared_deviation_sum'] == 0:
+        # Matches sklearn's force_finite behaviour for a constant target
+        return 1.0 if statistics['squared_error_sum'] == 0 else 0.0
+    return 1 - statistics['squared_error_sum'] / statistics['y_squared_deviation_sum']
+
+
+STATISTICS_FUNCTIONS = {
+    'classification': classification_statistics,
+    'regression': regression_statistics,
+}
+
+# Metrics derived from the statistics above instead of the raw predictions
+FUSED_METRIC_FUNCTIONS = {
+    'classification': {
+        'accuracy': _accuracy,
+        'precision': _weighted_precision,
+        'recall': _weighted_recall,
+        'f1_score': _weighted_f1_score,
+    },
+    'regression': {
+        'mae': _mean_absolute_error,
+        'mse': _mean_squared_error,
+        'r2_score': _r2_score,
+    }
+}
+
+
+def _thin_curve(x, y, max_points):
+    """
+    Returns indices of at most max_points vertices spread evenly along a curve.
+
+    The vertices are chosen by arc length, so steep and flat parts of the curve keep
+    the same resolution. The first and last vertices are always kept.
+    """
+    num_points = len(x)
+    if num_points <= max_points:
+        return np.arange(num_points)
+    arc_length = np.concatenate(([0.0], np.cumsum(np.hypot(np.diff(x), np.diff(y)))))
+    targets = np.linspace(0.0, arc_length[-1], max_points)
+    indices = np.searchsorted(arc_length, targets)
+    indices[-1] = num_points - 1
+    return np.unique(np.minimum(indices, num_points - 1))
+
+
+def binary_curves(y_true, y_scores, max_points=MAX_CURVE_POINTS):
+    """
+    Computes the ROC and precision-recall curves of a binary classifier in one pass.
+
+    The scores are sorted once and the true and false positive counts at every distinct
+    threshold are shared by both curves. The area under the ROC curve and the average
+    precision are computed on the full curves, which are then thinned to at most
+    max_points vertices for plotting. The larger of the two labels is the positive class,
+    matching the column of predict_proba the scores are taken from.
+
+    Args:
+        y_true (array-like): True labels.
+        y_scores (array-like): Scores of the positive class.
+        max_points (int, optional): The maximum number of vertices kept per curve.
+
+    Returns:
+        dict or None: 'roc_auc' and 'average_precision', the ROC curve as 'fpr' and
+        'tpr' and the precision-recall curve as 'precision' and 'recall', in the order
+        sklearn returns them. None if y_true does not hold exactly two classes.
+    """
+    y_true = np.asarray(y_true)
+    y_scores = np.asarray(y_scores, dtype=np.float64)
+    labels = np.unique(y_true)
+    if len(labels) != 2:
+        return None
+
+    order = np.argsort(y_scores, kind='mergesort')[::-1]
+    sorted_scores = y_scores[order]
+    positives = (y_true[order] == labels[1]).astype(np.float64)
+
+    # Last position of every distinct score, i.e. every threshold
+    threshold_indices = np.r_[np.flatnonzero(np.diff(sorted_scores)), len(sorted_scores) - 1]
+    tps = np.cumsum(positives)[threshold_indices]
+    fps = threshold_indices + 1 - tps
+
+    fpr = np.r_[0.0, fps / fps[-1]]
+    tpr = np.r_[0.0, tps / tps[-1]]
+    roc_auc = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1])) / 2)
+
+    precision = tps / (tps + fps)
+    recall = tps / tps[-1]
+    average_precision = float(np.sum(np.diff(np.r_[0.0, recall]) * precision))
+
+    # Order by decreasing recall and end at (recall 0, precision 1) like sklearn
+    precision = np.r_[precision[::-1], 1.0]
+    recall = np.r_[recall[::-1], 0.0]
+
+    roc_indices = _thin_curve(fpr, tpr, max_points)
+    pr_indices = _thin_curve(recall, precision, max_points)
+    return {
+        'roc_auc': roc_auc,
+        'average_precision': average_precision,
+        'fpr': fpr[roc_indices],
+        'tpr': tpr[roc_indices],
+        'precision': precision[pr_indices],
+        'recall': recall[pr_indices],
+    }
+
+
+class MetricsAccumulator(ABC):
+    """
+    Base class for metrics computed incrementally over batches of predictions.
+
+    Accumulators only keep the statistics the metrics are derived from, so test sets
+    larger than memory can be scored chunk by chunk, and accumulators filled from
+    separate shards can be merged into one.
+
+    Attributes:
+        metric_functions (dict): Metric names mapped to functions of the statistics.
+    """
+
+    def __init__(self, metric_functions):
+        """
+        Initializes the accumulator with the metrics it reports.
+
+        Args:
+            metric_functions (dict): Metric names mapped to functions of the statistics.
+        """
+        self.metric_functions = metric_functions
+
+    @property
+    @abstractmethod
+    def statistics(self):
+        """The statistics accumulated so far."""
+
+    @abstractmethod
+    def _combine(self, statistics):
+        """Adds a set of statistics to the accumulated ones."""
+
+    @abstractmethod
+    def _compute_statistics(self, y_true, y_pred):
+        """Computes the statistics of a single batch."""
+
+    def update(self, y_true_batch, y_pred_batch):
+        """
+        Adds a batch of predictions.
+
+        Args:
+            y_true_batch (array-like): True labels or values of the batch.
+            y_pred_batch (array-like): Predicted labels or values of the batch.
+
+        Returns:
+            MetricsAccumulator: The accumulator itself.
+        """
+        self._combine(self._compute_statistics(y_true_batch, y_pred_batch))
+        return self
+
+    def merge(self, other):
+        """
+        Adds the statistics of another accumulator of the same type.
+
+        Args:
+            other (MetricsAccumulator): The accumulator to merge into this one.
+
+        Returns:
+            MetricsAccumulator: The accumulator itself.
+
+        Raises:
+            ValueError: If the accumulators are for different task types.
+        """
+        if type(other) is not type(self):
+            raise ValueError(f'Cannot merge {type(other).__name__} into {type(self).__name__}')
+        self._combine(other.statistics)
+        return self
+
+    def result(self):
+        """
+        Calculates the metrics over every batch seen so far.
+
+        Returns:
+            dict: A dictionary of calculated metrics.
+        """
+        statistics = self.statistics
+        return {metric_name: func(statistics) for metric_name, func in self.metric_functions.items()}
+
+
+class ClassificationAccumulator(MetricsAccumulator):
+    """Accumulates the confusion matrix of classification predictions."""
+
+    def __init__(self, metric_functions):
+        super().__init__(metric_functions)
+        self.labels = None
+        self.confusion = np.zeros((0, 0), dtype=np.int64)
+
+    @property
+    def statistics(self):
+        labels = self.labels if self.labels is not None else np.array([])
+        return labels, self.confusion
+
+    def _compute_statistics(self, y_true, y_pred):
+        return classification_statistics(y_true, y_pred)
+
+    def _combine(self, statistics):
+        labels, confusion = statistics
+        if self.labels is None:
+            self.labels = np.array(labels)
+            self.confusion = np.array(confusion, dtype=np.int64)
+            return
+
+        _check_label_kinds(self.labels, np.asarray(labels))
+        # Expand both matrices onto the union of their labels before adding them
+        all_labels = np.union1d(self.labels, labels)
+        combined = np.zeros((len(all_labels), len(all_labels)), dtype=np.int64)
+        for part_labels, part_confusion in ((self.labels, self.confusion), (labels, confusion)):
+            positions = np.searchsorted(all_labels, part_labels)
+            combined[np.ix_(positions, positions)] += part_confusion
+        self.labels = all_labels
+        self.confusion = combined
+
+
+class RegressionAccumulator(MetricsAccumulator):
+    """Accumulates residual sums and running moments of regression predictions."""
+
+    def __init__(self, metric_functions):
+        super().__init__(metric_functions)
+        self._statistics = {
+            'count': 0,
+            'absolute_error_sum': 0.0,
+            'squared_error_sum': 0.0,
+            'y_mean': 0.0,
+            'y_squared_deviation_sum': 0.0,
+        }
+
+    @property
+    def statistics(self):
+        return dict(self._statistics)
+
+    def _compute_statistics(self, y_true, y_pred):
+        return regression_statistics(y_true, y_pred)
+
+    def _combine(self, statistics):
+        if statistics['count'] == 0:
+            return
+        current = self._statistics
+        count = current['count'] + statistics['count']
+
+        # Pairwise update of the mean and squared deviations (Chan et al.)
+        delta = statistics['y_mean'] - current['y_mean']
+        self._statistics = {
+            'count': count,
+            'absolute_error_sum': current['absolute_error_sum'] + statistics['absolute_error_sum'],
+            'squared_error_sum': current['squared_error_sum'] + statistics['squared_error_sum'],
+            'y_mean': current['y_mean'] + delta * statistics['count'] / count,
+            'y_squared_deviation_sum': (current['y_squared_deviation_sum']
+                                        + statistics['y_squared_deviation_sum']
+                                        + delta ** 2 * current['count'] * statistics['count'] / count),
+        }
+
+
+ACCUMULATOR_CLASSES = {
+    'classification': ClassificationAccumulator,
+    'regression': RegressionAccumulator,
+}
+
+
 class MetricsEvaluator:
     """
     Class for handling the calculation of various evaluation metrics for machine learning models.
     """
 
-    def __init__(self):
+    def __init__(self, fused=True):
         """
         Initializes the MetricsEvaluator class with predefined evaluation functions.
+
+        Args:
+            fused (bool, optional): Whether to derive the metrics from a single confusion
+                matrix or residual vector per call. Metrics without a fused implementation,
+                and every metric when False, are computed with their sklearn function.
         """
+        self.fused = fused
+        self.statistics_functions = dict(STATISTICS_FUNCTIONS)
+        self.fused_functions = {task_type: dict(functions)
+                                for task_type, functions in FUSED_METRIC_FUNCTIONS.items()}
         self.evaluation_functions = {
             'classification': {
                 'accuracy': accuracy_score,
@@ -55,12 +485,73 @@ class MetricsEvaluator:
             logging.error('Invalid task type provided: %s', task_type)
             raise ValueError(f'Invalid task type: {task_type}')
 
+        fused_functions = self.fused_functions.get(task_type, {}) if self.fused else {}
+        statistics = None
+
         scores = {}
         try:
-            for metric_name, func in self.evaluation_functions[task_type].items():
-                scores[metric_name] = func(y_true, y_pred)
+            with stage('metrics'):
+                for metric_name, func in self.evaluation_functions[task_type].items():
+                    if metric_name in fused_functions:
+                        if statistics is None:
+                            statistics = self.statistics_functions[task_type](y_true, y_pred)
+                        scores[metric_name] = fused_functions[metric_name](statistics)
+                    else:
+                        scores[metric_name] = func(y_true, y_pred)
         except Exception as e:
             logging.error('Error calculating metrics: %s', e)
             raise
 
         return scores
+
+    def calculate_curves(self, task_type, y_true, y_scores):
+        """
+        Calculates the score-based metrics and curves of a binary classifier.
+
+        Args:
+            task_type (str): The type of the task ('classification' or 'regression').
+            y_true (array-like): True labels.
+            y_scores (array-like or None): Scores of the positive class.
+
+        Returns:
+            tuple: (metrics, curves) where metrics holds 'roc_auc' and 'average_precision'
+            and curves the thinned curves returned by binary_curves. Both are empty for
+            regression, multiclass tasks or models without scores.
+        """
+        if task_type != 'classification' or y_scores is None:
+            return {}, {}
+
+        with stage('curves'):
+            curves = binary_curves(y_true, y_scores)
+        if curves is None:
+            return {}, {}
+
+        metrics = {name: curves.pop(name) for name in ['roc_auc', 'average_precision']}
+        return metrics, curves
+
+    def create_accumulator(self, task_type):
+        """
+        Creates an accumulator computing the same metrics as calculate_metrics incrementally.
+
+        Args:
+            task_type (str): The type of the task ('classification' or 'regression').
+
+        Returns:
+            MetricsAccumulator: An empty accumulator for the task type.
+
+        Raises:
+            ValueError: If an invalid task type is provided, or a registered metric
+                cannot be derived from accumulated statistics.
+        """
+        if task_type not in self.evaluation_functions:
+            logging.error('Invalid task type provided: %s', task_type)
+            raise ValueError(f'Invalid task type: {task_type}')
+
+        fused_functions = self.fused_functions.get(task_type, {})
+        metric_functions = {}
+        for metric_name in self.evaluation_functions[task_type]:
+            if metric_name not in fused_functions:
+                raise ValueError(f'Metric {metric_name} cannot be computed incrementally')
+            metric_functions[metric_name] = fused_functions[metric_name]
+
+        return ACCUMULATOR_CLASSES[task_type](metric_functions)
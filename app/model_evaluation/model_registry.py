@@ -3,11 +3,14 @@ import logging
 from sklearn.linear_model import LogisticRegression, LinearRegression, Lasso
 from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
 from sklearn.ensemble import RandomForestClassifier, AdaBoostClassifier, RandomForestRegressor, GradientBoostingRegressor
-from keras.models import Sequential
-from keras.layers import Dense
 
 class ShallowNeuralNetwork:
-    """Class to create a simple shallow neural network for classification."""
+    """
+    Class to create a simple shallow neural network for classification.
+
+    Keras is imported when a network is created rather than with this module, so
+    TensorFlow is only loaded by jobs that actually train a network.
+    """
 
     @staticmethod
     def create_classification(input_shape, **kwargs):
@@ -20,6 +23,9 @@ class ShallowNeuralNetwork:
         Returns:
             keras.models.Sequential: A compiled Keras sequential model.
         """
+        from keras.models import Sequential
+        from keras.layers import Dense
+
         try:
             model = Sequential()
             model.add(Dense(10, activation='relu', input_shape=input_shape))
@@ -44,6 +50,9 @@ class ShallowNeuralNetwork:
         Returns:
             keras.models.Sequential: A compiled Keras sequential model.
         """
+        from keras.models import Sequential
+        from keras.layers import Dense
+
         try:
             model = Sequential()
             model.add(Dense(10, activation='relu', input_shape=input_shape))
@@ -74,3 +83,12 @@ REGRESSION_MODELS = {
     'GradientBoosting_Regression': GradientBoostingRegressor,
     'ShallowNN_Regression': ShallowNeuralNetwork.create_regression,
 }
+
+# Models whose predict() returns the class with the highest predict_proba(), so
+# labels and scores can both be taken from a single predict_proba() call
+PROBA_CONSISTENT_MODELS = (
+    LogisticRegression,
+    DecisionTreeClassifier,
+    RandomForestClassifier,
+    AdaBoostClassifier,
+)
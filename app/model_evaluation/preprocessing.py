@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer, make_column_selector
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, MaxAbsScaler, OneHotEncoder, StandardScaler
+
+# Distinct values of a categorical column encoded as their own indicator; rarer ones share one
+MAX_ONE_HOT_CATEGORIES = 20
+
+
+def build_preprocessor(sparse_input=False):
+    """
+    Creates the unfitted preprocessing shared by the baseline models.
+
+    Numeric columns have missing values replaced by the column median and are
+    standardized, which scale-sensitive models such as LogisticRegression and Lasso
+    need to converge. All other columns (strings, categoricals) have missing values
+    replaced by the most frequent value and are one-hot encoded, with values beyond
+    the MAX_ONE_HOT_CATEGORIES most frequent ones and unseen values sharing an
+    indicator. Boolean columns are encoded the same way in a branch of their own,
+    cast to floats first since SimpleImputer rejects bool arrays.
+
+    Sparse feature matrices, which are all numeric, have their explicitly stored
+    missing values imputed and are scaled by their maximum absolute value instead,
+    which keeps the zeros unstored.
+
+    Args:
+        sparse_input (bool, optional): Whether the features are a scipy sparse matrix.
+
+    Returns:
+        sklearn.base.TransformerMixin: The preprocessing, to be fitted on the training set.
+    """
+    if sparse_input:
+        return Pipeline([
+            ('impute', SimpleImputer(strategy='median')),
+            ('scale', MaxAbsScaler()),
+        ])
+    numeric = Pipeline([
+        ('impute', SimpleImputer(strategy='median')),
+        ('scale', StandardScaler()),
+    ])
+    categorical = Pipeline([
+        ('impute', SimpleImputer(strategy='most_frequent')),
+        ('encode', OneHotEncoder(handle_unknown='infrequent_if_exist', max_categories=MAX_ONE_HOT_CATEGORIES,
+                                 sparse_output=False)),
+    ])
+    boolean = Pipeline([
+        # Nullable booleans become NaN where they are missing
+        ('cast', FunctionTransformer(pd.DataFrame.astype, kw_args={'dtype': float})),
+        ('impute', SimpleImputer(strategy='most_frequent')),
+        ('encode', OneHotEncoder(handle_unknown='ignore', sparse_output=False)),
+    ])
+    return ColumnTransformer([
+        ('numeric', numeric, make_column_selector(dtype_include=np.number)),
+        ('boolean', boolean, make_column_selector(dtype_include=bool)),
+        ('categorical', categorical, make_column_selector(dtype_exclude=[np.number, bool])),
+    ])
@@ -1,11 +1,35 @@
 import os
+import sys
+import shutil
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 import joblib
+import numpy as np
 import pandas as pd
-import keras
+from scipy import sparse
+from sklearn.pipeline import Pipeline
 
 import app.utils as utils
+from app.data_management.dataset_loader import SPARSE_DENSITY_THRESHOLD, is_sparse_csv, load_lean_csv, load_sparse_csv
+from app import instrumentation
 from . import model_registry
 from . import evaluation_metrics as em
+from . import preprocessing
+from .results import EvaluationResults
+
+# Values of a sparse test set densified at once for models that do not accept sparse input
+DENSE_BATCH_CELLS = 10_000_000
+
+
+def _is_keras_sequential(model):
+    """
+    Checks whether a model is a Keras Sequential model without importing Keras.
+
+    A Keras model can only exist once Keras has been imported, either by the
+    registry or by unpickling a user model, so Keras is never loaded just to check.
+    """
+    keras = sys.modules.get('keras')
+    return keras is not None and isinstance(model, keras.models.Sequential)
 
 
 class RequestProcessor:
@@ -17,9 +41,30 @@ class RequestProcessor:
         request (Request): The request object containing details like task type and user information.
         s3_client (boto3.client): The S3 client for interacting with AWS S3.
         save_path (str): The directory path where trained models and results will be saved.
+        n_jobs (int): The number of worker processes used to train the baseline models.
+        dataset_cache (DatasetCache): Cache of parsed datasets, or None to always parse.
+        predict_batch_size (int): The number of test rows passed to a model per predict call.
+        baseline_cache (BaselineCache): Cache of trained baselines, or None to always train.
+        lean_loading (bool): Whether datasets are loaded with downcast dtypes and categoricals.
+        dataset_memory (dict): Bytes used by each dataset loaded in lean mode and by its
+            default representation, keyed by file type.
+        sparse_density_threshold (float): The highest fraction of non-zero feature values
+            of a dataset loaded as a sparse matrix, or None to always load densely.
+        sparse_features (bool): Whether the features are held as CSR matrices, or None
+            until the first dataset is loaded; both datasets share the representation.
+        feature_names (list of str): The names of the sparse features, used when a
+            model needs them densified.
+        preprocessor (ColumnTransformer): The preprocessing fitted on the training set
+            and shared by the baselines, or None until preprocess_features is called.
+        dataset_hashes (dict): Content hashes of the loaded datasets, keyed by file type.
+        dataset_key (str): The leaderboard key of the request's datasets, set by
+            download_inputs, or None before.
+        downloaded_files (set): Names of the files already downloaded for this request.
     """
 
-    def __init__(self, request, s3_client, save_path):
+    def __init__(self, request, s3_client, save_path, n_jobs=1, dataset_cache=None,
+                 predict_batch_size=100_000, baseline_cache=None, lean_loading=False,
+                 sparse_density_threshold=SPARSE_DENSITY_THRESHOLD):
         """
         Initializes the RequestProcessor with a request, S3 client, and save path.
 
@@ -27,36 +72,181 @@ class RequestProcessor:
             request (Request): The request object.
             s3_client (boto3.client): The S3 client.
             save_path (str): The path where models and results are to be saved.
+            n_jobs (int, optional): The maximum number of processes used to train and
+                evaluate the baseline models. 1 trains them serially in this process,
+                -1 uses one process per CPU core.
+            dataset_cache (DatasetCache, optional): Cache of parsed datasets keyed by
+                their content hash. Cached datasets skip both the download and the parse.
+            predict_batch_size (int, optional): The number of test rows passed to a model
+                per predict call, which bounds the memory used by inference. None predicts
+                the whole test set at once.
+            baseline_cache (BaselineCache, optional): Cache of trained baseline models and
+                their evaluations. Cached baselines are reused instead of retrained.
+            lean_loading (bool, optional): Whether to load datasets with load_lean_csv,
+                which stores numeric columns at the smallest lossless dtype and
+                low-cardinality strings as categoricals, at the cost of a second parse.
+            sparse_density_threshold (float, optional): Datasets whose numeric features
+                have at most this fraction of non-zero values are loaded as CSR matrices
+                with load_sparse_csv, which takes precedence over lean loading. None
+                disables sparse loading.
         """
         self.request = request
         self.s3_client = s3_client
         self.save_path = save_path
         self.user_id = request.user_id
+        self.n_jobs = n_jobs
+        self.dataset_cache = dataset_cache
+        self.predict_batch_size = predict_batch_size
+        self.baseline_cache = baseline_cache
+        self.lean_loading = lean_loading
+        self.dataset_memory = {}
+        self.sparse_density_threshold = sparse_density_threshold
+        self.sparse_features = None
+        self.feature_names = None
+        self.preprocessor = None
+        self.dataset_hashes = {}
+        self.dataset_key = None
+        self.downloaded_files = set()
+
+    @property
+    def loading_mode(self):
+        """How datasets are parsed, which keys their dataset and baseline cache entries."""
+        return 'lean' if self.lean_loading else 'default'
+
+    def __getstate__(self):
+        # The S3 client holds sockets and locks; worker processes only train and
+        # evaluate, so it is left behind when the processor is sent to a pool.
+        state = self.__dict__.copy()
+        state['s3_client'] = None
+        return state
+
+    def _get_user_model_path(self):
+        """Returns the local path of the user's model."""
+        return os.path.join(self.save_path, "user_model.joblib")
+
+    def _get_dataset_path(self, file_type):
+        """Returns the local path of a dataset."""
+        return os.path.join(self.save_path, f"{file_type}.csv")
+
+    def _get_dataset_hash(self, file_type):
+        """Returns the content hash of a dataset, looking it up in S3 on first use."""
+        if file_type not in self.dataset_hashes:
+            dataset_file_name = f"{self.user_id}_{file_type}"
+            self.dataset_hashes[file_type] = self.s3_client.get_content_hash(dataset_file_name)
+        return self.dataset_hashes[file_type]
+
+    def get_dataset_key(self):
+        """
+        Returns a key identifying the request's training and test sets by content.
+
+        Requests evaluated on the same datasets share the key, which groups their
+        results into one leaderboard.
+        """
+        hashes = [self._get_dataset_hash(file_type) for file_type in ['train', 'test']]
+        return hashlib.sha256('\n'.join(hashes).encode()).hexdigest()
+
+    def download_inputs(self):
+        """
+        Downloads the user's model and every dataset missing from the dataset cache.
+
+        The files are fetched concurrently, so the request's inputs arrive in roughly
+        the time of the largest one. load_user_model and load_dataset then use the
+        local copies instead of downloading again. The datasets' content hashes are
+        looked up first and the dataset key is kept in self.dataset_key, so no S3 call
+        is left for after the evaluation.
+        """
+        self.dataset_key = self.get_dataset_key()
+
+        downloads = {f"{self.user_id}_model": self._get_user_model_path()}
+        for file_type in ['train', 'test']:
+            cached = (self.dataset_cache is not None
+                      and self.dataset_cache.contains(self._get_dataset_hash(file_type), self.loading_mode))
+            if not cached:
+                downloads[f"{self.user_id}_{file_type}"] = self._get_dataset_path(file_type)
+
+        with instrumentation.stage('download'):
+            self.s3_client.download_files(downloads)
+        self.downloaded_files.update(downloads)
+
+    def _download(self, file_name, local_path):
+        """Downloads a file unless download_inputs already fetched it."""
+        if file_name not in self.downloaded_files:
+            self.s3_client.download_file(file_name, local_path)
+            self.downloaded_files.add(file_name)
 
     def load_user_model(self):
         model_file_name = f"{self.user_id}_model"
-        model_local_path = os.path.join(self.save_path, "user_model.joblib")
+        model_local_path = self._get_user_model_path()
 
-        self.s3_client.download_file(model_file_name, model_local_path)
-        
-        model = joblib.load(model_local_path)
+        with instrumentation.stage('load_user_model'):
+            self._download(model_file_name, model_local_path)
+
+            model = joblib.load(model_local_path)
         return model
 
     def load_dataset(self, file_type):
         """
-        Loads the dataset from S3.
+        Loads the dataset from S3, or from the dataset cache when it has been seen before.
         """
+        with instrumentation.stage('load_dataset', file_type=file_type):
+            return self._load_dataset(file_type)
+
+    def _load_dataset(self, file_type):
         dataset_file_name = f"{self.user_id}_{file_type}"
-        dataset_local_path = os.path.join(self.save_path, f"{file_type}.csv")
+        dataset_local_path = self._get_dataset_path(file_type)
 
-        self.s3_client.download_file(dataset_file_name, dataset_local_path)
+        content_hash = None
+        if self.dataset_cache is not None or self.baseline_cache is not None:
+            content_hash = self._get_dataset_hash(file_type)
+        if self.dataset_cache is not None:
+            cached_dataset = self.dataset_cache.load(content_hash, self.loading_mode)
+            if cached_dataset is not None:
+                is_sparse = sparse.issparse(cached_dataset[0])
+                if self.sparse_features is None:
+                    self.sparse_features = is_sparse
+                # A dataset cached in the other representation is parsed again
+                if is_sparse == self.sparse_features:
+                    if is_sparse:
+                        self.feature_names = self.dataset_cache.feature_names(content_hash, self.loading_mode)
+                    else:
+                        memory = self.dataset_cache.memory_usage(content_hash, self.loading_mode)
+                        if memory is not None:
+                            self._report_memory(file_type, memory)
+                    return cached_dataset
 
-        dataset = pd.read_csv(dataset_local_path)
+        self._download(dataset_file_name, dataset_local_path)
 
-        X = dataset.iloc[:, :-1]
-        y = dataset.iloc[:, -1]
+        if self.sparse_features is None:
+            self.sparse_features = bool(self.sparse_density_threshold) and \
+                is_sparse_csv(dataset_local_path, self.sparse_density_threshold)
+
+        if self.sparse_features:
+            X, y, self.feature_names = load_sparse_csv(dataset_local_path)
+            density = X.nnz / (X.shape[0] * X.shape[1]) if X.shape[0] and X.shape[1] else 0
+            print(f"Loaded {file_type} set as a sparse matrix with {X.nnz} stored values ({density:.1%} dense)")
+        elif self.lean_loading:
+            X, y, memory = load_lean_csv(dataset_local_path)
+            self._report_memory(file_type, memory)
+        else:
+            dataset = pd.read_csv(dataset_local_path)
+
+            X = dataset.iloc[:, :-1]
+            y = dataset.iloc[:, -1]
+
+        if self.dataset_cache is not None:
+            self.dataset_cache.store(content_hash, X, y,
+                                     feature_names=self.feature_names if self.sparse_features else None,
+                                     loading_mode=self.loading_mode,
+                                     memory=self.dataset_memory.get(file_type))
         return X, y
 
+    def _report_memory(self, file_type, memory):
+        """Records and prints the memory saved by loading a dataset in lean mode."""
+        self.dataset_memory[file_type] = memory
+        saved = 1 - memory['lean_bytes'] / memory['default_bytes'] if memory['default_bytes'] else 0
+        print(f"Loaded {file_type} set in {memory['lean_bytes'] / 2 ** 20:.1f} MB instead of "
+              f"{memory['default_bytes'] / 2 ** 20:.1f} MB ({saved:.0%} saved)")
+
     def train_model(self, model_name, model, X_train, y_train):
         """
         Trains the model.
@@ -68,7 +258,8 @@ class RequestProcessor:
             y_train (pd.Series): Training data labels.
         """
         print(f'Training {model_name}...')
-        model.fit(X_train, y_train)
+        with instrumentation.stage('train', model=model_name):
+            model.fit(X_train, y_train)
 
     def evaluate_model(self, model, X_test, y_test):
         """
@@ -83,15 +274,16 @@ class RequestProcessor:
             dict: A dictionary containing evaluation scores and additional model outputs.
         """
         evaluator = em.MetricsEvaluator()
-        
+        predictions, y_scores = self.predict_in_batches(model, X_test)
+
         evaluation_scores = {
             'y_test': y_test,
-            'predictions': model.predict(X_test),
-            'y_scores': model.predict_proba(X_test)[:, 1] if hasattr(model, 'predict_proba') else None,
+            'predictions': predictions,
+            'y_scores': y_scores,
             'task_type': self.request.task_type
         }
 
-        if evaluation_scores['task_type'] == 'classification' and isinstance(model, keras.models.Sequential):
+        if evaluation_scores['task_type'] == 'classification' and _is_keras_sequential(model):
             evaluation_scores['y_scores'] = evaluation_scores['predictions'].flatten()
             evaluation_scores['predictions'] = (evaluation_scores['y_scores'] > 0.5).astype(int)
 
@@ -99,8 +291,98 @@ class RequestProcessor:
                                                     y_test, evaluation_scores['predictions'])
         evaluation_scores.update(metrics_scores)
 
+        curve_scores, curves = evaluator.calculate_curves(self.request.task_type,
+                                                          y_test, evaluation_scores['y_scores'])
+        evaluation_scores.update(curve_scores)
+        if curves:
+            evaluation_scores['curves'] = curves
+
         return evaluation_scores
 
+    def predict_in_batches(self, model, X_test):
+        """
+        Predicts labels and scores for the test set in chunks of predict_batch_size rows.
+
+        Outputs are written into arrays allocated once for the whole test set, so memory
+        use beyond them does not grow with the number of rows. For models listed in
+        model_registry.PROBA_CONSISTENT_MODELS the labels are derived from the
+        probabilities, so each chunk only goes through the model once. Sparse test
+        sets are passed to the model as CSR chunks; if it rejects them, the chunks are
+        densified one at a time instead.
+
+        Args:
+            model: The trained machine learning model.
+            X_test (pd.DataFrame or scipy.sparse.csr_matrix): Test data features.
+
+        Returns:
+            tuple: (predictions, y_scores) where y_scores holds the probability of the
+            second class, or is None if the model does not provide probabilities.
+        """
+        num_rows = X_test.shape[0]
+        batch_size = self.predict_batch_size or num_rows
+        if num_rows == 0:
+            # sklearn models reject inputs without samples
+            return np.empty(0), None
+
+        has_proba = hasattr(model, 'predict_proba')
+        single_pass = isinstance(model, model_registry.PROBA_CONSISTENT_MODELS)
+
+        predictions = None
+        y_scores = None
+        densify = False
+        start = 0
+        while start < num_rows:
+            stop = min(start + batch_size, num_rows)
+            X_batch = X_test.iloc[start:stop] if hasattr(X_test, 'iloc') else X_test[start:stop]
+            if densify:
+                X_batch = self._densify(X_batch)
+
+            try:
+                batch_predictions, batch_scores = self._predict_batch(model, X_batch, has_proba, single_pass)
+            except (TypeError, ValueError):
+                if densify or not sparse.issparse(X_batch):
+                    raise
+                # The model does not accept sparse input: retry the chunk densified,
+                # in chunks small enough to keep the dense copy bounded
+                print("Model does not accept sparse input, densifying the test set chunk by chunk")
+                densify = True
+                batch_size = min(batch_size, max(1, DENSE_BATCH_CELLS // X_test.shape[1]))
+                continue
+
+            if predictions is None:
+                predictions = np.empty((num_rows,) + batch_predictions.shape[1:],
+                                       dtype=batch_predictions.dtype)
+                if batch_scores is not None:
+                    y_scores = np.empty(num_rows, dtype=np.float64)
+            elif not np.can_cast(batch_predictions.dtype, predictions.dtype):
+                # e.g. a later chunk predicting a longer string label
+                predictions = predictions.astype(np.result_type(predictions, batch_predictions))
+
+            predictions[start:stop] = batch_predictions
+            if y_scores is not None:
+                y_scores[start:stop] = batch_scores
+            start = stop
+
+        return predictions, y_scores
+
+    @staticmethod
+    def _predict_batch(model, X_batch, has_proba, single_pass):
+        """Returns the predictions and positive class scores (or None) of one chunk."""
+        if not has_proba:
+            return np.asarray(model.predict(X_batch)), None
+        probabilities = model.predict_proba(X_batch)
+        if single_pass:
+            batch_predictions = model.classes_[np.argmax(probabilities, axis=1)]
+        else:
+            batch_predictions = np.asarray(model.predict(X_batch))
+        return batch_predictions, probabilities[:, 1]
+
+    def _densify(self, X_batch):
+        """Converts a chunk of the sparse features to a DataFrame, named like the CSV columns."""
+        if self.feature_names is None or len(self.feature_names) != X_batch.shape[1]:
+            return X_batch.toarray()
+        return pd.DataFrame(X_batch.toarray(), columns=self.feature_names)
+
     def save_model(self, model, model_name):
         """
         Saves the model to disk.
@@ -109,19 +391,28 @@ class RequestProcessor:
             model (sklearn.base.BaseEstimator): The trained machine learning model.
             model_name (str): The name of the model.
         """
-        ml_models_path = os.path.join(self.save_path, 'ml_models')
-        utils.ensure_directory_exists(ml_models_path)
-        model_save_path = os.path.join(ml_models_path, f"{model_name}.joblib")
+        model_save_path = self._get_model_save_path(model_name)
         joblib.dump(model, model_save_path, compress=True)
         print(f"Saved {model_name} model to {model_save_path}")
 
+    def _get_model_save_path(self, model_name):
+        """Returns the path a trained model is saved to, creating its directory."""
+        ml_models_path = os.path.join(self.save_path, 'ml_models')
+        utils.ensure_directory_exists(ml_models_path)
+        return os.path.join(ml_models_path, f"{model_name}.joblib")
+
     def process_request(self):
         """
         Processes the request by training and evaluating models, and returns the results.
 
+        Each model's evaluation is copied into the shared arrays of the results as soon
+        as it is available, so the test labels are held once and the per-model arrays
+        are released model by model.
+
         Returns:
-            dict: A dictionary of model names and their evaluation scores.
+            EvaluationResults: The evaluation of every model, keyed by model name.
         """
+        self.download_inputs()
         X_train, y_train = self.load_dataset(file_type='train')
         X_test, y_test = self.load_dataset(file_type='test')
 
@@ -144,29 +435,201 @@ class RequestProcessor:
                 # 'ShallowNN_Regression': {'input_shape': (X_train.shape[1],)},
             }
 
-        model_registry_dict = {}
-        if task_type == 'classification':
-            model_registry_dict = model_registry.CLASSIFICATION_MODELS
-        elif task_type == 'regression':
-            model_registry_dict = model_registry.REGRESSION_MODELS
-
-        results = {}
-        user_model = self.load_user_model()
-        results['user_model'] = self.evaluate_model(user_model, X_test, y_test)
+        model_registry_dict = self._get_model_registry()
 
+        jobs = []
         for model_name, params in hyperparams.items():
             if model_name in model_registry_dict:
-                try:
-                    model = model_registry_dict[model_name](**params)
-                    self.train_model(model_name, model, X_train, y_train)
-                    self.save_model(model, model_name)
-                    evaluation_results = self.evaluate_model(model, X_test, y_test)
-                    results[model_name] = evaluation_results
-                except Exception as e:
-                    print(f"Error training or evaluating model '{model_name}': {e}")
-                    continue
+                jobs.append((model_name, params))
             else:
                 print(f"Model '{model_name}' not found in {task_type} registry.")
-                continue
 
+        # Rows follow the registry order regardless of which baselines came from the cache
+        results = EvaluationResults(task_type, y_test, ['user_model'] + [model_name for model_name, _ in jobs])
+        user_model = self.load_user_model()
+        with instrumentation.stage('evaluate', model='user_model'):
+            results.add('user_model', self.evaluate_model(user_model, X_test, y_test))
+
+        cached_models = self._load_cached_baselines(jobs, results)
+        uncached_jobs = [job for job in jobs if job[0] not in cached_models]
+        if uncached_jobs:
+            # The baselines share one preprocessing of the features; the user's model
+            # above was evaluated on the raw features it was trained for
+            X_train, X_test = self.preprocess_features(X_train, X_test)
+
+            max_workers = self._get_max_workers(len(uncached_jobs))
+            if max_workers > 1:
+                self._train_baselines_parallel(uncached_jobs, max_workers, results,
+                                               X_train, y_train, X_test, y_test)
+            else:
+                self._train_baselines_serial(uncached_jobs, results, X_train, y_train, X_test, y_test)
+
+        results.compact()
         return results
+
+    def preprocess_features(self, X_train, X_test):
+        """
+        Fits the preprocessing shared by the baselines and transforms both sets with it.
+
+        The preprocessing (imputation, scaling and one-hot encoding, see
+        preprocessing.build_preprocessor) is fitted once on the training set and kept
+        in self.preprocessor, and the transformed matrices are handed to every baseline.
+
+        Args:
+            X_train (pd.DataFrame): Training data features.
+            X_test (pd.DataFrame): Test data features.
+
+        Returns:
+            tuple: (X_train, X_test) as transformed NumPy arrays, or CSR matrices for
+            sparse features.
+        """
+        with instrumentation.stage('preprocess'):
+            self.preprocessor = preprocessing.build_preprocessor(sparse_input=sparse.issparse(X_train))
+            X_train = self.preprocessor.fit_transform(X_train)
+            X_test = self.preprocessor.transform(X_test)
+        return X_train, X_test
+
+    def _get_baseline_cache_key(self, model_name, params):
+        """Returns the baseline cache key of a model, or None if caching is not possible."""
+        if self.baseline_cache is None or not {'train', 'test'} <= self.dataset_hashes.keys():
+            return None
+        return self.baseline_cache.make_key(self.dataset_hashes, self.request.task_type,
+                                            model_name, params, sparse_features=bool(self.sparse_features),
+                                            loading_mode=self.loading_mode)
+
+    def _load_cached_baselines(self, jobs, results):
+        """
+        Reuses the baselines trained for earlier requests on the same datasets.
+
+        The persisted fitted model of each cached baseline is copied to where
+        save_model would have written it, and its evaluation is added to the results.
+
+        Args:
+            jobs (list of tuple): (model_name, params) pairs to train.
+            results (EvaluationResults): The results to add the cached evaluations to.
+
+        Returns:
+            set: The names of the models found in the cache.
+        """
+        cached_models = set()
+        for model_name, params in jobs:
+            key = self._get_baseline_cache_key(model_name, params)
+            cached_baseline = self.baseline_cache.load(key) if key else None
+            if cached_baseline is None:
+                continue
+
+            cached_model_path, evaluation = cached_baseline
+            shutil.copyfile(cached_model_path, self._get_model_save_path(model_name))
+            results.add(model_name, evaluation)
+            cached_models.add(model_name)
+            print(f"Reusing cached {model_name} model")
+        return cached_models
+
+    def _add_trained_baseline(self, results, model_name, params, evaluation):
+        """
+        Adds a newly trained baseline's evaluation to the results and stores the
+        baseline so later requests on the same datasets can reuse it.
+
+        Args:
+            results (EvaluationResults): The results to add the evaluation to.
+            model_name (str): The name of the model in the registry.
+            params (dict): The hyperparameters the model was constructed with.
+            evaluation (dict): The evaluation scores of the model.
+        """
+        key = self._get_baseline_cache_key(model_name, params)
+        if key:
+            self.baseline_cache.store(key, self._get_model_save_path(model_name), evaluation)
+        results.add(model_name, evaluation)
+
+    def _get_model_registry(self):
+        """Returns the model registry matching the request's task type."""
+        if self.request.task_type == 'classification':
+            return model_registry.CLASSIFICATION_MODELS
+        elif self.request.task_type == 'regression':
+            return model_registry.REGRESSION_MODELS
+        return {}
+
+    def _get_max_workers(self, num_jobs):
+        """
+        Determines how many worker processes to use for the baseline models.
+
+        Args:
+            num_jobs (int): The number of baseline models to train.
+
+        Returns:
+            int: The number of worker processes, capped by the job and CPU counts.
+        """
+        cpu_count = os.cpu_count() or 1
+        n_jobs = cpu_count if self.n_jobs is None or self.n_jobs < 0 else self.n_jobs
+        return max(1, min(n_jobs, num_jobs, cpu_count))
+
+    def _train_and_evaluate(self, model_name, params, X_train, y_train, X_test, y_test):
+        """
+        Trains, saves and evaluates a single baseline model from the registry.
+
+        The model is saved together with the shared preprocessing, so the saved model
+        takes the raw features like the user's model.
+
+        Args:
+            model_name (str): The name of the model in the registry.
+            params (dict): Keyword arguments used to construct the model.
+            X_train (np.ndarray): Preprocessed training data features.
+            y_train (pd.Series): Training data labels.
+            X_test (np.ndarray): Preprocessed test data features.
+            y_test (pd.Series): Test data labels.
+
+        Returns:
+            dict: The evaluation scores of the model.
+        """
+        model = self._get_model_registry()[model_name](**params)
+        self.train_model(model_name, model, X_train, y_train)
+        self.save_model(Pipeline([('preprocessing', self.preprocessor), ('model', model)]), model_name)
+        with instrumentation.stage('evaluate', model=model_name):
+            return self.evaluate_model(model, X_test, y_test)
+
+    def _train_baselines_serial(self, jobs, results, X_train, y_train, X_test, y_test):
+        """
+        Trains and evaluates the baseline models one after another.
+
+        Args:
+            jobs (list of tuple): (model_name, params) pairs to train.
+            results (EvaluationResults): The results to add the evaluations to.
+            X_train, y_train, X_test, y_test: The preprocessed training and test data.
+        """
+        for model_name, params in jobs:
+            try:
+                evaluation = self._train_and_evaluate(model_name, params, X_train, y_train, X_test, y_test)
+                self._add_trained_baseline(results, model_name, params, evaluation)
+            except Exception as e:
+                print(f"Error training or evaluating model '{model_name}': {e}")
+                continue
+
+    def _train_baselines_parallel(self, jobs, max_workers, results, X_train, y_train, X_test, y_test):
+        """
+        Trains and evaluates the baseline models concurrently in a process pool.
+
+        A model that fails, including one whose worker process dies, is reported and
+        left out of the results exactly as in the serial path. The stage records of
+        each worker are added to those of this process.
+
+        Args:
+            jobs (list of tuple): (model_name, params) pairs to train.
+            max_workers (int): The maximum number of worker processes.
+            results (EvaluationResults): The results to add the evaluations to.
+            X_train, y_train, X_test, y_test: The preprocessed training and test data.
+        """
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                (model_name, params,
+                 executor.submit(instrumentation.run_recorded, self._train_and_evaluate,
+                                 model_name, params, X_train, y_train, X_test, y_test))
+                for model_name, params in jobs
+            ]
+            for model_name, params, future in futures:
+                try:
+                    evaluation, records = future.result()
+                    instrumentation.add_records(records)
+                    self._add_trained_baseline(results, model_name, params, evaluation)
+                except Exception as e:
+                    print(f"Error training or evaluating model '{model_name}': {e}")
+                    continue
@@ -0,0 +1,314 @@
+import os
+import time
+import struct
+import logging
+import datetime
+import tempfile
+import subprocess
+
+from fpdf import FPDF
+from PIL import Image
+
+from app.instrumentation import stage
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+TEMPLATE_FOLDER = os.path.join(os.path.dirname(os.path.realpath(__file__)), "report_templates")
+LOGO_PATH = os.path.join(TEMPLATE_FOLDER, "logo-no-background.png")
+
+REPORT_FILE_NAME = "model_evaluation_report.pdf"
+
+# Backends tried in order until one builds the report
+DEFAULT_REPORT_BACKENDS = ('fpdf', 'latex')
+
+# Seconds pdflatex may run before the report is given up on
+LATEX_TIMEOUT_SECONDS = 60
+
+# Sections of each report after the results table, as (title, image key, width as a
+# fraction of the text width), mirroring the LaTeX templates
+REPORT_SECTIONS = {
+    'classification': [
+        ('ROC Curves', 'roc_curve', 0.8),
+        ('Precision-Recall Curves', 'precision_recall_curve', 0.8),
+        ('Confusion Matrices', 'confusion_matrices', 1.0),
+    ],
+    'regression': [
+        ('Prediction vs. Actual Plots', 'prediction_vs_actual', 1.0),
+        ('Residuals Plots', 'residuals', 1.0),
+    ],
+}
+
+
+def _png_size(path):
+    """Returns the (width, height) in pixels of a PNG image, read from its header."""
+    with open(path, 'rb') as file:
+        header = file.read(24)
+    return struct.unpack('>II', header[16:24])
+
+
+def _flatten_png(path, directory):
+    """
+    Writes a copy of a PNG image without its alpha channel.
+
+    fpdf separates the alpha channel of a PNG pixel by pixel in Python, which takes
+    seconds for a full-page figure, while opaque PNGs are embedded as they are.
+
+    Returns:
+        str: Path of the opaque copy.
+    """
+    with Image.open(path) as image:
+        if image.mode == 'RGB':
+            return path
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.convert('RGBA'))
+    flat_path = os.path.join(directory, os.path.basename(path))
+    background.save(flat_path, compress_level=1)
+    return flat_path
+
+
+class FPDFReportBackend:
+    """
+    Builds the report directly with fpdf, without a TeX installation.
+
+    The layout follows the LaTeX templates: a title page, the evaluation results and
+    one page per figure, on US letter paper with one inch margins, a logo in the header
+    and the page number in the footer. The results are written as a native table rather
+    than as the table image.
+    """
+
+    name = 'fpdf'
+
+    def build(self, task_type, images, results_table, output_path):
+        """
+        Builds the report.
+
+        Args:
+            task_type (str): The type of the task ('classification' or 'regression').
+            images (dict): Paths of the figures by image key.
+            results_table (pd.DataFrame): The formatted results, one row per model.
+            output_path (str): Path of the PDF to write.
+
+        Returns:
+            str: Path of the written PDF.
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdf = _ReportPDF(_flatten_png(LOGO_PATH, temp_dir))
+            pdf.title_page(f"{task_type.title()} Model Evaluation Report")
+
+            pdf.add_page(orientation='L')
+            pdf.section("Evaluation Results")
+            pdf.table(results_table)
+
+            for title, image_key, width in REPORT_SECTIONS[task_type]:
+                pdf.add_page(orientation='P')
+                pdf.section(title)
+                pdf.centered_image(_flatten_png(images[image_key], temp_dir), width)
+
+            pdf.output(output_path, 'F')
+        return output_path
+
+
+class _ReportPDF(FPDF):
+    """FPDF document with the header, footer and building blocks of the report."""
+
+    def __init__(self, logo_path):
+        super().__init__(orientation='P', unit='mm', format='letter')
+        self.logo_path = logo_path
+        self.logo_size = _png_size(logo_path)
+        self.section_number = 0
+        self.set_margins(25.4, 25.4, 25.4)
+        self.set_auto_page_break(True, margin=25.4)
+
+    def header(self):
+        # Like the titlingpage environment, the title page has no header or footer
+        if self.page_no() == 1:
+            return
+        top = 12
+        logo_width, logo_height = self.logo_size
+        width = 5 * logo_width / logo_height
+        self.image(self.logo_path, x=self.w - self.r_margin - width, y=top, h=5)
+        self.set_line_width(0.35)
+        self.line(self.l_margin, top + 6, self.w - self.r_margin, top + 6)
+        self.set_y(self.t_margin)
+
+    def footer(self):
+        if self.page_no() == 1:
+            return
+        self.set_y(-15)
+        self.set_font('Times', '', 10)
+        self.cell(0, 5, str(self.page_no() - 1), 0, 0, 'C')
+
+    def title_page(self, title):
+        today = datetime.date.today()
+        self.add_page()
+        self.set_y(self.h / 2 - 25)
+        self.set_font('Times', '', 20)
+        self.cell(0, 12, title, 0, 1, 'C')
+        self.ln(6)
+        self.set_font('Times', '', 14)
+        self.cell(0, 8, "Generated by Metrica", 0, 1, 'C')
+        self.ln(3)
+        self.cell(0, 8, f"{today:%B} {today.day}, {today.year}", 0, 1, 'C')
+
+    def section(self, title):
+        self.section_number += 1
+        self.set_font('Times', 'B', 14)
+        self.cell(0, 10, f"{self.section_number}   {title}", 0, 1)
+        self.ln(2)
+
+    def table(self, results_table):
+        columns = list(results_table.columns)
+        text_width = self.w - self.l_margin - self.r_margin
+        first_width = min(60, text_width / 3)
+        other_width = (text_width - first_width) / max(len(columns) - 1, 1)
+        widths = [first_width] + [other_width] * (len(columns) - 1)
+
+        self.set_font('Times', 'B', 10)
+        self.set_fill_color(230, 230, 230)
+        for column, width in zip(columns, widths):
+            self.cell(width, 7, str(column), 1, 0, 'C', True)
+        self.ln()
+
+        self.set_font('Times', '', 10)
+        for row in results_table.itertuples(index=False):
+            for value, width in zip(row, widths):
+                self.cell(width, 7, str(value), 1, 0, 'C')
+            self.ln()
+
+    def centered_image(self, path, width_fraction):
+        """Places an image centered below the cursor, scaled down to fit the page."""
+        text_width = self.w - self.l_margin - self.r_margin
+        available_height = self.h - self.b_margin - self.get_y()
+        pixel_width, pixel_height = _png_size(path)
+        width = text_width * width_fraction
+        height = width * pixel_height / pixel_width
+        if height > available_height:
+            width, height = available_height * pixel_width / pixel_height, available_height
+        self.image(path, x=(self.w - width) / 2, y=self.get_y(), w=width, h=height)
+
+
+class LatexReportBackend:
+    """
+    Builds the report by filling in the LaTeX templates and compiling them with pdflatex.
+
+    pdflatex runs non-interactively with its input closed, so a LaTeX error fails the
+    build instead of waiting for input, and it is killed after timeout seconds.
+
+    Attributes:
+        timeout (float): Seconds pdflatex may run.
+    """
+
+    name = 'latex'
+
+    def __init__(self, timeout=LATEX_TIMEOUT_SECONDS):
+        self.timeout = timeout
+
+    def build(self, task_type, images, results_table, output_path):
+        """
+        Builds the report.
+
+        Args:
+            task_type (str): The type of the task ('classification' or 'regression').
+            images (dict): Paths of the figures by image key, including 'results_table'.
+            results_table (pd.DataFrame): Unused, the template includes the table image.
+            output_path (str): Path of the PDF to write.
+
+        Returns:
+            str: Path of the written PDF.
+
+        Raises:
+            RuntimeError: If pdflatex fails, times out or does not produce the PDF.
+        """
+        template_path = os.path.join(TEMPLATE_FOLDER, f"{task_type}_report_template.tex")
+        output_directory = os.path.dirname(output_path)
+        job_name = os.path.splitext(os.path.basename(output_path))[0]
+        latex_output_path = os.path.join(output_directory, f"{job_name}.tex")
+
+        placeholders = dict(images, logo=LOGO_PATH)
+        with open(template_path, 'r', encoding='utf-8') as file:
+            template_content = file.read()
+
+        for image_key, image_path in placeholders.items():
+            template_content = template_content.replace(f'{{{image_key}_placeholder}}', image_path)
+
+        with open(latex_output_path, 'w', encoding='utf-8') as file:
+            file.write(template_content)
+
+        command = ['pdflatex', '-interaction=nonstopmode', '-halt-on-error',
+                   '-output-directory', output_directory, latex_output_path]
+        try:
+            completed = subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                       stderr=subprocess.STDOUT, timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            raise RuntimeError(f"pdflatex timed out after {self.timeout}s")
+        except FileNotFoundError:
+            raise RuntimeError("pdflatex is not installed")
+
+        if completed.returncode != 0 or not os.path.exists(output_path):
+            log_tail = completed.stdout.decode(errors='replace')[-2000:]
+            raise RuntimeError(f"pdflatex failed with exit code {completed.returncode}: {log_tail}")
+        return output_path
+
+
+REPORT_BACKEND_CLASSES = {
+    FPDFReportBackend.name: FPDFReportBackend,
+    LatexReportBackend.name: LatexReportBackend,
+}
+
+
+def get_report_backends(names):
+    """
+    Instantiates report backends by name.
+
+    Args:
+        names (iterable of str): Names of the backends, e.g. ('fpdf', 'latex').
+
+    Returns:
+        list: The backends, in the given order.
+
+    Raises:
+        ValueError: If a backend name is unknown.
+    """
+    backends = []
+    for name in names:
+        if name not in REPORT_BACKEND_CLASSES:
+            raise ValueError(f"Unknown report backend: {name}")
+        backends.append(REPORT_BACKEND_CLASSES[name]())
+    return backends
+
+
+def build_report(task_type, images, results_table, output_path, backends):
+    """
+    Builds the report with the first backend that succeeds.
+
+    The time taken by every backend tried is logged and recorded as a 'report' stage.
+
+    Args:
+        task_type (str): The type of the task ('classification' or 'regression').
+        images (dict): Paths of the figures by image key.
+        results_table (pd.DataFrame): The formatted results, one row per model.
+        output_path (str): Path of the PDF to write.
+        backends (list): The backends to try, in order.
+
+    Returns:
+        str: Path of the written PDF.
+
+    Raises:
+        RuntimeError: If every backend fails.
+    """
+    errors = []
+    for backend in backends:
+        start = time.perf_counter()
+        try:
+            with stage('report', backend=backend.name):
+                path = backend.build(task_type, images, results_table, output_path)
+        except Exception as e:
+            logging.warning("Report backend %s failed after %.2fs: %s",
+                            backend.name, time.perf_counter() - start, e)
+            errors.append(f"{backend.name}: {e}")
+            continue
+        logging.info("Built report with %s backend in %.2fs", backend.name, time.perf_counter() - start)
+        return path
+
+    raise RuntimeError(f"Could not build report: {'; '.join(errors)}")
@@ -0,0 +1,198 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+# Evaluation entries that are model outputs rather than metrics shown in the results table
+NON_METRIC_KEYS = ['y_test', 'predictions', 'y_scores', 'task_type', 'curves']
+
+
+def _prediction_dtype(current, new):
+    """Returns a dtype holding the predictions of every model, e.g. labels of several lengths."""
+    try:
+        return np.result_type(current, new)
+    except TypeError:
+        return np.dtype(object)
+
+
+class ModelResults(Mapping):
+    """
+    Read-only view of one model's entry in EvaluationResults.
+
+    Behaves like the per-model dictionary returned by RequestProcessor.evaluate_model:
+    'y_test' is the shared ground truth, 'predictions' and 'y_scores' are rows of the
+    shared arrays, and the remaining keys are the model's metrics and curves. No array
+    is copied.
+    """
+    __slots__ = ['_results', '_model_name']
+
+    def __init__(self, results, model_name):
+        self._results = results
+        self._model_name = model_name
+
+    def _keys(self):
+        keys = ['y_test', 'predictions', 'y_scores', 'task_type']
+        keys.extend(self._results.metrics[self._model_name])
+        if self._model_name in self._results.curves:
+            keys.append('curves')
+        return keys
+
+    def __getitem__(self, key):
+        results = self._results
+        if key == 'y_test':
+            return results.y_true
+        if key == 'predictions':
+            return results.predictions_of(self._model_name)
+        if key == 'y_scores':
+            return results.scores_of(self._model_name)
+        if key == 'task_type':
+            return results.task_type
+        if key == 'curves':
+            return results.curves[self._model_name]
+        return results.metrics[self._model_name][key]
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+
+class EvaluationResults(Mapping):
+    """
+    The evaluation results of every model of a request, without per-model copies of the data.
+
+    The ground truth is held once, and the predictions and scores of all models in one
+    contiguous 2-D array each, with a row per model. Scalar metrics and the thinned
+    curves are kept per model. Indexing by model name returns a ModelResults view, so
+    code written against the dictionary of per-model dictionaries keeps working.
+
+    Attributes:
+        task_type (str): The type of the task ('classification' or 'regression').
+        y_true (np.ndarray): The test labels or values shared by every model.
+        model_names (list of str): The models in row order.
+        predictions (np.ndarray): Predictions with one row per model, or None until the
+            first model is added.
+        y_scores (np.ndarray): Positive class scores with one row per model, NaN for models
+            without scores, or None if no model has scores.
+        has_scores (np.ndarray): Whether each row of y_scores holds scores.
+        metrics (dict): Model names mapped to their scalar metrics.
+        curves (dict): Model names mapped to their ROC and precision-recall curves.
+    """
+    __slots__ = ['task_type', 'y_true', 'model_names', 'predictions', 'y_scores', 'has_scores',
+                 'metrics', 'curves', '_rows']
+
+    def __init__(self, task_type, y_true, model_names):
+        """
+        Initializes empty results for the given models.
+
+        Args:
+            task_type (str): The type of the task.
+            y_true (array-like): The test labels or values.
+            model_names (list of str): The models to hold results for, in the order they
+                are listed in; rows of models that are never added are dropped by compact.
+        """
+        self.task_type = task_type
+        self.y_true = np.asarray(y_true)
+        self.model_names = list(model_names)
+        self.predictions = None
+        self.y_scores = None
+        self.has_scores = np.zeros(len(self.model_names), dtype=bool)
+        self.metrics = {}
+        self.curves = {}
+        self._rows = {model_name: row for row, model_name in enumerate(self.model_names)}
+
+    @classmethod
+    def from_dict(cls, results):
+        """
+        Builds results from a dictionary of per-model evaluation dictionaries.
+
+        Args:
+            results (dict): Model names mapped to the output of RequestProcessor.evaluate_model.
+
+        Returns:
+            EvaluationResults: The results, or the argument itself if it already is one.
+
+        Raises:
+            ValueError: If results holds no evaluation, so the task type and ground truth are unknown.
+        """
+        if isinstance(results, EvaluationResults):
+            return results
+        if not results:
+            raise ValueError("Cannot build evaluation results without any model evaluation")
+        first = next(iter(results.values()))
+        evaluation_results = cls(first['task_type'], first['y_test'], list(results))
+        for model_name, evaluation in results.items():
+            evaluation_results.add(model_name, evaluation)
+        return evaluation_results
+
+    def add(self, model_name, evaluation):
+        """
+        Stores the evaluation of a model, copying its arrays into the model's rows.
+
+        Args:
+            model_name (str): One of model_names.
+            evaluation (Mapping): The evaluation as returned by RequestProcessor.evaluate_model;
+                its 'y_test' and 'task_type' entries are ignored.
+
+        Raises:
+            KeyError: If the model is not one of model_names.
+            ValueError: If the predictions do not have one entry per test row.
+        """
+        row = self._rows[model_name]
+        num_rows = len(self.y_true)
+
+        predictions = np.asarray(evaluation['predictions'])
+        if predictions.ndim == 2 and predictions.shape[1] == 1:
+            predictions = predictions.ravel()
+        if predictions.shape[:1] != (num_rows,):
+            raise ValueError(f"Model '{model_name}' has {len(predictions)} predictions for {num_rows} test rows")
+        if self.predictions is None:
+            self.predictions = np.empty((len(self.model_names),) + predictions.shape, dtype=predictions.dtype)
+        elif not np.can_cast(predictions.dtype, self.predictions.dtype):
+            self.predictions = self.predictions.astype(_prediction_dtype(self.predictions.dtype, predictions.dtype))
+        self.predictions[row] = predictions
+
+        y_scores = evaluation.get('y_scores')
+        if y_scores is not None:
+            if self.y_scores is None:
+                self.y_scores = np.full((len(self.model_names), num_rows), np.nan)
+            self.y_scores[row] = y_scores
+            self.has_scores[row] = True
+
+        self.metrics[model_name] = {key: value for key, value in evaluation.items() if key not in NON_METRIC_KEYS}
+        if evaluation.get('curves'):
+            self.curves[model_name] = evaluation['curves']
+
+    def compact(self):
+        """Drops the rows of models that were never added, e.g. baselines that failed to train."""
+        kept = [model_name for model_name in self.model_names if model_name in self.metrics]
+        if len(kept) == len(self.model_names):
+            return
+        rows = [self._rows[model_name] for model_name in kept]
+        if self.predictions is not None:
+            self.predictions = self.predictions[rows]
+        if self.y_scores is not None:
+            self.y_scores = self.y_scores[rows]
+        self.has_scores = self.has_scores[rows]
+        self.model_names = kept
+        self._rows = {model_name: row for row, model_name in enumerate(kept)}
+
+    def predictions_of(self, model_name):
+        """Returns a model's predictions as a view of its row."""
+        return self.predictions[self._rows[model_name]]
+
+    def scores_of(self, model_name):
+        """Returns a model's scores as a view of its row, or None if it has none."""
+        row = self._rows[model_name]
+        return self.y_scores[row] if self.has_scores[row] else None
+
+    def __getitem__(self, model_name):
+        if model_name not in self.metrics:
+            raise KeyError(model_name)
+        return ModelResults(self, model_name)
+
+    def __iter__(self):
+        return (model_name for model_name in self.model_names if model_name in self.metrics)
+
+    def __len__(self):
+        return len(self.metrics)
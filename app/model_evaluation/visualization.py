@@ -1,27 +1,119 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import pandas as pd
 import seaborn as sns
-import subprocess
-from sklearn.metrics import roc_curve, auc, precision_recall_curve, confusion_matrix
+from sklearn.metrics import confusion_matrix
+
+from app.instrumentation import add_records, run_recorded, stage
+from .evaluation_metrics import binary_curves
+from .results import EvaluationResults
+from .report import DEFAULT_REPORT_BACKENDS, REPORT_FILE_NAME, LatexReportBackend, build_report, get_report_backends
+
+# Maximum number of points drawn per scatter plot; larger test sets are aggregated
+MAX_SCATTER_POINTS = 10_000
+
+# Bins per axis of the grid used to spread the sampled points over the plot
+DOWNSAMPLE_BINS = 32
+
+# How scatter plots above the point budget are aggregated
+SCATTER_MODES = ('sample', 'hexbin')
+
+
+def _bin_indices(values, num_bins):
+    """Maps values to equal-width bins spanning their range."""
+    low, high = values.min(), values.max()
+    if high <= low:
+        return np.zeros(len(values), dtype=np.intp)
+    indices = ((values - low) / (high - low) * num_bins).astype(np.intp)
+    return np.minimum(indices, num_bins - 1)
+
+
+def _bin_capacity(counts, budget):
+    """Returns the largest per-bin cap keeping the total number of points within budget."""
+    low, high = 0, int(counts.max())
+    while low < high:
+        cap = (low + high + 1) // 2
+        if np.minimum(counts, cap).sum() <= budget:
+            low = cap
+        else:
+            high = cap - 1
+    return low
+
+
+def downsample_points(x, y, budget, num_bins=DOWNSAMPLE_BINS, seed=0):
+    """
+    Selects at most budget points of a scatter plot while preserving its shape.
+
+    The points are binned on a 2D grid and every bin keeps at most the same number of
+    points, chosen at random. Sparse bins, which hold the outliers, are kept entirely
+    and only the dense regions are thinned out.
+
+    Args:
+        x (np.ndarray): The x coordinates of the points.
+        y (np.ndarray): The y coordinates of the points.
+        budget (int): The maximum number of points to keep.
+        num_bins (int, optional): The number of bins per axis.
+        seed (int, optional): Seed of the random selection within bins.
+
+    Returns:
+        np.ndarray: Sorted indices of the selected points.
+    """
+    num_points = len(x)
+    if budget is None or num_points <= budget:
+        return np.arange(num_points)
+
+    bins = _bin_indices(x, num_bins) * num_bins + _bin_indices(y, num_bins)
+    counts = np.bincount(bins, minlength=num_bins * num_bins)
+    cap = _bin_capacity(counts, budget)
+
+    # Rank the points of each bin in random order and keep the first cap of them
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(num_points), bins))
+    bin_starts = np.cumsum(counts) - counts
+    ranks = np.arange(num_points) - bin_starts[bins[order]]
+    return np.sort(order[ranks < cap])
+
 
 class ModelVisualizer:
     """
     A class for visualizing machine learning model performance and results.
 
+    Figures are built with matplotlib's object-oriented API and rendered with the
+    non-interactive Agg canvas, so no pyplot state is shared between them and each
+    figure can be rendered in a separate process.
+
     Attributes:
         save_path (str): Path where the visualizations and results will be saved.
+        max_workers (int): The number of processes used to render the figures.
+        point_budget (int): The maximum number of points drawn per scatter plot.
+        scatter_mode (str): How scatter plots above the point budget are aggregated.
     """
 
-    def __init__(self, save_path):
+    def __init__(self, save_path, max_workers=1, point_budget=MAX_SCATTER_POINTS, scatter_mode='sample'):
         """
         Initializes the ModelVisualizer with a path to save visualizations and results.
 
         Args:
             save_path (str): The directory path where visualizations and results will be saved.
+            max_workers (int, optional): The maximum number of processes rendering figures
+                at once. 1 renders them one after another in this process.
+            point_budget (int, optional): The maximum number of points drawn per residual
+                or prediction vs actual plot, so render time does not grow with the test set.
+                None draws every point.
+            scatter_mode (str, optional): 'sample' draws a subsample that keeps outliers,
+                'hexbin' draws the density of all points once they exceed the budget.
+
+        Raises:
+            ValueError: If the scatter mode is not supported.
         """
+        if scatter_mode not in SCATTER_MODES:
+            raise ValueError(f"Unsupported scatter mode: {scatter_mode}")
         self.save_path = save_path
+        self.max_workers = max_workers
+        self.point_budget = point_budget
+        self.scatter_mode = scatter_mode
         self.model_names_dict = {
             'user_model': 'User Model', # Maybe change to given name for plots?
             'LogisticRegression': 'Logistic Regression',
@@ -52,11 +144,10 @@ class ModelVisualizer:
         colors = sns.color_palette("hsv", len(results))
         return {model_name: color for model_name, color in zip(results.keys(), colors)}
     
-    def _plot_roc_curve(self, y_true, y_scores, ax, label=None, color='blue'):
-        """Plots the ROC curve on the given axis."""
-        fpr, tpr, _ = roc_curve(y_true, y_scores)
-        roc_auc = auc(fpr, tpr)
-        ax.plot(fpr, tpr, label=f'{label} (AUC = {roc_auc:.2f})' if label else f'ROC Curve (AUC = {roc_auc:.2f})', color=color)
+    def _plot_roc_curve(self, curves, ax, label=None, color='blue'):
+        """Plots the ROC curve returned by binary_curves on the given axis."""
+        roc_auc = curves['roc_auc']
+        ax.plot(curves['fpr'], curves['tpr'], label=f'{label} (AUC = {roc_auc:.2f})' if label else f'ROC Curve (AUC = {roc_auc:.2f})', color=color)
         ax.plot([0, 1], [0, 1], linestyle='--', color='grey')
         ax.set_xlabel('False Positive Rate')
         ax.set_ylabel('True Positive Rate')
@@ -64,10 +155,9 @@ class ModelVisualizer:
         ax.legend(loc="lower right")
 
 
-    def _plot_precision_recall_curve(self, y_true, y_scores, ax, label=None, color='blue'):
-        """Plots the precision-recall curve on the given axis."""
-        precision, recall, _ = precision_recall_curve(y_true, y_scores)
-        ax.step(recall, precision, where='post', label=label if label else 'Precision-Recall Curve', color=color)
+    def _plot_precision_recall_curve(self, curves, ax, label=None, color='blue'):
+        """Plots the precision-recall curve returned by binary_curves on the given axis."""
+        ax.step(curves['recall'], curves['precision'], where='post', label=label if label else 'Precision-Recall Curve', color=color)
         ax.set_xlabel('Recall')
         ax.set_ylabel('Precision')
         ax.set_title('Precision-Recall Curve')
@@ -90,10 +180,32 @@ class ModelVisualizer:
         ax.set_ylabel('True labels')
         ax.set_title(title)
 
+    def _scatter(self, x, y, ax, label=None, alpha=None):
+        """
+        Draws a scatter plot of at most point_budget points on the given axis.
+
+        Above the budget the points are either subsampled with downsample_points or,
+        in hexbin mode, aggregated into a density plot.
+        """
+        num_points = len(x)
+        if self.point_budget is None or num_points <= self.point_budget:
+            ax.scatter(x, y, alpha=alpha, label=label)
+            return
+
+        if self.scatter_mode == 'hexbin':
+            ax.hexbin(x, y, gridsize=50, bins='log', mincnt=1, cmap='Blues', label=label)
+            note = f'density of {num_points:,} points'
+        else:
+            indices = downsample_points(x, y, self.point_budget)
+            ax.scatter(x[indices], y[indices], alpha=alpha, label=label)
+            note = f'{len(indices):,} of {num_points:,} points shown'
+        ax.text(0.99, 0.01, note, transform=ax.transAxes, ha='right', va='bottom', fontsize=8, color='grey')
+
     def _plot_residuals(self, y_true, y_pred, ax, label=None):
         """Plots the residuals on the given axis."""
+        y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
         residuals = y_true - y_pred
-        ax.scatter(y_pred, residuals, label=label if label else 'Residuals')
+        self._scatter(y_pred, residuals, ax, label=label if label else 'Residuals')
         ax.hlines(y=0, xmin=y_pred.min(), xmax=y_pred.max(), colors='red', linestyles='--')
         ax.set_xlabel('Predicted Values')
         ax.set_ylabel('Residuals')
@@ -103,7 +215,8 @@ class ModelVisualizer:
 
     def _plot_prediction_vs_actual(self, y_true, y_pred, ax, label=None):
         """Plots the prediction vs actual values on the given axis."""
-        ax.scatter(y_true, y_pred, alpha=0.3, label=label if label else 'Predicted vs Actual')
+        y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+        self._scatter(y_true, y_pred, ax, label=label if label else 'Predicted vs Actual', alpha=0.3)
         ax.plot([y_true.min(), y_true.max()], [y_true.min(), y_true.max()], '--', color='red')
         ax.set_xlabel('Actual Values')
         ax.set_ylabel('Predicted Values')
@@ -111,21 +224,22 @@ class ModelVisualizer:
         if label:
             ax.legend()
 
-    def _generate_results_table(self, results):
+    def _results_dataframe(self, results):
         """
-        Generates a table from the evaluation results and saves it as an image.
+        Formats the metrics of every model as a table.
 
         Args:
-            results (dict): A dictionary containing evaluation scores for each model.
+            results (EvaluationResults or dict): The evaluation results of each model.
 
         Returns:
             pd.DataFrame: A DataFrame representing the results in tabular format.
         """
-        # Filter out unwanted keys and rename model names
+        results = EvaluationResults.from_dict(results)
+        # Rename model names
         filtered_results = {}
-        for model_name, model_data in results.items():
+        for model_name, metrics in results.metrics.items():
             readable_name = self.model_names_dict.get(model_name, model_name)
-            filtered_results[readable_name] = {k: v for k, v in model_data.items() if k not in ['y_test', 'predictions', 'y_scores', 'task_type']}
+            filtered_results[readable_name] = metrics
 
         # Create DataFrame from filtered results
         results_df = pd.DataFrame.from_dict(filtered_results, orient='index')
@@ -133,10 +247,24 @@ class ModelVisualizer:
         results_df.rename(columns={'index': 'Model Name'}, inplace=True)
 
         # Format numbers for better display
-        results_df = results_df.map(lambda x: f'{x:.4f}' if isinstance(x, (float, int)) else x)
+        return results_df.map(lambda x: f'{x:.4f}' if isinstance(x, (float, int)) else x)
+
+    def _generate_results_table(self, results):
+        """
+        Generates a table from the evaluation results and saves it as an image.
+
+        Args:
+            results (EvaluationResults): The evaluation results of each model.
+
+        Returns:
+            pd.DataFrame: A DataFrame representing the results in tabular format.
+        """
+        results_df = self._results_dataframe(results)
 
         # Plotting and styling
-        fig, ax = plt.subplots(figsize=(12, len(results_df) * 0.4))
+        with sns.axes_style("whitegrid"):
+            fig = Figure(figsize=(12, len(results_df) * 0.4))
+            ax = fig.subplots()
         ax.axis('tight')
         ax.axis('off')
         table = ax.table(cellText=results_df.values, colLabels=results_df.columns, loc='center', cellLoc='center')
@@ -144,11 +272,9 @@ class ModelVisualizer:
         table.set_fontsize(8)
         table.scale(1.2, 1.5)
 
-        sns.set_style("whitegrid")
-        plt.title('Model Evaluation Results', pad=20)
+        ax.set_title('Model Evaluation Results', pad=20)
 
-        plt.savefig(os.path.join(self.save_path, "results_table.png"), bbox_inches='tight', pad_inches=0.05)
-        plt.close()
+        fig.savefig(os.path.join(self.save_path, "results_table.png"), bbox_inches='tight', pad_inches=0.05)
 
         return results_df
 
@@ -157,135 +283,197 @@ class ModelVisualizer:
         Creates and saves confusion matrix visualizations for each model in the results.
 
         Args:
-            results (dict): Dictionary containing evaluation results for each model.
+            results (EvaluationResults): The evaluation results of each model.
             class_names (list of str, optional): Class names for classification labels.
         """
         num_models = len(results)
         # Calculate grid size for subplots
         grid_size = int(np.ceil(np.sqrt(num_models)))
-        fig, axes = plt.subplots(grid_size, grid_size, figsize=(grid_size * 6, grid_size * 6))
+        with sns.axes_style("whitegrid"):
+            fig = Figure(figsize=(grid_size * 6, grid_size * 6))
+            axes = fig.subplots(grid_size, grid_size, squeeze=False)
         fig.suptitle('Confusion Matrices for All Models', fontsize=16)
 
         # Flatten axes array for easy indexing
         axes = axes.flatten()
 
-        for idx, (model_name, model_results) in enumerate(results.items()):
+        for idx, model_name in enumerate(results):
+            predictions = results.predictions_of(model_name)
             model_name = self.model_names_dict[model_name]
-            y_test = model_results['y_test']
-            predictions = model_results['predictions']
             ax = axes[idx]
 
             # Call the plotting function for each model
-            self._plot_confusion_matrix(y_test, predictions, ax, class_names, 
+            self._plot_confusion_matrix(results.y_true, predictions, ax, class_names,
                                         title=f'Confusion Matrix for {model_name}')
 
         # Hide unused subplots
         for idx in range(num_models, len(axes)):
             fig.delaxes(axes[idx])
 
-        plt.tight_layout()
-        plt.subplots_adjust(top=0.9)  # Adjust the top padding
-        plt.savefig(os.path.join(self.save_path, "all_confusion_matrices.png"))
-        plt.close()
+        fig.tight_layout()
+        fig.subplots_adjust(top=0.9)  # Adjust the top padding
+        fig.savefig(os.path.join(self.save_path, "all_confusion_matrices.png"))
     
+    def _get_curves(self, results, model_name):
+        """
+        Returns the ROC and precision-recall curves of a model.
+
+        Curves computed during evaluation are reused; otherwise they are derived from
+        the model's scores. None if the model has no scores or the task is not binary.
+        """
+        if model_name in results.curves:
+            return dict(results.curves[model_name], roc_auc=results.metrics[model_name]['roc_auc'])
+        y_scores = results.scores_of(model_name)
+        if y_scores is None:
+            return None
+        return binary_curves(results.y_true, y_scores)
+
     def _create_standard_plots(self, plot_name, results, model_colors):
-        fig, ax = plt.subplots(figsize=(8, 6))
+        fig = Figure(figsize=(8, 6))
+        ax = fig.subplots()
         plot_function = self.plot_functions[plot_name]
 
-        for model_name, model_results in results.items():
-            color = model_colors[model_name]
-            model_name = self.model_names_dict[model_name]
-            y_test = model_results['y_test']
-            y_scores = model_results.get('y_scores', None)
+        for model_name in results:
+            curves = self._get_curves(results, model_name)
 
-            if y_scores is not None:
-                plot_function(y_test, y_scores, ax, label=model_name, color=color)
+            if curves is not None:
+                plot_function(curves, ax, label=self.model_names_dict[model_name], color=model_colors[model_name])
 
         ax.legend()
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.save_path, f"{plot_name}.png"))
-        plt.close()
+        fig.tight_layout()
+        fig.savefig(os.path.join(self.save_path, f"{plot_name}.png"))
 
     def _create_individual_plots(self, plot_name, results):
         num_models = len(results)
         grid_size = int(np.ceil(np.sqrt(num_models)))
-        fig, axes = plt.subplots(grid_size, grid_size, figsize=(grid_size * 6, grid_size * 6))
+        fig = Figure(figsize=(grid_size * 6, grid_size * 6))
+        axes = fig.subplots(grid_size, grid_size, squeeze=False)
         fig.suptitle(f'{plot_name.replace("_", " ").title()} for All Models', fontsize=16)
         axes = axes.flatten()
 
-        for idx, (model_name, model_results) in enumerate(results.items()):
-            model_name = self.model_names_dict[model_name]
+        for idx, model_name in enumerate(results):
             ax = axes[idx]
-            y_test = model_results['y_test']
-            predictions = model_results['predictions']
-            self.plot_functions[plot_name](y_test, predictions, ax)
-            ax.set_title(f'{model_name}')
+            self.plot_functions[plot_name](results.y_true, results.predictions_of(model_name), ax)
+            ax.set_title(f'{self.model_names_dict[model_name]}')
 
         for idx in range(num_models, len(axes)):
             fig.delaxes(axes[idx])
 
-        plt.tight_layout()
-        plt.subplots_adjust(top=0.9)
-        plt.savefig(os.path.join(self.save_path, f"{plot_name}_all_models.png"))
-        plt.close()
+        fig.tight_layout()
+        fig.subplots_adjust(top=0.9)
+        fig.savefig(os.path.join(self.save_path, f"{plot_name}_all_models.png"))
+
+    def _get_figure_tasks(self, task_type, results):
+        """
+        Lists the figures to create for a task type.
+
+        Returns:
+            list of tuple: (method name, arguments) of the method creating each figure.
+        """
+        model_colors = self._assign_colors_to_models(results)
+        tasks = []
+        for plot_name in self.plot_types[task_type]:
+            if plot_name in ['roc_curve', 'precision_recall_curve']:
+                tasks.append(('_create_standard_plots', (plot_name, results, model_colors)))
+            elif plot_name in ['residuals', 'prediction_vs_actual']:
+                tasks.append(('_create_individual_plots', (plot_name, results)))
+
+        tasks.append(('_generate_results_table', (results,)))
+        if task_type == 'classification':
+            tasks.append(('_create_confusion_matrices', (results,)))
+        return tasks
+
+    def _create_figure(self, method_name, args):
+        """Creates one figure, so it can be dispatched to a worker process."""
+        figure = args[0] if isinstance(args[0], str) else method_name.strip('_')
+        with stage('figure', figure=figure):
+            getattr(self, method_name)(*args)
 
     def create_visualizations(self, results):
         """
         Creates and saves visualizations for all models in the results.
 
+        With max_workers above 1 each figure is rendered in its own process, so the
+        wall time is roughly that of the slowest figure. A figure that fails is
+        reported without affecting the others.
+
         Args:
-            results (dict): Dictionary containing evaluation results for each model.
+            results (EvaluationResults or dict): The evaluation results of each model.
         """
+        with stage('visualizations'):
+            self._create_visualizations(results)
+
+    def _create_visualizations(self, results):
         try:
-            task_type = next(iter(results.values()))['task_type']
-            model_colors = self._assign_colors_to_models(results)
-
-            for plot_name in self.plot_types[task_type]:
-                if plot_name in ['roc_curve', 'precision_recall_curve']:
-                    self._create_standard_plots(plot_name, results, model_colors)
-                elif plot_name in ['residuals', 'prediction_vs_actual']:
-                    self._create_individual_plots(plot_name, results)
-
-            self._generate_results_table(results)
-            if task_type == 'classification':
-                self._create_confusion_matrices(results)
-        
+            results = EvaluationResults.from_dict(results)
+            tasks = self._get_figure_tasks(results.task_type, results)
         except Exception as e:
             print(f"Error in creating visualizations: {e}")
+            return
+
+        max_workers = min(self.max_workers or 1, len(tasks))
+        if max_workers > 1:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(run_recorded, self._create_figure, method_name, args)
+                           for method_name, args in tasks]
+                for future in futures:
+                    try:
+                        _, records = future.result()
+                        add_records(records)
+                    except Exception as e:
+                        print(f"Error in creating visualizations: {e}")
+        else:
+            for method_name, args in tasks:
+                try:
+                    self._create_figure(method_name, args)
+                except Exception as e:
+                    print(f"Error in creating visualizations: {e}")
     
-    def create_latex_report(self, results):
+    def _get_report_images(self):
+        """Returns the paths of the figures included in the report by image key."""
+        return {
+            'results_table': os.path.join(self.save_path, "results_table.png"),
+            'roc_curve': os.path.join(self.save_path, "roc_curve.png"),
+            'precision_recall_curve': os.path.join(self.save_path, "precision_recall_curve.png"),
+            'confusion_matrices': os.path.join(self.save_path, "all_confusion_matrices.png"),
+            'prediction_vs_actual': os.path.join(self.save_path, "prediction_vs_actual_all_models.png"),
+            'residuals': os.path.join(self.save_path, "residuals_all_models.png"),
+        }
+
+    def create_report(self, results, backends=DEFAULT_REPORT_BACKENDS):
         """
-        Generates a LaTeX report from a template with visualizations and compiles it into a PDF.
+        Builds the PDF report from the figures created by create_visualizations.
+
+        The backends are tried in order until one succeeds, so by default the report is
+        written natively with fpdf and pdflatex is only used if that fails.
 
         Args:
-            results (dict): Dictionary containing evaluation results for each model.
+            results (EvaluationResults or dict): The evaluation results of each model.
+            backends (iterable of str, optional): Names of the report backends to try.
 
         Returns:
-            str: Path to the compiled PDF report.
+            str: Path to the PDF report.
+
+        Raises:
+            RuntimeError: If no backend could build the report.
         """
-        task_type = next(iter(results.values()))['task_type']
-        current_folder = os.path.dirname(os.path.realpath(__file__))
-        template_path = os.path.join(current_folder, "report_templates", f"{task_type}_report_template.tex")
-
-        latex_output_path = os.path.join(self.save_path, "model_evaluation_report.tex")
-
-        images_dict = {
-            'logo_placeholder': os.path.join(current_folder, "report_templates", "logo-no-background.png"),
-            'results_table_placeholder': os.path.join(self.save_path, "results_table.png"),
-            'roc_curve_placeholder': os.path.join(self.save_path, "roc_curve.png"),
-            'precision_recall_curve_placeholder': os.path.join(self.save_path, "precision_recall_curve.png"),
-            'confusion_matrices_placeholder': os.path.join(self.save_path, "all_confusion_matrices.png"),
-            'prediction_vs_actual_placeholder': os.path.join(self.save_path, "prediction_vs_actual_all_models.png"),
-            'residuals_placeholder': os.path.join(self.save_path, "residuals_all_models.png"),
-        }
+        results = EvaluationResults.from_dict(results)
+        return build_report(results.task_type, self._get_report_images(), self._results_dataframe(results),
+                            os.path.join(self.save_path, REPORT_FILE_NAME), get_report_backends(backends))
 
-        with open(template_path, 'r', encoding='utf-8') as file:
-            template_content = file.read()
+    def create_latex_report(self, results):
+        """
+        Generates a LaTeX report from a template with visualizations and compiles it into a PDF.
 
-        for placeholder, image_path in images_dict.items():
-            template_content = template_content.replace(f'{{{placeholder}}}', image_path)
+        Args:
+            results (EvaluationResults or dict): The evaluation results of each model.
 
-        with open(latex_output_path, 'w', encoding='utf-8') as file:
-            file.write(template_content)
+        Returns:
+            str: Path to the compiled PDF report.
 
-        subprocess.run(['pdflatex', '-output-directory', self.save_path, latex_output_path])
\ No newline at end of file
+        Raises:
+            RuntimeError: If pdflatex fails or times out.
+        """
+        results = EvaluationResults.from_dict(results)
+        return build_report(results.task_type, self._get_report_images(), self._results_dataframe(results),
+                            os.path.join(self.save_path, REPORT_FILE_NAME), [LatexReportBackend()])
@@ -14,3 +14,19 @@ def submit():
 @main.route('/upload', methods=['POST'])
 def upload_file():
     return utils.upload_file_logic(request)
+
+@main.route('/uploads/initiate', methods=['POST'])
+def initiate_upload():
+    return utils.initiate_upload_logic(request)
+
+@main.route('/uploads/complete', methods=['POST'])
+def complete_upload():
+    return utils.complete_upload_logic(request)
+
+@main.route('/leaderboard', methods=['GET'])
+def leaderboard():
+    return utils.leaderboard_logic(request)
+
+@main.route('/history', methods=['GET'])
+def history():
+    return utils.history_logic(request)
@@ -3,14 +3,13 @@ import hashlib
 from datetime import datetime
 import logging
 from dotenv import load_dotenv
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
-from flask import current_app as app
-from config import S3_CLIENT, REQUEST_BUCKET_NAME, S3Client
+from flask import current_app as app, jsonify
+from botocore.exceptions import ClientError
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy.exc import IntegrityError
+from config import get_s3_client, REQUEST_BUCKET_NAME, S3_STALE_UPLOAD_SECONDS, S3Client
 from app.data_management import database
+from app.mail import SMTPConnection, build_message
 
 load_dotenv()
 
@@ -32,72 +31,143 @@ def ensure_directory_exists(path):
 
 def send_email(file_directory_path, receiver_email, task_type):
     """
-    Sends an email with the results and attachments.
+    Sends an email with the results and attachments over a new connection.
     If any of the files do not exist, the function raises an exception.
+
+    Workers queue the email with database.enqueue_delivery instead, and the mail
+    sender in app.mail delivers it.
     """
     try:
         sender_email = os.getenv('SENDER_EMAIL')
         password = os.getenv('SENDER_EMAIL_PASSWORD')
 
-        subject = "Model Processing Results"
-        email_body = "Your model processing is completed. Please find the results attached."
-
-        message = MIMEMultipart()
-        message['From'] = sender_email
-        message['To'] = receiver_email
-        message['Subject'] = subject
-        message.attach(MIMEText(email_body, 'plain'))
-
-        # List of files to be attached
-        file_names = {
-            'classification': [
-                "all_confusion_matrices.png",
-                "precision_recall_curve.png",
-                "results_table.png",
-                "roc_curve.png",
-                "model_evaluation_report.pdf",
-            ],
-            'regression': [
-                "results_table.png",
-                "prediction_vs_actual_all_models.png",
-                "residuals_all_models.png",
-                "model_evaluation_report.pdf",
-            ]
-        }
-
-        # Attach each file
-        for file_name in file_names[task_type]:
-            file_path = os.path.join(file_directory_path, file_name)
-            if not os.path.exists(file_path):
-                raise FileNotFoundError(f"File {file_path} not found. Email sending aborted.")
-            part = MIMEBase('application', "octet-stream")
-            with open(file_path, 'rb') as file:
-                part.set_payload(file.read())
-            encoders.encode_base64(part)
-            part.add_header('Content-Disposition', f'attachment; filename="{file_name}"')
-            message.attach(part)
-
-        # Send email
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(sender_email, password)
-        server.sendmail(sender_email, receiver_email, message.as_string())
-        server.quit()
+        message = build_message(sender_email, receiver_email, file_directory_path, task_type)
+        with SMTPConnection(sender_email, password) as connection:
+            connection.send(message)
         logging.info("Email sent successfully")
     except Exception as e:
         logging.error("Error in sending email: %s", e)
         raise
 
 
+# Form field names of the submitted files mapped to their file types and extensions
+SUBMISSION_FILES = {
+    'model': ('model', '.joblib'),
+    'train_set': ('train', '.csv'),
+    'test_set': ('test', '.csv'),
+}
+
+
+def generate_user_id(email, submission_time):
+    """
+    Creates the unique ID of a submission from a hash of the email and submission time.
+    """
+    unique_id_string = f"{email}_{submission_time}"
+    return hashlib.sha256(unique_id_string.encode()).hexdigest()
+
+
+def _upload_token_serializer():
+    """Returns the serializer signing upload tokens with the app's SECRET_KEY."""
+    if not app.secret_key:
+        raise RuntimeError("SECRET_KEY must be set to sign upload tokens")
+    return URLSafeTimedSerializer(app.secret_key, salt='presigned-upload')
+
+
+def initiate_upload_logic(request):
+    """
+    Starts a submission whose files the browser uploads directly to S3.
+
+    Expects a JSON body with the email, the task type and the name and size of each
+    file under 'files', keyed like the form fields. Returns the submission details,
+    a presigned multipart upload for each file and an upload token signed with the
+    app's secret, which the complete step requires.
+    """
+    try:
+        body = request.get_json()
+        email = body['email'].lower()
+        task_type = body['task_type'].lower()
+        submission_time = datetime.now().strftime("%Y%m%d%H%M%S")
+        user_id = generate_user_id(email, submission_time)
+
+        for field, (_, extension) in SUBMISSION_FILES.items():
+            file_info = body['files'].get(field)
+            if not file_info or not file_info['filename'].endswith(extension):
+                return jsonify({'error': f"Please upload a {extension} file for {field}"}), 400
+
+        client = S3Client(get_s3_client(), REQUEST_BUCKET_NAME)
+        uploads = {}
+        for field, (file_type, _) in SUBMISSION_FILES.items():
+            uploads[field] = client.create_presigned_upload(f"{user_id}_{file_type}",
+                                                            int(body['files'][field]['size']))
+        logging.info("Presigned uploads created for request %s", user_id)
+
+        upload_token = _upload_token_serializer().dumps({
+            'user_id': user_id,
+            'email': email,
+            'task_type': task_type,
+            'submission_time': submission_time,
+            'upload_ids': {field: upload['upload_id'] for field, upload in uploads.items()},
+        })
+        return jsonify({'user_id': user_id, 'submission_time': submission_time, 'uploads': uploads,
+                        'upload_token': upload_token})
+
+    except Exception as e:
+        logging.error("Error in initiate_upload function: %s", e)
+        return jsonify({'error': "An error occurred while submitting the model"}), 500
+
+
+def complete_upload_logic(request):
+    """
+    Finishes a submission started by initiate_upload_logic.
+
+    Expects a JSON body with the upload token returned by the initiate step and the
+    uploaded parts of each file. The submission details and upload IDs are taken from
+    the token, which is signed with the app's secret and expires with the uploads, so
+    only the browser that initiated a submission can complete it. Completing is
+    idempotent, so a browser may retry after a transient error. The request is only
+    queued once every file is verified to exist in S3.
+    """
+    try:
+        body = request.get_json()
+        try:
+            submission = _upload_token_serializer().loads(body['upload_token'],
+                                                           max_age=S3_STALE_UPLOAD_SECONDS)
+        except BadSignature:
+            return jsonify({'error': "Invalid submission"}), 400
+        user_id = submission['user_id']
+
+        client = S3Client(get_s3_client(), REQUEST_BUCKET_NAME)
+        for field, (file_type, _) in SUBMISSION_FILES.items():
+            if not client.complete_presigned_upload(f"{user_id}_{file_type}",
+                                                    submission['upload_ids'][field],
+                                                    body['uploads'][field]['parts']):
+                return jsonify({'error': f"Upload of {field} could not be verified"}), 400
+
+        try:
+            database.add_request(user_id, submission['email'], submission['submission_time'],
+                                 submission['task_type'])
+            logging.info("Model submitted successfully. Request ID: %s", user_id)
+        except IntegrityError:
+            # A concurrent or retried completion of the same submission already added it
+            logging.info("Request %s was already submitted", user_id)
+
+        return jsonify({'message': "Model submitted successfully"})
+
+    except ClientError as e:
+        logging.error("Transient error in complete_upload function: %s", e)
+        return jsonify({'error': "The upload could not be completed, please try again"}), 503
+    except Exception as e:
+        logging.error("Error in complete_upload function: %s", e)
+        return jsonify({'error': "An error occurred while submitting the model"}), 500
+
+
 def upload_file_logic(request):
     try:
         email = request.form['email'].lower()
         task_type = request.form['task_type'].lower()
         submission_time = datetime.now().strftime("%Y%m%d%H%M%S")
 
-        unique_id_string = f"{email}_{submission_time}"
-        # Create a hash of email and submission time to generate a unique ID
-        user_id = hashlib.sha256(unique_id_string.encode()).hexdigest()
+        user_id = generate_user_id(email, submission_time)
         logging.info("Unique ID generated for the request: %s", user_id)
 
         files = {
@@ -112,11 +182,8 @@ def upload_file_logic(request):
         if not all(file.filename.endswith('.csv') for file in [files['train'], files['test']]):
             return "Please upload csv files for the training and test sets"
 
-        client = S3Client(S3_CLIENT, REQUEST_BUCKET_NAME)
-
-        for file_type, file in files.items():
-            s3_file_path = f"{user_id}_{file_type}"
-            client.upload_file(file, s3_file_path)
+        client = S3Client(get_s3_client(), REQUEST_BUCKET_NAME)
+        client.upload_files({f"{user_id}_{file_type}": file for file_type, file in files.items()})
 
         database.add_request(user_id, email, submission_time, task_type)
         logging.info("Model submitted successfully. Request ID: %s", user_id)
@@ -126,3 +193,53 @@ def upload_file_logic(request):
     except Exception as e:
         logging.error("Error in upload_file function: %s", e)
         return "An error occurred while submitting the model"
+
+
+def leaderboard_logic(request):
+    """
+    Returns the leaderboard of a dataset as JSON.
+
+    Expects the dataset_key, task_type and metric query parameters, and optionally
+    limit and include_baselines.
+    """
+    try:
+        dataset_key = request.args['dataset_key']
+        task_type = request.args['task_type'].lower()
+        metric = request.args['metric']
+        limit = min(int(request.args.get('limit', 10)), 100)
+        include_baselines = request.args.get('include_baselines', 'false').lower() == 'true'
+    except (KeyError, ValueError):
+        return jsonify({'error': "dataset_key, task_type and metric are required"}), 400
+
+    try:
+        entries = database.get_leaderboard(dataset_key, task_type, metric, limit=limit,
+                                           include_baselines=include_baselines)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error("Error in leaderboard function: %s", e)
+        return jsonify({'error': "An error occurred while fetching the leaderboard"}), 500
+
+    return jsonify({'dataset_key': dataset_key, 'task_type': task_type, 'metric': metric,
+                    'entries': entries})
+
+
+def history_logic(request):
+    """
+    Returns the results of the requests submitted with an email address as JSON.
+
+    Expects the email query parameter, and optionally limit.
+    """
+    try:
+        email = request.args['email']
+        limit = min(int(request.args.get('limit', 50)), 100)
+    except (KeyError, ValueError):
+        return jsonify({'error': "email is required"}), 400
+
+    try:
+        entries = database.get_user_history(email, limit=limit)
+    except Exception as e:
+        logging.error("Error in history function: %s", e)
+        return jsonify({'error': "An error occurred while fetching the history"}), 500
+
+    return jsonify({'email': email, 'entries': entries})
@@ -0,0 +1,92 @@
+"""
+Hammers the requests database from several processes at once.
+
+Every process adds requests, updates their status and lists the pending ones in a
+loop, as web processes and workers do. The benchmark reports the throughput and
+latency of each operation and how many failed with "database is locked".
+Each journal mode is measured against a fresh database.
+
+Usage:
+    python -m benchmarks.database_benchmark --processes 8 --operations 500 --journal-modes WAL DELETE
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+
+OPERATIONS = ['add_request', 'update_request_status', 'get_pending_requests']
+
+
+def run_process(process_index, num_operations):
+    """Runs the operation mix in one process and returns the latencies and failures of each operation."""
+    # Imported here so the database module picks up the instance directory set by main
+    from sqlalchemy.exc import OperationalError
+    import app.data_management.database as database
+
+    latencies = {operation: [] for operation in OPERATIONS}
+    failures = {operation: 0 for operation in OPERATIONS}
+    for index in range(num_operations):
+        user_id = f"{process_index}-{index}"
+        calls = [
+            ('add_request', lambda: database.add_request(user_id, 'user@example.com',
+                                                         f"{time.time():.6f}", 'classification')),
+            ('update_request_status', lambda: database.update_request_status(user_id, 'COMPLETED')),
+            ('get_pending_requests', database.get_pending_requests),
+        ]
+        for operation, call in calls:
+            start = time.perf_counter()
+            try:
+                call()
+            except OperationalError:
+                failures[operation] += 1
+                continue
+            latencies[operation].append(time.perf_counter() - start)
+    return latencies, failures
+
+
+def run_benchmark(journal_mode, num_processes, num_operations):
+    """Runs the benchmark against a fresh database and returns its wall time and merged results."""
+    instance_dir = tempfile.mkdtemp()
+    os.environ['METRICA_INSTANCE_DIR'] = instance_dir
+    os.environ['SQLITE_JOURNAL_MODE'] = journal_mode
+    try:
+        # Spawned processes import the database module with the settings above
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(num_processes) as pool:
+            # Create the database before the clock starts
+            pool.apply(run_process, (-1, 0))
+            start = time.perf_counter()
+            runs = pool.starmap(run_process, [(index, num_operations) for index in range(num_processes)])
+            wall_time = time.perf_counter() - start
+    finally:
+        shutil.rmtree(instance_dir)
+
+    latencies = {operation: [latency for run, _ in runs for latency in run[operation]] for operation in OPERATIONS}
+    failures = {operation: sum(run[operation] for _, run in runs) for operation in OPERATIONS}
+    return wall_time, latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--operations', type=int, default=200,
+                        help="Iterations of the operation mix per process.")
+    parser.add_argument('--journal-modes', nargs='+', default=['WAL', 'DELETE'])
+    args = parser.parse_args()
+
+    print(f"{'journal':<9}{'operation':<24}{'ops/s':>10}{'p50 (ms)':>10}{'p99 (ms)':>10}{'locked':>8}")
+    for journal_mode in args.journal_modes:
+        wall_time, latencies, failures = run_benchmark(journal_mode, args.processes, args.operations)
+        for operation in OPERATIONS:
+            samples = sorted(latencies[operation])
+            p50 = statistics.median(samples) * 1000 if samples else float('nan')
+            p99 = samples[int(len(samples) * 0.99) - 1] * 1000 if samples else float('nan')
+            print(f"{journal_mode:<9}{operation:<24}{len(samples) / wall_time:>10.0f}"
+                  f"{p50:>10.2f}{p99:>10.2f}{failures[operation]:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Compares the fused MetricsEvaluator kernel against the per-metric sklearn functions.
+
+Usage:
+    python -m benchmarks.metrics_benchmark --rows 1000000 5000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.model_evaluation.evaluation_metrics import MetricsEvaluator
+
+
+def generate_predictions(task_type, num_rows, num_classes, rng):
+    """Generates synthetic true and predicted values for a task type."""
+    if task_type == 'classification':
+        y_true = rng.integers(0, num_classes, num_rows)
+        y_pred = np.where(rng.random(num_rows) < 0.8, y_true, rng.integers(0, num_classes, num_rows))
+    else:
+        y_true = rng.normal(size=num_rows)
+        y_pred = y_true + rng.normal(scale=0.3, size=num_rows)
+    return y_true, y_pred
+
+
+def time_metrics(evaluator, task_type, y_true, y_pred, repeats):
+    """Returns the best wall time over several runs and the scores of the last run."""
+    best_time = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        scores = evaluator.calculate_metrics(task_type, y_true, y_pred)
+        best_time = min(best_time, time.perf_counter() - start)
+    return best_time, scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 5_000_000])
+    parser.add_argument('--classes', type=int, default=5)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    fused = MetricsEvaluator()
+    reference = MetricsEvaluator(fused=False)
+
+    print(f"{'task':<16}{'rows':>12}{'sklearn (s)':>14}{'fused (s)':>12}{'speedup':>10}{'max diff':>12}")
+    for task_type in ['classification', 'regression']:
+        for num_rows in args.rows:
+            y_true, y_pred = generate_predictions(task_type, num_rows, args.classes, rng)
+            reference_time, reference_scores = time_metrics(reference, task_type, y_true, y_pred, args.repeats)
+            fused_time, fused_scores = time_metrics(fused, task_type, y_true, y_pred, args.repeats)
+            max_diff = max(abs(fused_scores[name] - score) for name, score in reference_scores.items())
+            print(f"{task_type:<16}{num_rows:>12}{reference_time:>14.3f}{fused_time:>12.3f}"
+                  f"{reference_time / fused_time:>9.1f}x{max_diff:>12.1e}")
+
+
+if __name__ == '__main__':
+    main()
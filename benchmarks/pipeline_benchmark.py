@@ -0,0 +1,213 @@
+"""
+Runs the evaluation pipeline end to end on synthetic datasets of several sizes.
+
+For every task type and size (rows x features) a training set, a test set and a
+fitted user model are generated and served from a local directory standing in for
+S3. The benchmark then times each stage of a request: RequestProcessor.process_request,
+MetricsEvaluator on the user model's predictions, ModelVisualizer.create_visualizations
+and the PDF report. Wall time and peak RSS are recorded per stage.
+
+With --save-baseline the measurements are written to a JSON file; with --baseline
+they are compared against one, and the benchmark fails if a stage got slower or
+uses more memory than the tolerance allows.
+
+Usage:
+    python -m benchmarks.pipeline_benchmark --sizes 5000x20 50000x20 --save-baseline baseline.json
+    python -m benchmarks.pipeline_benchmark --sizes 5000x20 50000x20 --baseline baseline.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import resource
+import types
+
+import joblib
+import pandas as pd
+from sklearn.datasets import make_classification, make_regression
+from sklearn.linear_model import LinearRegression, LogisticRegression
+
+from app.model_evaluation.evaluation_metrics import MetricsEvaluator
+from app.model_evaluation.process_request import RequestProcessor
+from app.model_evaluation.visualization import ModelVisualizer
+
+STAGES = ['process_request', 'metrics', 'visualizations', 'report']
+
+# Increases below these amounts are noise, however large relative to the baseline
+ABSOLUTE_SLACK = {'seconds': 0.05, 'peak_rss_mb': 10.0}
+
+
+class LocalStorageClient:
+    """Stand-in for S3Client serving the request's files from a local directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def file_exists(self, file_name):
+        return os.path.exists(os.path.join(self.directory, file_name))
+
+    def get_content_hash(self, file_name):
+        with open(os.path.join(self.directory, file_name), 'rb') as file:
+            return hashlib.md5(file.read()).hexdigest()
+
+    def download_file(self, file_name, local_path):
+        shutil.copyfile(os.path.join(self.directory, file_name), local_path)
+
+    def download_files(self, files):
+        for file_name, local_path in files.items():
+            self.download_file(file_name, local_path)
+
+
+def parse_size(size):
+    """Parses a size given as ROWSxFEATURES."""
+    rows, features = size.lower().split('x')
+    return int(rows), int(features)
+
+
+def generate_request(directory, user_id, task_type, num_rows, num_features):
+    """
+    Writes the training set, test set and user model of a synthetic request.
+
+    The test set has num_rows rows and the training set as many again.
+    """
+    if task_type == 'classification':
+        X, y = make_classification(2 * num_rows, num_features, n_informative=max(2, min(num_features // 2, 10)),
+                                   n_redundant=0, random_state=0)
+        model = LogisticRegression(max_iter=200)
+    else:
+        X, y = make_regression(2 * num_rows, num_features, noise=10.0, random_state=0)
+        model = LinearRegression()
+
+    data = pd.DataFrame(X, columns=[f"feature_{index}" for index in range(num_features)])
+    data['target'] = y
+    data.iloc[:num_rows].to_csv(os.path.join(directory, f"{user_id}_train"), index=False)
+    data.iloc[num_rows:].to_csv(os.path.join(directory, f"{user_id}_test"), index=False)
+    model.fit(data.iloc[:num_rows, :-1], y[:num_rows])
+    joblib.dump(model, os.path.join(directory, f"{user_id}_model"))
+
+
+def _reset_peak_rss():
+    """Resets the process's peak RSS on Linux; returns False where that is not supported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    """Returns the process's peak RSS in MB since the last reset."""
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Peak over the process's lifetime; kilobytes on Linux, bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+
+
+def measure(stage_function):
+    """Runs a stage and returns its result, wall time in seconds and peak RSS in MB."""
+    _reset_peak_rss()
+    start = time.perf_counter()
+    result = stage_function()
+    return result, time.perf_counter() - start, _peak_rss_mb()
+
+
+def run_pipeline(task_type, num_rows, num_features, n_jobs, lean_loading=False):
+    """Runs every stage of one synthetic request and returns the measurements per stage."""
+    directory = tempfile.mkdtemp()
+    try:
+        storage_directory = os.path.join(directory, 'storage')
+        save_path = os.path.join(directory, 'request')
+        visuals_path = os.path.join(save_path, 'visuals')
+        for path in [storage_directory, save_path, visuals_path]:
+            os.makedirs(path)
+
+        user_id = f"benchmark_{task_type}_{num_rows}x{num_features}"
+        generate_request(storage_directory, user_id, task_type, num_rows, num_features)
+        request = types.SimpleNamespace(user_id=user_id, task_type=task_type, email='benchmark@example.com')
+        processor = RequestProcessor(request, LocalStorageClient(storage_directory), save_path, n_jobs=n_jobs,
+                                     lean_loading=lean_loading)
+        visualizer = ModelVisualizer(visuals_path)
+
+        results, seconds, rss = measure(processor.process_request)
+        measurements = {'process_request': {'seconds': seconds, 'peak_rss_mb': rss}}
+
+        stages = {
+            'metrics': lambda: MetricsEvaluator().calculate_metrics(task_type, results.y_true,
+                                                                    results.predictions_of('user_model')),
+            'visualizations': lambda: visualizer.create_visualizations(results),
+            'report': lambda: visualizer.create_report(results, backends=['fpdf']),
+        }
+        for stage, stage_function in stages.items():
+            _, seconds, rss = measure(stage_function)
+            measurements[stage] = {'seconds': seconds, 'peak_rss_mb': rss}
+        return measurements
+    finally:
+        shutil.rmtree(directory)
+
+
+def compare(measurements, baseline, tolerance):
+    """Returns a description of every measurement that regressed beyond the tolerance."""
+    regressions = []
+    for case, stages in measurements.items():
+        for stage, values in stages.items():
+            reference = baseline.get(case, {}).get(stage)
+            if reference is None:
+                continue
+            for name, value in values.items():
+                if value > reference[name] * (1 + tolerance) + ABSOLUTE_SLACK[name]:
+                    regressions.append(f"{case} {stage} {name}: {value:.2f} vs baseline {reference[name]:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=['5000x20', '50000x20'],
+                        help="Test set sizes as ROWSxFEATURES.")
+    parser.add_argument('--task-types', nargs='+', default=['classification', 'regression'])
+    parser.add_argument('--n-jobs', type=int, default=1, help="Processes training the baselines.")
+    parser.add_argument('--lean-loading', action='store_true', help="Load the datasets with load_lean_csv.")
+    parser.add_argument('--baseline', help="JSON file of earlier measurements to compare against.")
+    parser.add_argument('--save-baseline', help="JSON file to write the measurements to.")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed relative increase over the baseline before a stage counts as regressed.")
+    args = parser.parse_args()
+
+    if not _reset_peak_rss():
+        print("Peak RSS cannot be reset on this platform; it is reported over the whole run.")
+
+    measurements = {}
+    print(f"{'case':<28}{'stage':<18}{'wall (s)':>10}{'peak RSS (MB)':>15}")
+    for task_type in args.task_types:
+        for size in args.sizes:
+            num_rows, num_features = parse_size(size)
+            case = f"{task_type}/{size}"
+            measurements[case] = run_pipeline(task_type, num_rows, num_features, args.n_jobs, args.lean_loading)
+            for stage in STAGES:
+                values = measurements[case][stage]
+                print(f"{case:<28}{stage:<18}{values['seconds']:>10.2f}{values['peak_rss_mb']:>15.1f}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as file:
+            json.dump(measurements, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(measurements, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Times every PDF report backend on synthetic evaluation results.
+
+The figures are rendered once per task type and each backend then builds the
+report from them. Backends that are unavailable, like pdflatex without a TeX
+installation, are reported as failed.
+
+Usage:
+    python -m benchmarks.report_benchmark --rows 100000 --repeats 3
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+from app.model_evaluation.report import REPORT_BACKEND_CLASSES, build_report, get_report_backends
+from app.model_evaluation.visualization import ModelVisualizer
+
+CLASSIFICATION_MODELS = ['user_model', 'LogisticRegression', 'DecisionTree_Classification',
+                         'RandomForest_Classification', 'AdaBoost']
+REGRESSION_MODELS = ['user_model', 'LinearRegression', 'LassoRegression', 'DecisionTree_Regression',
+                     'RandomForest_Regression', 'GradientBoosting_Regression']
+
+
+def generate_results(task_type, num_rows, rng):
+    """Generates synthetic evaluation results of every baseline model for a task type."""
+    results = {}
+    if task_type == 'classification':
+        y_test = rng.integers(0, 2, num_rows)
+        for model_name in CLASSIFICATION_MODELS:
+            y_scores = np.clip(0.5 * y_test + 0.6 * rng.random(num_rows), 0, 1)
+            predictions = (y_scores > 0.5).astype(int)
+            results[model_name] = {'y_test': y_test, 'predictions': predictions, 'y_scores': y_scores,
+                                   'task_type': task_type, 'accuracy': float(np.mean(predictions == y_test))}
+    else:
+        y_test = rng.normal(size=num_rows)
+        for model_name in REGRESSION_MODELS:
+            predictions = y_test + rng.normal(scale=0.3, size=num_rows)
+            results[model_name] = {'y_test': y_test, 'predictions': predictions, 'y_scores': None,
+                                   'task_type': task_type, 'mse': float(np.mean((predictions - y_test) ** 2))}
+    return results
+
+
+def time_backend(backend_name, task_type, visualizer, results, repeats):
+    """Returns the best wall time of a backend, or None if it failed."""
+    backend = get_report_backends([backend_name])
+    output_path = os.path.join(visualizer.save_path, f"report_{backend_name}.pdf")
+    best_time = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        try:
+            build_report(task_type, visualizer._get_report_images(), visualizer._results_dataframe(results),
+                         output_path, backend)
+        except RuntimeError:
+            return None
+        best_time = min(best_time, time.perf_counter() - start)
+    return best_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--backends', nargs='+', default=list(REPORT_BACKEND_CLASSES))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'task type':<16}{'backend':<10}{'report (s)':>12}")
+    for task_type in ['classification', 'regression']:
+        save_path = tempfile.mkdtemp()
+        try:
+            results = generate_results(task_type, args.rows, rng)
+            visualizer = ModelVisualizer(save_path)
+            visualizer.create_visualizations(results)
+            for backend_name in args.backends:
+                seconds = time_backend(backend_name, task_type, visualizer, results, args.repeats)
+                timing = f"{seconds:>12.3f}" if seconds is not None else f"{'failed':>12}"
+                print(f"{task_type:<16}{backend_name:<10}{timing}")
+        finally:
+            shutil.rmtree(save_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Measures the import time and memory of the web and worker entry points.
+
+Each module is imported in a fresh interpreter. The benchmark fails if an entry
+point loads a heavy framework that should only be imported by the jobs using it.
+
+Usage:
+    python -m benchmarks.startup_benchmark --repeats 5
+"""
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ENTRY_POINTS = [
+    'app',
+    'config',
+    'app.utils',
+    'app.model_evaluation.process_request',
+    'app.model_evaluation.visualization',
+]
+
+# Modules no entry point may import at startup
+FORBIDDEN_MODULES = ['keras', 'tensorflow']
+
+MEASURE_IMPORT = """
+import sys, time, json, resource
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': elapsed,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'forbidden': [name for name in {forbidden!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure_import(module):
+    """Imports a module in a fresh interpreter and returns its timing and memory."""
+    code = MEASURE_IMPORT.format(module=module, forbidden=FORBIDDEN_MODULES)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':<42}{'import (s)':>12}{'max RSS (MB)':>14}")
+    for module in ENTRY_POINTS:
+        runs = [measure_import(module) for _ in range(args.repeats)]
+        seconds = statistics.median(run['seconds'] for run in runs)
+        max_rss_mb = statistics.median(run['max_rss_mb'] for run in runs)
+        print(f"{module:<42}{seconds:>12.3f}{max_rss_mb:>14.1f}")
+        if runs[0]['forbidden']:
+            failures.append(f"{module} imports {', '.join(runs[0]['forbidden'])}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
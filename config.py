@@ -1,34 +1,107 @@
 import os
 import logging
+import functools
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
-import boto3
 from botocore.exceptions import ClientError
 
 # Load environment variables and configure logging
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# AWS S3 configuration
-S3_CLIENT = boto3.client(
-    's3',
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-)
-
 # AWS S3 bucket name
 REQUEST_BUCKET_NAME = os.getenv('REQUEST_BUCKET_NAME')
 
+# Alternative S3 endpoint, e.g. a local MinIO or moto server for development and tests
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')
+
+# Transfer tuning: part size of multipart transfers, threads per file and files at once
+S3_MULTIPART_CHUNKSIZE = int(os.getenv('S3_MULTIPART_CHUNKSIZE_MB', '16')) * 1024 * 1024
+S3_MAX_CONCURRENCY = int(os.getenv('S3_MAX_CONCURRENCY', '10'))
+S3_MAX_PARALLEL_FILES = int(os.getenv('S3_MAX_PARALLEL_FILES', '3'))
+# Parts of one file held in memory at once while streaming it into a multipart upload
+S3_MAX_PARTS_IN_FLIGHT = int(os.getenv('S3_MAX_PARTS_IN_FLIGHT', '2'))
+
+# Multipart uploads started longer ago than this are abandoned and aborted by abort_stale_uploads
+S3_STALE_UPLOAD_SECONDS = int(os.getenv('S3_STALE_UPLOAD_HOURS', '24')) * 3600
+# Error codes of transient S3 failures, after which a multipart upload is kept for a retry
+S3_RETRYABLE_ERROR_CODES = {'InternalError', 'ServiceUnavailable', 'SlowDown', 'RequestTimeout',
+                            'Throttling', 'OperationAborted', 'ConditionalRequestConflict'}
+
+
+@functools.lru_cache(maxsize=None)
+def get_s3_client():
+    """
+    Returns the shared boto3 S3 client, creating it on first use.
+
+    Creating the client loads boto3's service models, so it is deferred until a
+    request actually talks to S3 instead of happening on every import.
+    """
+    import boto3
+
+    from botocore.config import Config
+
+    return boto3.client(
+        's3',
+        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+        endpoint_url=S3_ENDPOINT_URL,
+        # Enough pooled connections for every part of every file transferred at once
+        config=Config(max_pool_connections=S3_MAX_CONCURRENCY * S3_MAX_PARALLEL_FILES),
+    )
+
+
+def is_retryable_error(error):
+    """
+    Checks whether an S3 ClientError is transient, so the same request may succeed later.
+
+    Args:
+        error (ClientError): The error raised by the S3 client.
+
+    Returns:
+        bool: True for throttling, timeouts and server errors, False otherwise.
+    """
+    status_code = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+    return error.response['Error']['Code'] in S3_RETRYABLE_ERROR_CODES or status_code >= 500
+
+
+def __getattr__(name):
+    # Keeps `from config import S3_CLIENT` working while creating the client lazily
+    if name == 'S3_CLIENT':
+        return get_s3_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 class S3Client:
     """
     Class to interact with AWS S3 for file operations.
     """
 
-    def __init__(self, s3_client, bucket_name):
+    def __init__(self, s3_client, bucket_name, multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+                 max_concurrency=S3_MAX_CONCURRENCY, max_parallel_files=S3_MAX_PARALLEL_FILES,
+                 max_parts_in_flight=S3_MAX_PARTS_IN_FLIGHT):
         """
         Initializes the S3Client with a boto3 client and bucket name.
+
+        Args:
+            s3_client (boto3.client): The boto3 S3 client.
+            bucket_name (str): The name of the bucket.
+            multipart_chunksize (int, optional): Part size in bytes of multipart transfers.
+                Files larger than this are transferred in parts.
+            max_concurrency (int, optional): Threads transferring the parts of one file.
+            max_parallel_files (int, optional): Files transferred at once by the batch methods.
+            max_parts_in_flight (int, optional): Parts of one uploaded file read into memory
+                at once, which bounds the upload buffers to this many part sizes per file.
         """
+        from boto3.s3.transfer import TransferConfig
+
         self.client = s3_client
         self.bucket_name = bucket_name
+        self.max_parallel_files = max_parallel_files
+        self.max_parts_in_flight = max(1, max_parts_in_flight)
+        self.transfer_config = TransferConfig(multipart_threshold=multipart_chunksize,
+                                              multipart_chunksize=multipart_chunksize,
+                                              max_concurrency=max_concurrency)
 
     def file_exists(self, file_name):
         """
@@ -51,26 +124,262 @@ class S3Client:
                             file_name, self.bucket_name, e)
                 raise
 
+    def get_content_hash(self, file_name):
+        """
+        Returns a hash of a file's contents without downloading it.
+
+        Uses the object's ETag, which S3 derives from the uploaded bytes.
+
+        Args:
+            file_name (str): The name of the file in the bucket.
+
+        Returns:
+            str: The content hash of the file.
+        """
+        try:
+            response = self.client.head_object(Bucket=self.bucket_name, Key=file_name)
+            return response['ETag'].strip('"')
+        except ClientError as e:
+            logging.error("Error fetching metadata of file %s in S3 bucket %s: %s",
+                        file_name, self.bucket_name, e)
+            raise
+
+    def supports_conditional_writes(self):
+        """
+        Checks whether the installed botocore can send conditional (If-None-Match) writes.
+
+        Returns:
+            bool: True if PutObject and CompleteMultipartUpload accept IfNoneMatch.
+        """
+        service_model = self.client.meta.service_model
+        return all('IfNoneMatch' in service_model.operation_model(operation).input_shape.members
+                   for operation in ['PutObject', 'CompleteMultipartUpload'])
+
+    def _upload_parts(self, file, file_name, first_chunk, conditional_args):
+        """
+        Streams a file object into a multipart upload.
+
+        At most max_parts_in_flight parts (and never more than max_concurrency) are
+        held in memory at once, counting the one being read, so memory use is bounded
+        by a few part sizes rather than by the file size or the thread count.
+
+        Returns:
+            bool: True if the object was created, False if it already existed.
+        """
+        chunk_size = self.transfer_config.multipart_chunksize
+        max_in_flight = min(self.max_parts_in_flight, self.transfer_config.max_concurrency)
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket_name,
+                                                        Key=file_name)['UploadId']
+        try:
+            parts = {}
+            with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+                in_flight = {}
+                part_number, chunk = 1, first_chunk
+                while chunk:
+                    future = executor.submit(self.client.upload_part, Bucket=self.bucket_name,
+                                             Key=file_name, UploadId=upload_id,
+                                             PartNumber=part_number, Body=chunk)
+                    in_flight[future] = part_number
+                    # Wait for a slot before reading the next part into memory
+                    if len(in_flight) >= max_in_flight:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            parts[in_flight.pop(future)] = future.result()['ETag']
+                    part_number, chunk = part_number + 1, file.read(chunk_size)
+                for future, number in in_flight.items():
+                    parts[number] = future.result()['ETag']
+
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket_name, Key=file_name, UploadId=upload_id,
+                MultipartUpload={'Parts': [{'PartNumber': number, 'ETag': parts[number]}
+                                           for number in sorted(parts)]},
+                **conditional_args)
+            return True
+        except Exception:
+            self.client.abort_multipart_upload(Bucket=self.bucket_name, Key=file_name,
+                                               UploadId=upload_id)
+            raise
+
     def upload_file(self, file, file_name):
         """
-        Uploads a file to the S3 bucket.
+        Uploads a file to the S3 bucket unless a file with that name already exists.
+
+        The existence check is part of the write itself (If-None-Match: *), so no
+        separate round trip is made and two concurrent uploads cannot both succeed.
+        Older botocore versions without conditional writes upload unconditionally;
+        object names embed a per-submission hash, so collisions are not expected.
+        Files are streamed: small ones with a single put, larger ones in parts.
 
         Args:
             file: The file object to upload.
             file_name (str): The name of the file in the bucket.
         """
+        # Imported here since the app package imports this module
+        from app.instrumentation import stage
+
+        with stage('s3_upload'):
+            self._upload_file(file, file_name)
+
+    def _upload_file(self, file, file_name):
+        conditional_args = {'IfNoneMatch': '*'} if self.supports_conditional_writes() else {}
         try:
-            if not self.file_exists(file_name):
-                self.client.upload_fileobj(file, self.bucket_name, file_name)
-                logging.info("Uploaded file %s to S3 bucket %s", file_name, self.bucket_name)
+            chunk_size = self.transfer_config.multipart_chunksize
+            first_chunk = file.read(chunk_size)
+            if len(first_chunk) < chunk_size:
+                self.client.put_object(Bucket=self.bucket_name, Key=file_name,
+                                       Body=first_chunk, **conditional_args)
             else:
+                self._upload_parts(file, file_name, first_chunk, conditional_args)
+            logging.info("Uploaded file %s to S3 bucket %s", file_name, self.bucket_name)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('PreconditionFailed', '412'):
                 logging.warning("File %s already exists in S3 bucket %s",
                                 file_name, self.bucket_name)
+                return
+            logging.error("Error uploading file %s to S3 bucket %s: %s",
+                        file_name, self.bucket_name, e)
+            raise
         except Exception as e:
             logging.error("Error uploading file %s to S3 bucket %s: %s",
                         file_name, self.bucket_name, e)
             raise
 
+    def upload_files(self, files):
+        """
+        Uploads several files to the S3 bucket concurrently.
+
+        Args:
+            files (dict): Names of the files in the bucket mapped to file objects.
+
+        Raises:
+            Exception: The first error raised by any upload, after all have finished.
+        """
+        if not files:
+            return
+        with ThreadPoolExecutor(max_workers=min(len(files), self.max_parallel_files)) as executor:
+            futures = [executor.submit(self.upload_file, file, file_name)
+                       for file_name, file in files.items()]
+        for future in futures:
+            future.result()
+
+    def create_presigned_upload(self, file_name, file_size, expires_in=3600):
+        """
+        Starts a multipart upload that a client completes directly against S3.
+
+        Args:
+            file_name (str): The name of the file in the bucket.
+            file_size (int): The size of the file in bytes.
+            expires_in (int, optional): Seconds the part URLs stay valid.
+
+        Returns:
+            dict: The upload ID, the part size in bytes and one presigned PUT URL per part.
+        """
+        # S3 allows at most 10,000 parts per upload
+        part_size = max(self.transfer_config.multipart_chunksize, -(-file_size // 10000))
+        num_parts = max(1, -(-file_size // part_size))
+        try:
+            upload_id = self.client.create_multipart_upload(Bucket=self.bucket_name,
+                                                            Key=file_name)['UploadId']
+            part_urls = [
+                self.client.generate_presigned_url(
+                    'upload_part',
+                    Params={'Bucket': self.bucket_name, 'Key': file_name,
+                            'UploadId': upload_id, 'PartNumber': part_number},
+                    ExpiresIn=expires_in)
+                for part_number in range(1, num_parts + 1)
+            ]
+            logging.info("Created presigned upload of %d parts for file %s in S3 bucket %s",
+                         num_parts, file_name, self.bucket_name)
+            return {'upload_id': upload_id, 'part_size': part_size, 'part_urls': part_urls}
+        except Exception as e:
+            logging.error("Error creating presigned upload for file %s in S3 bucket %s: %s",
+                        file_name, self.bucket_name, e)
+            raise
+
+    def complete_presigned_upload(self, file_name, upload_id, parts):
+        """
+        Completes a multipart upload whose parts a client sent directly to S3.
+
+        Like upload_file, an existing file with the same name is never overwritten.
+        Completing is idempotent: a retry after a completion whose response was lost
+        finds the file in place and succeeds. The upload is only aborted on errors
+        that retrying cannot fix, so a transient failure keeps the parts already sent.
+
+        Args:
+            file_name (str): The name of the file in the bucket.
+            upload_id (str): The upload ID returned by create_presigned_upload.
+            parts (list of dict): 'PartNumber' and 'ETag' of every uploaded part.
+
+        Returns:
+            bool: True if the file now exists in the bucket, False otherwise.
+
+        Raises:
+            ClientError: On a transient error, after which the client may retry.
+        """
+        conditional_args = {'IfNoneMatch': '*'} if self.supports_conditional_writes() else {}
+        parts = sorted(({'PartNumber': int(part['PartNumber']), 'ETag': part['ETag']} for part in parts),
+                       key=lambda part: part['PartNumber'])
+        try:
+            self.client.complete_multipart_upload(Bucket=self.bucket_name, Key=file_name,
+                                                  UploadId=upload_id,
+                                                  MultipartUpload={'Parts': parts},
+                                                  **conditional_args)
+            logging.info("Completed upload of file %s to S3 bucket %s", file_name, self.bucket_name)
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code in ('NoSuchUpload', 'PreconditionFailed', '412') and self.file_exists(file_name):
+                # Object names embed the submission's ID, so the existing file is this upload,
+                # completed by an earlier attempt
+                logging.info("File %s was already uploaded to S3 bucket %s", file_name, self.bucket_name)
+                if error_code != 'NoSuchUpload':
+                    self._abort_upload(file_name, upload_id)
+                return True
+            if is_retryable_error(e):
+                logging.warning("Transient error completing upload of file %s to S3 bucket %s: %s",
+                                file_name, self.bucket_name, e)
+                raise
+            logging.error("Error completing upload of file %s to S3 bucket %s: %s",
+                        file_name, self.bucket_name, e)
+            if error_code != 'NoSuchUpload':
+                self._abort_upload(file_name, upload_id)
+            return False
+        return self.file_exists(file_name)
+
+    def _abort_upload(self, file_name, upload_id):
+        """Aborts a multipart upload so S3 discards its parts, logging rather than raising on failure."""
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket_name, Key=file_name,
+                                               UploadId=upload_id)
+        except ClientError as e:
+            logging.error("Error aborting upload %s of file %s in S3 bucket %s: %s",
+                          upload_id, file_name, self.bucket_name, e)
+
+    def abort_stale_uploads(self, max_age=S3_STALE_UPLOAD_SECONDS):
+        """
+        Aborts the multipart uploads that were started but never completed.
+
+        Browsers that start a presigned upload and never call /uploads/complete would
+        otherwise leave their parts stored, and billed, indefinitely. Upload tokens
+        expire after the same age, so an aborted upload can no longer be completed.
+
+        Args:
+            max_age (float, optional): Seconds after which an incomplete upload is stale.
+
+        Returns:
+            int: The number of uploads aborted.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age)
+        aborted = 0
+        paginator = self.client.get_paginator('list_multipart_uploads')
+        for page in paginator.paginate(Bucket=self.bucket_name):
+            for upload in page.get('Uploads', []):
+                if upload['Initiated'] < cutoff:
+                    self._abort_upload(upload['Key'], upload['UploadId'])
+                    aborted += 1
+        if aborted:
+            logging.info("Aborted %d stale uploads in S3 bucket %s", aborted, self.bucket_name)
+        return aborted
+
     def download_file(self, file_name, local_path):
         """
         Downloads a file from the S3 bucket.
@@ -79,14 +388,38 @@ class S3Client:
             file_name (str): The name of the file in the bucket.
             local_path (str): The local path where the file will be saved.
         """
+        from app.instrumentation import stage
+
         try:
-            self.client.download_file(self.bucket_name, file_name, local_path)
+            with stage('s3_download'):
+                self.client.download_file(self.bucket_name, file_name, local_path,
+                                          Config=self.transfer_config)
             logging.info("Downloaded file %s from S3 bucket %s", file_name, self.bucket_name)
         except Exception as e:
             logging.error("Error downloading file %s from S3 bucket %s: %s",
                         file_name, self.bucket_name, e)
             raise
 
+    def download_files(self, files):
+        """
+        Downloads several files from the S3 bucket concurrently.
+
+        Each file is itself downloaded in parallel parts when it is large enough.
+
+        Args:
+            files (dict): Names of the files in the bucket mapped to their local paths.
+
+        Raises:
+            Exception: The first error raised by any download, after all have finished.
+        """
+        if not files:
+            return
+        with ThreadPoolExecutor(max_workers=min(len(files), self.max_parallel_files)) as executor:
+            futures = [executor.submit(self.download_file, file_name, local_path)
+                       for file_name, local_path in files.items()]
+        for future in futures:
+            future.result()
+
     def delete_file(self, file_name):
         """
         Deletes a file from the S3 bucket.
@@ -0,0 +1,75 @@
+import os
+import signal
+import socket
+import logging
+import argparse
+import threading
+from dotenv import load_dotenv
+
+from app import instrumentation
+from app.mail import MailSender, SMTPConnection, DELIVERY_BATCH_SIZE
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def create_sender(batch_size):
+    """Creates a mail sender for the account configured in the environment."""
+    sender_email = os.getenv('SENDER_EMAIL')
+    connection = SMTPConnection(sender_email, os.getenv('SENDER_EMAIL_PASSWORD'))
+    sender_id = f"{socket.gethostname()}:{os.getpid()}"
+    return MailSender(connection, sender_email, sender_id, batch_size=batch_size)
+
+
+def run_sender(batch_size, poll_interval, metrics_port=None):
+    """
+    Sends queued results emails until SIGINT or SIGTERM is received.
+
+    Args:
+        batch_size (int): The maximum number of deliveries sent per batch.
+        poll_interval (float): Seconds between checks for due deliveries.
+        metrics_port (int, optional): Port to serve the send time histograms on.
+    """
+    stop_event = threading.Event()
+
+    def request_stop(signum, frame):
+        logging.info("Received signal %s, stopping after the current batch", signum)
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    if metrics_port:
+        instrumentation.start_metrics_server(metrics_port)
+
+    sender = create_sender(batch_size)
+    logging.info("Mail sender %s started", sender.sender_id)
+    sender.run(poll_interval, stop_event)
+    logging.info("Mail sender %s stopped", sender.sender_id)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Send the queued results emails.")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Keep running and send new emails as they are queued.")
+    parser.add_argument('--batch-size', type=int, default=DELIVERY_BATCH_SIZE,
+                        help="Maximum number of emails sent per batch.")
+    parser.add_argument('--poll-interval', type=float, default=float(os.getenv('MAIL_POLL_INTERVAL', '10')),
+                        help="Seconds between checks for queued emails in daemon mode.")
+    parser.add_argument('--metrics-port', type=int, default=int(os.getenv('MAIL_METRICS_PORT', '0')),
+                        help="Port serving send time histograms at /metrics in daemon mode.")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.daemon:
+        run_sender(args.batch_size, args.poll_interval, args.metrics_port)
+    else:
+        # Send everything that is due, then exit
+        sender = create_sender(args.batch_size)
+        with sender.connection:
+            sender.drain()
@@ -1,13 +1,24 @@
 import os
+import time
+import signal
+import socket
 import logging
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 from dotenv import load_dotenv
-import boto3
 
 import app.data_management.database as database
+from app.data_management.dataset_cache import DatasetCache
+from app.data_management.dataset_loader import SPARSE_DENSITY_THRESHOLD
+from app.model_evaluation.baseline_cache import BaselineCache
 from app.model_evaluation.process_request import RequestProcessor
-from app.model_evaluation.visualization import ModelVisualizer
+from app.model_evaluation.visualization import ModelVisualizer, MAX_SCATTER_POINTS
+from app.model_evaluation.report import DEFAULT_REPORT_BACKENDS
 import app.utils as utils
-from config import S3Client
+from app import instrumentation
+from config import get_s3_client, REQUEST_BUCKET_NAME, S3Client
 
 # Load environment variables
 load_dotenv()
@@ -15,45 +26,287 @@ load_dotenv()
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def main():
-    # Initialize S3 client
-    s3_bucket_name = os.getenv('REQUEST_BUCKET_NAME')
-    s3_client_boto = boto3.client(
-        's3',
-        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-    )
-    s3_client = S3Client(s3_client_boto, s3_bucket_name)
-
-    # Process each pending request
+# Clients and caches created once per daemon worker process by _init_worker
+_worker_context = {}
+
+# Seconds between sweeps for abandoned presigned uploads in daemon mode
+STALE_UPLOAD_SWEEP_SECONDS = 3600
+
+
+def create_context():
+    """
+    Creates the clients and settings shared by every request a process handles.
+
+    Returns:
+        dict: The S3 client, the caches and the baseline training and rendering settings.
+    """
+    dataset_cache_dir = os.getenv('DATASET_CACHE_DIR')
+    baseline_cache_dir = os.getenv('BASELINE_CACHE_DIR')
+    return {
+        's3_client': S3Client(get_s3_client(), REQUEST_BUCKET_NAME),
+        'n_jobs': int(os.getenv('BASELINE_N_JOBS', '1')),
+        'lean_loading': os.getenv('LEAN_DATASET_LOADING', 'false').lower() in ('1', 'true', 'yes'),
+        # 0 disables sparse loading
+        'sparse_density_threshold': float(os.getenv('SPARSE_DENSITY_THRESHOLD', str(SPARSE_DENSITY_THRESHOLD))),
+        'visualization_workers': int(os.getenv('VISUALIZATION_N_JOBS', '1')),
+        'scatter_point_budget': int(os.getenv('SCATTER_POINT_BUDGET', str(MAX_SCATTER_POINTS))),
+        'scatter_mode': os.getenv('SCATTER_MODE', 'sample'),
+        'report_backends': os.getenv('REPORT_BACKENDS', ','.join(DEFAULT_REPORT_BACKENDS)).split(','),
+        'dataset_cache': DatasetCache(dataset_cache_dir) if dataset_cache_dir else None,
+        'baseline_cache': BaselineCache(baseline_cache_dir) if baseline_cache_dir else None,
+    }
+
+
+def mark_failed(user_id, worker_id):
+    """
+    Marks a claimed request as FAILED, logging instead of raising if the database is unavailable.
+
+    The request is then reclaimed once its lease expires, so the worker can keep going.
+    """
     try:
-        pending_requests = database.get_pending_requests()
-        for request in pending_requests:
-            try:
-                user_directory = os.path.join('data', request.user_id)
-                utils.ensure_directory_exists(user_directory)
+        database.update_claimed_request_status(user_id, worker_id, 'FAILED')
+    except Exception as e:
+        logging.error("Could not mark Request %s as FAILED: %s", user_id, e)
+
+
+def process_request(request, worker_id, context):
+    """
+    Evaluates a claimed request, queues the report email and records the outcome.
+
+    Args:
+        request (Request): The claimed request.
+        worker_id (str): Identifier of the worker holding the request's lease.
+        context (dict): The clients and settings returned by create_context.
+
+    Returns:
+        dict: The request's instrumentation record, for instrumentation.export_request.
+    """
+    with instrumentation.record_request(request.user_id, task_type=request.task_type) as request_record:
+        try:
+            user_directory = os.path.join('data', request.user_id)
+            utils.ensure_directory_exists(user_directory)
+
+            processor = RequestProcessor(request, context['s3_client'], user_directory,
+                                         n_jobs=context['n_jobs'],
+                                         dataset_cache=context['dataset_cache'],
+                                         baseline_cache=context['baseline_cache'],
+                                         lean_loading=context['lean_loading'],
+                                         sparse_density_threshold=context['sparse_density_threshold'])
+            results = processor.process_request()
 
-                processor = RequestProcessor(request, s3_client, user_directory)
-                results = processor.process_request()
+            save_path = os.path.join(user_directory, 'visuals')
+            utils.ensure_directory_exists(save_path)
 
-                save_path = os.path.join(user_directory, 'visuals')
-                utils.ensure_directory_exists(save_path)
+            visualizer = ModelVisualizer(save_path, max_workers=context['visualization_workers'],
+                                         point_budget=context['scatter_point_budget'],
+                                         scatter_mode=context['scatter_mode'])
+            visualizer.create_visualizations(results)
+            visualizer.create_report(results, backends=context['report_backends'])
 
-                visualizer = ModelVisualizer(save_path)
-                visualizer.create_visualizations(results)
-                visualizer.create_latex_report(results)
+            database.add_result(request.user_id, request.task_type, results,
+                                email=request.email, dataset_key=processor.dataset_key)
+            # The mail sender (scripts/mail_sender.py) delivers the results email
+            database.enqueue_delivery(request.user_id, request.email, request.task_type,
+                                      os.path.abspath(save_path))
+            database.update_claimed_request_status(request.user_id, worker_id, 'COMPLETED')
+            request_record['status'] = 'COMPLETED'
 
-                # database.add_result(request.user_id, request.task_type, results)
-                utils.send_email(save_path, request.email, request.task_type)
-                database.update_request_status(request.user_id, 'COMPLETED')
+        except Exception as e:
+            logging.error("Failed to process Request %s: %s", request.user_id, e)
+            # Without this the request would be reclaimed and retried once its lease expires
+            mark_failed(request.user_id, worker_id)
+            request_record['status'] = 'FAILED'
 
+    return request_record
+
+
+def abort_stale_uploads():
+    """Aborts abandoned presigned uploads, logging instead of raising so processing goes on."""
+    try:
+        S3Client(get_s3_client(), REQUEST_BUCKET_NAME).abort_stale_uploads()
+    except Exception as e:
+        logging.error("Error aborting stale uploads: %s", e)
+
+
+class LeaseHeartbeat:
+    """
+    Renews the lease of a request from a background thread while it is processed.
+
+    Used in one-shot mode, where no daemon parent renews leases, so requests running
+    longer than LEASE_DURATION_SECONDS are not reclaimed by another worker.
+    """
+
+    def __init__(self, user_id, worker_id, interval=database.LEASE_DURATION_SECONDS / 3):
+        self.user_id = user_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{user_id}", daemon=True)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                if not database.renew_lease(self.user_id, self.worker_id):
+                    return
             except Exception as e:
-                logging.error("Failed to process Request %s: %s", request.user_id, e)
-                # Uncomment when database operations are ready
-                # database.update_request_status(request.user_id, 'FAILED')
+                # A transient database error must not end the heartbeat
+                logging.error("Error renewing lease on Request %s: %s", self.user_id, e)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop_event.set()
+        self._thread.join()
+
+
+def main():
+    context = create_context()
+
+    # Claim and process pending requests until none are left. Several workers can
+    # run this loop against the same database without processing a request twice.
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    abort_stale_uploads()
+    try:
+        while True:
+            request = database.claim_request(worker_id)
+            if request is None:
+                break
+            with LeaseHeartbeat(request.user_id, worker_id):
+                request_record = process_request(request, worker_id, context)
+            instrumentation.export_request(request_record)
 
     except Exception as e:
-        logging.error("Error fetching pending requests: %s", e)
+        logging.error("Error claiming pending requests: %s", e)
+
+
+def _init_worker():
+    """
+    Prepares a daemon worker process before it receives its first request.
+
+    Imports the modules jobs use lazily and creates the clients, so neither cost is
+    paid per request. Keras is only preloaded when PRELOAD_KERAS is set, since the
+    registry loads it on demand and TensorFlow adds hundreds of MB to every worker.
+    Termination signals are left to the parent, which lets running requests finish
+    before shutting the pool down.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot  # noqa: F401
+    import sklearn.ensemble  # noqa: F401
+    if os.getenv('PRELOAD_KERAS'):
+        import keras  # noqa: F401
+
+    _worker_context.update(create_context())
+
+
+def _process_in_worker(request, worker_id):
+    """Processes a request inside a daemon worker process and returns its instrumentation record."""
+    return process_request(request, worker_id, _worker_context)
+
+
+def run_daemon(concurrency, poll_interval, metrics_port=None):
+    """
+    Processes requests continuously with a pool of warm worker processes.
+
+    Up to `concurrency` requests are processed at once. Leases of running requests
+    are renewed while they are processed, and abandoned presigned uploads are
+    aborted every STALE_UPLOAD_SWEEP_SECONDS. On SIGINT or SIGTERM no new requests are
+    claimed, and the daemon exits once the running ones have finished.
+
+    The instrumentation records of the requests are aggregated in this process and,
+    with a metrics port, served at /metrics for scraping.
+
+    Args:
+        concurrency (int): The maximum number of requests processed at once.
+        poll_interval (float): Seconds to wait between checks for new requests.
+        metrics_port (int, optional): Port to serve the stage histograms on.
+    """
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stop_event = threading.Event()
+    in_flight = {}
+
+    def request_stop(signum, frame):
+        logging.info("Received signal %s, finishing %d running requests", signum, len(in_flight))
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    if metrics_port:
+        instrumentation.start_metrics_server(metrics_port)
+
+    renew_interval = database.LEASE_DURATION_SECONDS / 3
+    swept_at = None
+    with ProcessPoolExecutor(max_workers=concurrency, initializer=_init_worker) as executor:
+        logging.info("Worker %s started with concurrency %d", worker_id, concurrency)
+        while not stop_event.is_set() or in_flight:
+            if swept_at is None or time.monotonic() - swept_at > STALE_UPLOAD_SWEEP_SECONDS:
+                abort_stale_uploads()
+                swept_at = time.monotonic()
+
+            for future in [future for future in in_flight if future.done()]:
+                user_id, _ = in_flight.pop(future)
+                try:
+                    instrumentation.export_request(future.result())
+                except BrokenProcessPool as e:
+                    # The pool cannot be used again; exit and let the supervisor restart us
+                    logging.error("Worker pool broke while processing Request %s: %s", user_id, e)
+                    mark_failed(user_id, worker_id)
+                    stop_event.set()
+                except Exception as e:
+                    logging.error("Worker process failed on Request %s: %s", user_id, e)
+                    mark_failed(user_id, worker_id)
+
+            now = time.monotonic()
+            for future, (user_id, renewed_at) in list(in_flight.items()):
+                if now - renewed_at > renew_interval:
+                    database.renew_lease(user_id, worker_id)
+                    in_flight[future] = (user_id, now)
+
+            try:
+                while not stop_event.is_set() and len(in_flight) < concurrency:
+                    request = database.claim_request(worker_id)
+                    if request is None:
+                        break
+                    try:
+                        future = executor.submit(_process_in_worker, request, worker_id)
+                    except BrokenProcessPool:
+                        database.update_claimed_request_status(request.user_id, worker_id, 'PENDING')
+                        stop_event.set()
+                        raise
+                    in_flight[future] = (request.user_id, time.monotonic())
+            except Exception as e:
+                logging.error("Error claiming pending requests: %s", e)
+
+            if in_flight:
+                wait(list(in_flight), timeout=poll_interval, return_when=FIRST_COMPLETED)
+            else:
+                stop_event.wait(poll_interval)
+
+    logging.info("Worker %s stopped", worker_id)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Process pending model evaluation requests.")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Keep running and process new requests as they arrive.")
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('WORKER_CONCURRENCY', '2')),
+                        help="Maximum number of requests processed at once in daemon mode.")
+    parser.add_argument('--poll-interval', type=float, default=float(os.getenv('WORKER_POLL_INTERVAL', '10')),
+                        help="Seconds between checks for new requests in daemon mode.")
+    parser.add_argument('--metrics-port', type=int, default=int(os.getenv('METRICS_PORT', '0')),
+                        help="Port serving per-stage timing and memory histograms at /metrics in daemon mode.")
+    return parser.parse_args()
+
 
 if __name__ == '__main__':
-    main()
+    args = parse_args()
+    if args.daemon:
+        run_daemon(args.concurrency, args.poll_interval, args.metrics_port)
+    else:
+        main()
@@ -1,34 +1,96 @@
+// Files are uploaded straight to storage through presigned URLs, so the web
+// server never receives the dataset bytes. The bucket's CORS configuration must
+// allow PUT from this site and expose the ETag header.
+var FILE_FIELDS = ['model', 'train_set', 'test_set'];
+var PARALLEL_PARTS = 4;
+
+function postJson(url, body) {
+    return fetch(url, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify(body)
+    }).then(response => response.json().then(data => {
+        if (!response.ok) {
+            throw new Error(data.error || response.statusText);
+        }
+        return data;
+    }));
+}
+
+function uploadParts(file, upload) {
+    var parts = [];
+    var nextPart = 0;
+
+    // Each worker uploads one part at a time until every part has been sent
+    function uploadNext() {
+        if (nextPart >= upload.part_urls.length) {
+            return Promise.resolve();
+        }
+        var index = nextPart++;
+        var start = index * upload.part_size;
+        return fetch(upload.part_urls[index], {
+            method: 'PUT',
+            body: file.slice(start, start + upload.part_size)
+        }).then(response => {
+            if (!response.ok) {
+                throw new Error('Upload of ' + file.name + ' failed: ' + response.statusText);
+            }
+            parts.push({PartNumber: index + 1, ETag: response.headers.get('ETag')});
+            return uploadNext();
+        });
+    }
+
+    var workers = [];
+    for (var i = 0; i < Math.min(PARALLEL_PARTS, upload.part_urls.length); i++) {
+        workers.push(uploadNext());
+    }
+    return Promise.all(workers).then(() => ({upload_id: upload.upload_id, parts: parts}));
+}
+
 document.getElementById('uploadForm').addEventListener('submit', function(e) {
     e.preventDefault();
 
-    var formData = new FormData(this);
+    var form = this;
     var messageElement = document.getElementById('message');
-    var submitButton = this.querySelector('[type="submit"]');
-    
+    var submitButton = form.querySelector('[type="submit"]');
+    var email = form.elements['email'].value;
+    var taskType = form.elements['task_type'].value;
+    var files = {};
+    FILE_FIELDS.forEach(field => {
+        files[field] = form.elements[field].files[0];
+    });
+
     // Disable the submit button to prevent multiple submissions and display a loading message
     submitButton.disabled = true;
     messageElement.innerHTML = 'Uploading and processing...';
 
-    fetch('/upload', {
-        method: 'POST',
-        body: formData
-    })
-    .then(response => {
-        if (!response.ok) {
-            // If the server response is not ok, throw an error
-            throw new Error('Network response was not ok: ' + response.statusText);
-        }
-        return response.text();
-    })
+    var fileInfo = {};
+    FILE_FIELDS.forEach(field => {
+        fileInfo[field] = {filename: files[field].name, size: files[field].size};
+    });
+
+    postJson('/uploads/initiate', {email: email, task_type: taskType, files: fileInfo})
+    .then(submission => Promise.all(
+        FILE_FIELDS.map(field => uploadParts(files[field], submission.uploads[field]))
+    ).then(completedUploads => {
+        var uploads = {};
+        FILE_FIELDS.forEach((field, index) => {
+            uploads[field] = completedUploads[index];
+        });
+        return postJson('/uploads/complete', {
+            upload_token: submission.upload_token,
+            uploads: uploads
+        });
+    }))
     .then(data => {
-        messageElement.innerHTML = data;
+        messageElement.innerHTML = data.message;
     })
     .catch(error => {
         console.error('Error:', error);
         messageElement.innerHTML = 'An error occurred while submitting the model.';
     })
     .finally(() => {
-        // Re-enable the submit button after the fetch is complete
+        // Re-enable the submit button after the upload is complete
         submitButton.disabled = false;
     });
 });
@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import joblib
+import numpy as np
+
+from app.model_evaluation.baseline_cache import BaselineCache
+
+
+class TestBaselineCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = BaselineCache(self.cache_dir)
+        self.dataset_hashes = {'train': 'train-hash', 'test': 'test-hash'}
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_key_depends_on_datasets_and_params(self):
+        key = self.cache.make_key(self.dataset_hashes, 'classification', 'AdaBoost', {})
+
+        self.assertEqual(key, self.cache.make_key(dict(self.dataset_hashes), 'classification', 'AdaBoost', {}))
+        self.assertNotEqual(key, self.cache.make_key({'train': 'other', 'test': 'test-hash'},
+                                                     'classification', 'AdaBoost', {}))
+        self.assertNotEqual(key, self.cache.make_key(self.dataset_hashes, 'classification', 'AdaBoost',
+                                                     {'n_estimators': 10}))
+        # Lean loading and sparse features change what the model is fitted on
+        self.assertNotEqual(key, self.cache.make_key(self.dataset_hashes, 'classification', 'AdaBoost', {},
+                                                     loading_mode='lean'))
+        self.assertNotEqual(key, self.cache.make_key(self.dataset_hashes, 'classification', 'AdaBoost', {},
+                                                     sparse_features=True))
+
+    def test_round_trip_drops_request_specific_entries(self):
+        model_path = os.path.join(self.cache_dir, 'model.joblib')
+        joblib.dump({'fitted': True}, model_path)
+        evaluation = {'y_test': np.arange(3), 'predictions': np.array([0, 1, 1]),
+                      'y_scores': None, 'task_type': 'classification', 'accuracy': 0.5}
+        key = self.cache.make_key(self.dataset_hashes, 'classification', 'AdaBoost', {})
+
+        self.assertIsNone(self.cache.load(key))
+        self.cache.store(key, model_path, evaluation)
+        cached_model_path, cached_evaluation = self.cache.load(key)
+
+        self.assertEqual(joblib.load(cached_model_path), {'fitted': True})
+        self.assertNotIn('y_test', cached_evaluation)
+        self.assertEqual(cached_evaluation['accuracy'], 0.5)
+        np.testing.assert_array_equal(cached_evaluation['predictions'], evaluation['predictions'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,15 @@
+import os
+import shutil
+import tempfile
+import time
 import unittest
 from unittest import mock
 from unittest.mock import MagicMock, patch
+import numpy as np
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
 import app.data_management.database as database
+from app.model_evaluation.results import EvaluationResults
 
 # Configure a mock for the engine and session
 mock_engine = MagicMock()
@@ -10,9 +18,11 @@ mock_session = MagicMock()
 
 class TestDatabase(unittest.TestCase):
     def setUp(self):
-        # Patch 'create_engine' and 'sessionmakeer' to return the mock engine and session
-        self.engine_patch = patch('database.create_engine', return_value=mock_engine)
-        self.session_patch = patch('database.sessionmaker', return_value=mock_session)
+        # Patch 'create_engine' and 'sessionmakeer' to return the mock engine and session.
+        # Targets use the full module path: the module lives in app.data_management, so
+        # a bare 'database' target fails with ModuleNotFoundError.
+        self.engine_patch = patch('app.data_management.database.create_engine', return_value=mock_engine)
+        self.session_patch = patch('app.data_management.database.sessionmaker', return_value=mock_session)
         
         self.engine_patch.start()
         self.session_patch.start()
@@ -22,7 +32,7 @@ class TestDatabase(unittest.TestCase):
         self.session_patch.stop()
         mock_session.reset_mock()
 
-    @patch('database.SessionRequests')
+    @patch('app.data_management.database.SessionRequests')
     def test_add_request(self, mock_session_class):
         mock_session = mock_session_class.return_value
         
@@ -31,7 +41,7 @@ class TestDatabase(unittest.TestCase):
         mock_session.add.assert_called_once()
         mock_session.commit.assert_called_once()
     
-    @patch('database.SessionRequests')
+    @patch('app.data_management.database.SessionRequests')
     def test_update_request_status(self, mock_session_class):
         mock_session = mock_session_class.return_value
         
@@ -44,7 +54,7 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(mock_request.status, 'COMPLETED')
         mock_session.commit.assert_called_once()
     
-    @patch('database.SessionRequests')
+    @patch('app.data_management.database.SessionRequests')
     def test_get_pending_requests(self, mock_session_class):
         # Create a mock session instance
         mock_session = mock_session_class.return_value
@@ -66,7 +76,7 @@ class TestDatabase(unittest.TestCase):
 
         self.assertIn(mock_request, pending_requests)
     
-    @patch('database.SessionResults')
+    @patch('app.data_management.database.SessionResults')
     def test_add_result(self, mock_session_class):
         mock_session = mock_session_class.return_value
         
@@ -75,7 +85,7 @@ class TestDatabase(unittest.TestCase):
         mock_session.add.assert_called_once()
         mock_session.commit.assert_called_once()
     
-    @patch('database.SessionResults')
+    @patch('app.data_management.database.SessionResults')
     def test_get_result_by_id(self, mock_session_class):
         mock_session = mock_session_class.return_value
         
@@ -87,5 +97,181 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(result, mock_result)
 
 
+class TestRequestClaims(unittest.TestCase):
+    def setUp(self):
+        # Claims rely on real conditional updates, so use a temporary SQLite database
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.temp_dir, 'requests.db')}")
+        database.BaseRequests.metadata.create_all(self.engine)
+        self.session_patch = patch.object(database, 'SessionRequests', sessionmaker(bind=self.engine))
+        self.session_patch.start()
+
+        database.add_request('older', 'a@example.com', '20240101000000', 'classification')
+        database.add_request('newer', 'b@example.com', '20240102000000', 'regression')
+
+    def tearDown(self):
+        self.session_patch.stop()
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir)
+
+    def test_claims_oldest_pending_request(self):
+        request = database.claim_request('worker-1')
+
+        self.assertEqual(request.user_id, 'older')
+        self.assertEqual(request.status, 'RUNNING')
+        self.assertEqual(request.worker_id, 'worker-1')
+        self.assertGreater(request.lease_expires_at, time.time())
+
+    def test_request_is_claimed_once(self):
+        first = database.claim_request('worker-1')
+        second = database.claim_request('worker-2')
+
+        self.assertNotEqual(first.user_id, second.user_id)
+        self.assertIsNone(database.claim_request('worker-3'))
+
+    def test_expired_lease_is_reclaimed(self):
+        database.claim_request('worker-1', lease_duration=-1)
+
+        request = database.claim_request('worker-2')
+        self.assertEqual(request.user_id, 'older')
+        self.assertEqual(request.worker_id, 'worker-2')
+
+    def test_renew_lease_requires_ownership(self):
+        request = database.claim_request('worker-1', lease_duration=-1)
+        database.claim_request('worker-2')
+
+        self.assertFalse(database.renew_lease(request.user_id, 'worker-1'))
+        self.assertTrue(database.renew_lease(request.user_id, 'worker-2'))
+
+    def test_status_update_requires_ownership(self):
+        request = database.claim_request('worker-1', lease_duration=-1)
+        database.claim_request('worker-2')
+
+        self.assertFalse(database.update_claimed_request_status(request.user_id, 'worker-1', 'FAILED'))
+        self.assertTrue(database.update_claimed_request_status(request.user_id, 'worker-2', 'COMPLETED'))
+        session = database.SessionRequests()
+        self.assertEqual(session.query(database.Request).get(request.user_id).status, 'COMPLETED')
+        session.close()
+
+    def test_missing_columns_are_added(self):
+        engine = create_engine(f"sqlite:///{os.path.join(self.temp_dir, 'old.db')}")
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE requests (user_id VARCHAR PRIMARY KEY, email VARCHAR, "
+                                    "submission_time VARCHAR, status VARCHAR, task_type VARCHAR)"))
+
+        database._add_missing_columns(engine, database.Request.__table__)
+        database._add_missing_indexes(engine, database.Request.__table__)
+
+        columns = {column['name'] for column in inspect(engine).get_columns('requests')}
+        self.assertIn('worker_id', columns)
+        self.assertIn('lease_expires_at', columns)
+        indexes = {index['name'] for index in inspect(engine).get_indexes('requests')}
+        self.assertIn('ix_requests_status_submission_time', indexes)
+        engine.dispose()
+
+    def test_update_request_statuses(self):
+        database.add_request('third', 'c@example.com', '20240103000000', 'regression')
+
+        updated = database.update_request_statuses(['older', 'third', 'missing'], 'FAILED')
+
+        self.assertEqual(updated, 2)
+        self.assertEqual([request.user_id for request in database.get_pending_requests()], ['newer'])
+        self.assertEqual(database.update_request_statuses([], 'FAILED'), 0)
+
+    def test_engine_uses_wal_and_busy_timeout(self):
+        engine = database.create_sqlite_engine(os.path.join(self.temp_dir, 'tuned.db'))
+        with engine.connect() as connection:
+            self.assertEqual(connection.execute(text("PRAGMA journal_mode")).scalar(), 'wal')
+            self.assertEqual(connection.execute(text("PRAGMA busy_timeout")).scalar(),
+                             database.SQLITE_BUSY_TIMEOUT_SECONDS * 1000)
+        engine.dispose()
+
+
+def make_evaluation(task_type, y_test, **metrics):
+    return dict({'y_test': y_test, 'predictions': y_test[::-1].copy(), 'y_scores': None,
+                 'task_type': task_type}, **metrics)
+
+
+class TestResultsStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.temp_dir, 'results.db')}")
+        database.BaseResults.metadata.create_all(self.engine)
+        self.patches = [patch.object(database, 'SessionResults', sessionmaker(bind=self.engine)),
+                        patch.object(database, 'RESULT_ARRAYS_DIR', os.path.join(self.temp_dir, 'arrays'))]
+        for started_patch in self.patches:
+            started_patch.start()
+
+    def tearDown(self):
+        for started_patch in self.patches:
+            started_patch.stop()
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir)
+
+    def add_regression_result(self, user_id, email, user_mse, dataset_key='dataset'):
+        y_test = np.arange(5, dtype=float)
+        results = {'user_model': make_evaluation('regression', y_test, mae=0.1, mse=user_mse, r2_score=0.9),
+                   'LinearRegression': make_evaluation('regression', y_test, mae=0.2, mse=0.5, r2_score=0.8)}
+        database.add_result(user_id, 'regression', results, email=email, dataset_key=dataset_key)
+
+    def test_arrays_are_stored_in_sidecar(self):
+        self.add_regression_result('request', 'a@example.com', 0.3)
+
+        result = database.get_result_by_id('request')
+        self.assertEqual(result.performance_metrics['user_model'], {'mae': 0.1, 'mse': 0.3, 'r2_score': 0.9})
+        arrays = database.load_result_arrays('request')
+        np.testing.assert_array_equal(arrays['y_test'], np.arange(5))
+        np.testing.assert_array_equal(arrays['predictions']['LinearRegression'], np.arange(5)[::-1])
+        self.assertEqual(arrays['y_scores'], {})
+
+    def test_evaluation_results_are_stored_like_dicts(self):
+        y_test = np.arange(5, dtype=float)
+        results = EvaluationResults.from_dict({
+            'user_model': make_evaluation('regression', y_test, mae=0.1, mse=0.3, r2_score=0.9),
+            'LinearRegression': make_evaluation('regression', y_test, mae=0.2, mse=0.5, r2_score=0.8)})
+
+        database.add_result('request', 'regression', results, email='a@example.com', dataset_key='dataset')
+
+        result = database.get_result_by_id('request')
+        self.assertEqual(result.performance_metrics['LinearRegression'], {'mae': 0.2, 'mse': 0.5, 'r2_score': 0.8})
+        arrays = database.load_result_arrays('request')
+        np.testing.assert_array_equal(arrays['predictions']['LinearRegression'], np.arange(5)[::-1])
+
+    def test_leaderboard_ranks_by_metric_direction(self):
+        self.add_regression_result('first', 'a@example.com', 0.3)
+        self.add_regression_result('second', 'b@example.com', 0.1)
+        self.add_regression_result('other', 'c@example.com', 0.01, dataset_key='other-dataset')
+
+        leaderboard = database.get_leaderboard('dataset', 'regression', 'mse')
+
+        self.assertEqual([entry['user_id'] for entry in leaderboard], ['second', 'first'])
+        self.assertEqual(leaderboard[0]['mse'], 0.1)
+        self.assertEqual(len(database.get_leaderboard('dataset', 'regression', 'r2_score',
+                                                      include_baselines=True)), 4)
+        with self.assertRaises(ValueError):
+            database.get_leaderboard('dataset', 'regression', 'y_test')
+
+    def test_submitted_model_leaderboard_is_served_by_an_index(self):
+        with self.engine.connect() as connection:
+            plan = ' '.join(str(row) for row in connection.execute(text(
+                "EXPLAIN QUERY PLAN SELECT user_id, mse FROM model_results WHERE dataset_key = 'dataset' "
+                "AND task_type = 'regression' AND model_name = 'user_model' AND mse IS NOT NULL "
+                "ORDER BY mse LIMIT 10")))
+
+        self.assertIn('ix_model_results_model_mse', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_user_history(self):
+        self.add_regression_result('first', 'a@example.com', 0.3)
+        self.add_regression_result('second', 'a@example.com', 0.1)
+        self.add_regression_result('other', 'b@example.com', 0.2)
+
+        history = database.get_user_history('a@example.com')
+
+        self.assertEqual([entry['user_id'] for entry in history], ['second', 'first'])
+        self.assertEqual(history[0]['models']['user_model'], {'mae': 0.1, 'mse': 0.1, 'r2_score': 0.9})
+        self.assertEqual(set(history[0]['models']), {'user_model', 'LinearRegression'})
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,90 @@
+import mmap
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from app.data_management.dataset_cache import DatasetCache
+
+
+def is_memory_mapped(values):
+    base = values
+    while base is not None and not isinstance(base, mmap.mmap):
+        base = getattr(base, 'base', None)
+    return base is not None
+
+
+class TestDatasetCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = DatasetCache(self.cache_dir)
+        self.X = pd.DataFrame({
+            'a': [1.5, 2.5, 3.5],
+            'b': [0.1, 0.2, 0.3],
+            'c': [1, 2, 3],
+            'd': ['x', 'y', 'z'],
+            'e': [4.0, 5.0, 6.0],
+        })
+        self.y = pd.Series([0, 1, 0], name='label')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_load_missing_entry(self):
+        self.assertIsNone(self.cache.load('missing'))
+
+    def test_round_trip_preserves_columns_and_dtypes(self):
+        self.cache.store('hash', self.X, self.y)
+        X, y = self.cache.load('hash')
+
+        pd.testing.assert_frame_equal(X, self.X)
+        pd.testing.assert_series_equal(y, self.y)
+
+    def test_numeric_columns_are_memory_mapped(self):
+        X = pd.DataFrame(np.random.rand(10, 4), columns=list('abcd'))
+        self.cache.store('hash', X, self.y.reindex(range(10), fill_value=0))
+        cached_X, cached_y = self.cache.load('hash')
+
+        self.assertTrue(is_memory_mapped(cached_X.values))
+        self.assertTrue(is_memory_mapped(cached_y.values))
+        np.testing.assert_array_equal(cached_X.values, X.values)
+
+    def test_round_trip_preserves_sparse_matrices(self):
+        X = sparse.random(10, 50, density=0.1, format='csr', random_state=0)
+        y = self.y.reindex(range(10), fill_value=0)
+        feature_names = [f'token{index}' for index in range(50)]
+        self.cache.store('hash', X, y, feature_names=feature_names)
+        cached_X, cached_y = self.cache.load('hash')
+
+        self.assertTrue(sparse.isspmatrix_csr(cached_X))
+        self.assertTrue(is_memory_mapped(cached_X.data))
+        np.testing.assert_array_equal(cached_X.toarray(), X.toarray())
+        pd.testing.assert_series_equal(cached_y, y)
+        self.assertEqual(self.cache.feature_names('hash'), feature_names)
+
+    def test_round_trip_preserves_categoricals(self):
+        X = self.X.assign(d=pd.Categorical(['x', 'y', 'x']), f=pd.Categorical(['x', 'x', 'y']))
+        y = pd.Series(pd.Categorical(['no', 'yes', 'no']), name='label')
+        self.cache.store('hash', X, y)
+        cached_X, cached_y = self.cache.load('hash')
+
+        pd.testing.assert_frame_equal(cached_X, X)
+        pd.testing.assert_series_equal(cached_y, y)
+
+    def test_loading_modes_are_cached_separately(self):
+        memory = {'default_bytes': 200, 'lean_bytes': 50}
+        self.cache.store('hash', self.X, self.y)
+        self.cache.store('hash', self.X.astype({'c': 'int8'}), self.y, loading_mode='lean', memory=memory)
+
+        self.assertEqual(self.cache.load('hash')[0]['c'].dtype, np.int64)
+        self.assertEqual(self.cache.load('hash', 'lean')[0]['c'].dtype, np.int8)
+        self.assertIsNone(self.cache.memory_usage('hash'))
+        self.assertEqual(self.cache.memory_usage('hash', 'lean'), memory)
+        self.assertFalse(self.cache.contains('other', 'lean'))
+
+
+if __name__ == '__main__':
+    unittest.main()
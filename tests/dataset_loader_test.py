@@ -0,0 +1,138 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from app.data_management.dataset_loader import is_sparse_csv, load_lean_csv, load_sparse_csv
+
+
+class TestLoadLeanCsv(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'dataset.csv')
+        num_rows = 1000
+        rng = np.random.default_rng(0)
+        halves = rng.integers(0, 5, num_rows) / 2
+        halves[7] = np.nan
+        self.dataset = pd.DataFrame({
+            'small_int': rng.integers(-100, 100, num_rows),
+            'large_int': rng.integers(0, 10 ** 6, num_rows),
+            'real': rng.normal(size=num_rows),
+            'half': halves,
+            'color': rng.choice(['red', 'green', 'blue'], num_rows),
+            'identifier': [f'row{index}' for index in range(num_rows)],
+            'flag': rng.integers(0, 2, num_rows).astype(bool),
+            'label': rng.integers(0, 2, num_rows),
+        })
+        self.dataset.to_csv(self.path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def load(self, **kwargs):
+        # Small chunks so values span several chunks of both passes
+        return load_lean_csv(self.path, chunk_size=128, **kwargs)
+
+    def test_downcasts_losslessly(self):
+        X, y, _ = self.load(max_categories=10)
+
+        self.assertEqual(X['small_int'].dtype, np.int8)
+        self.assertEqual(X['large_int'].dtype, np.int32)
+        self.assertEqual(X['real'].dtype, np.float64)
+        self.assertEqual(X['half'].dtype, np.float32)
+        self.assertIsInstance(X['color'].dtype, pd.CategoricalDtype)
+        self.assertNotIsInstance(X['identifier'].dtype, pd.CategoricalDtype)
+        self.assertEqual(X['flag'].dtype, bool)
+        self.assertEqual(y.dtype, np.int8)
+
+        expected = pd.read_csv(self.path)
+        for column in ['small_int', 'large_int', 'real', 'half']:
+            np.testing.assert_array_equal(X[column].to_numpy(np.float64), expected[column].to_numpy(np.float64))
+        np.testing.assert_array_equal(X['color'].astype(str), expected['color'].astype(str))
+        np.testing.assert_array_equal(X['identifier'].astype(str), expected['identifier'].astype(str))
+        np.testing.assert_array_equal(X['flag'], expected['flag'])
+        np.testing.assert_array_equal(y, expected['label'])
+        self.assertEqual(list(X.columns), list(expected.columns[:-1]))
+
+    def test_numeric_columns_share_one_buffer(self):
+        X, y, _ = self.load()
+
+        buffer = X['small_int'].to_numpy().base
+        while getattr(buffer, 'base', None) is not None:
+            buffer = buffer.base
+        for values in [X['large_int'], X['real'], X['half'], y]:
+            self.assertTrue(np.shares_memory(values.to_numpy(), buffer))
+
+    def test_reports_memory_savings(self):
+        _, _, memory = self.load()
+
+        self.assertLess(memory['lean_bytes'], memory['default_bytes'])
+
+    def test_integers_beyond_int64_stay_exact(self):
+        values = [2 ** 63 + 5, 3, 2 ** 64 - 1] * 50
+        pd.DataFrame({'big': values, 'label': np.arange(150) % 2}).to_csv(self.path, index=False)
+
+        X, _, _ = self.load()
+
+        self.assertEqual(X['big'].dtype, np.uint64)
+        self.assertEqual(X['big'].tolist(), values)
+
+        # Negative values in one chunk and uint64-only values in another
+        pd.DataFrame({'big': [-1] * 128 + [2 ** 64 - 1] * 22, 'label': np.arange(150) % 2}) \
+            .to_csv(self.path, index=False)
+        X, _, _ = self.load()
+        self.assertEqual(X['big'].iloc[-1], str(2 ** 64 - 1))
+
+    def test_mixed_chunks_fall_back_to_strings(self):
+        mixed = pd.DataFrame({'value': [str(index) for index in range(200)] + ['unknown'] * 56,
+                              'label': np.arange(256) % 2})
+        mixed.to_csv(self.path, index=False)
+
+        X, _, _ = self.load()
+
+        self.assertEqual(X['value'].tolist()[:2], ['0', '1'])
+        self.assertEqual(X['value'].iloc[-1], 'unknown')
+
+
+class TestLoadSparseCsv(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'dataset.csv')
+        rng = np.random.default_rng(0)
+        self.features = sparse.random(300, 150, density=0.02, format='csr', random_state=0,
+                                      data_rvs=lambda size: rng.integers(1, 10, size))
+        dataset = pd.DataFrame(self.features.toarray(), columns=[f'token{index}' for index in range(150)])
+        dataset['label'] = rng.integers(0, 2, 300)
+        dataset.to_csv(self.path, index=False)
+        self.labels = dataset['label']
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_detects_sparse_features(self):
+        self.assertTrue(is_sparse_csv(self.path))
+        self.assertFalse(is_sparse_csv(self.path, density_threshold=0.01))
+        self.assertFalse(is_sparse_csv(self.path, min_features=200))
+
+    def test_dense_or_string_features_are_not_sparse(self):
+        pd.DataFrame({'color': ['red'] * 10, 'label': [0] * 10}).to_csv(self.path, index=False)
+        self.assertFalse(is_sparse_csv(self.path, min_features=1))
+
+    def test_builds_csr_matrix_chunk_by_chunk(self):
+        # Chunks of a few rows, so the matrix is stacked from many blocks
+        X, y, feature_names = load_sparse_csv(self.path, chunk_cells=1000)
+
+        self.assertTrue(sparse.isspmatrix_csr(X))
+        self.assertEqual(X.nnz, self.features.nnz)
+        np.testing.assert_array_equal(X.toarray(), self.features.toarray())
+        pd.testing.assert_series_equal(y, self.labels)
+        self.assertEqual(feature_names[:2], ['token0', 'token1'])
+        self.assertEqual(len(feature_names), 150)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import unittest
+
+import numpy as np
+from sklearn.metrics import average_precision_score, precision_recall_curve, roc_auc_score, roc_curve
+
+from app.model_evaluation.evaluation_metrics import MetricsAccumulator, MetricsEvaluator, binary_curves
+
+
+class TestFusedMetrics(unittest.TestCase):
+    def setUp(self):
+        self.fused = MetricsEvaluator()
+        self.reference = MetricsEvaluator(fused=False)
+        self.rng = np.random.default_rng(0)
+
+    def assert_matches_sklearn(self, task_type, y_true, y_pred):
+        fused_scores = self.fused.calculate_metrics(task_type, y_true, y_pred)
+        reference_scores = self.reference.calculate_metrics(task_type, y_true, y_pred)
+        self.assertEqual(fused_scores.keys(), reference_scores.keys())
+        for metric_name, score in reference_scores.items():
+            self.assertAlmostEqual(fused_scores[metric_name], score, places=10, msg=metric_name)
+
+    def test_binary_classification(self):
+        y_true = self.rng.integers(0, 2, 1000)
+        y_pred = self.rng.integers(0, 2, 1000)
+        self.assert_matches_sklearn('classification', y_true, y_pred)
+
+    def test_multiclass_with_unpredicted_and_unseen_labels(self):
+        y_true = self.rng.choice([-3, 0, 7, 9], 1000)
+        y_pred = self.rng.choice([-3, 0, 7, 12], 1000)
+        self.assert_matches_sklearn('classification', y_true, y_pred)
+
+    def test_string_labels(self):
+        y_true = self.rng.choice(['cat', 'dog', 'fish'], 500)
+        y_pred = self.rng.choice(['cat', 'dog'], 500)
+        self.assert_matches_sklearn('classification', y_true, y_pred)
+
+    def test_mixed_string_and_numeric_labels(self):
+        with self.assertRaises(ValueError):
+            self.reference.calculate_metrics('classification', np.array([0, 1, 1]), np.array(['0', '1', '1']))
+        with self.assertRaises(ValueError):
+            self.fused.calculate_metrics('classification', np.array([0, 1, 1]), np.array(['0', '1', '1']))
+        with self.assertRaises(ValueError):
+            self.fused.calculate_metrics('classification', np.array([0, 'a'], dtype=object), np.array([0, 0]))
+
+    def test_regression(self):
+        y_true = self.rng.normal(size=1000)
+        y_pred = y_true + self.rng.normal(scale=0.5, size=1000)
+        self.assert_matches_sklearn('regression', y_true, y_pred)
+
+    def test_regression_with_constant_target(self):
+        y_true = np.ones(10)
+        self.assert_matches_sklearn('regression', y_true, np.ones(10))
+        self.assert_matches_sklearn('regression', y_true, np.zeros(10))
+
+    def test_invalid_task_type(self):
+        with self.assertRaises(ValueError):
+            self.fused.calculate_metrics('clustering', [0], [0])
+
+
+class TestMetricsAccumulators(unittest.TestCase):
+    def setUp(self):
+        self.evaluator = MetricsEvaluator()
+        self.rng = np.random.default_rng(0)
+
+    def assert_scores_equal(self, scores, expected):
+        self.assertEqual(scores.keys(), expected.keys())
+        for metric_name, score in expected.items():
+            self.assertAlmostEqual(scores[metric_name], score, places=10, msg=metric_name)
+
+    def test_classification_batches(self):
+        y_true = self.rng.choice([1, 2, 3], 1000)
+        y_pred = self.rng.choice([1, 2, 4], 1000)
+        accumulator = self.evaluator.create_accumulator('classification')
+        for start in range(0, 1000, 128):
+            accumulator.update(y_true[start:start + 128], y_pred[start:start + 128])
+
+        expected = self.evaluator.calculate_metrics('classification', y_true, y_pred)
+        self.assert_scores_equal(accumulator.result(), expected)
+
+    def test_regression_batches(self):
+        y_true = self.rng.normal(loc=5, size=1000)
+        y_pred = y_true + self.rng.normal(size=1000)
+        accumulator = self.evaluator.create_accumulator('regression')
+        for start in range(0, 1000, 100):
+            accumulator.update(y_true[start:start + 100], y_pred[start:start + 100])
+
+        expected = self.evaluator.calculate_metrics('regression', y_true, y_pred)
+        self.assert_scores_equal(accumulator.result(), expected)
+
+    def test_merge_shards(self):
+        for task_type, y_true, y_pred in [
+            ('classification', self.rng.choice(['a', 'b'], 600), self.rng.choice(['a', 'c'], 600)),
+            ('regression', self.rng.normal(size=600), self.rng.normal(size=600)),
+        ]:
+            shards = []
+            for start in range(0, 600, 200):
+                shard = self.evaluator.create_accumulator(task_type)
+                shards.append(shard.update(y_true[start:start + 200], y_pred[start:start + 200]))
+            merged = self.evaluator.create_accumulator(task_type)
+            for shard in shards:
+                merged.merge(shard)
+
+            expected = self.evaluator.calculate_metrics(task_type, y_true, y_pred)
+            self.assert_scores_equal(merged.result(), expected)
+
+    def test_incomplete_accumulator_cannot_be_created(self):
+        class CountingAccumulator(MetricsAccumulator):
+            def _compute_statistics(self, y_true, y_pred):
+                return len(y_true)
+
+        with self.assertRaises(TypeError):
+            CountingAccumulator({})
+
+    def test_merge_different_task_types(self):
+        with self.assertRaises(ValueError):
+            self.evaluator.create_accumulator('classification').merge(
+                self.evaluator.create_accumulator('regression'))
+
+
+class TestBinaryCurves(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+        self.y_true = self.rng.integers(0, 2, 5000)
+        # Rounded scores produce ties, which must collapse into one threshold
+        self.y_scores = np.round(self.rng.random(5000) + 0.3 * self.y_true, 2)
+
+    def test_matches_sklearn(self):
+        curves = binary_curves(self.y_true, self.y_scores, max_points=10_000)
+        fpr, tpr, _ = roc_curve(self.y_true, self.y_scores, drop_intermediate=False)
+        precision, recall, _ = precision_recall_curve(self.y_true, self.y_scores)
+
+        self.assertAlmostEqual(curves['roc_auc'], roc_auc_score(self.y_true, self.y_scores), places=10)
+        self.assertAlmostEqual(curves['average_precision'],
+                               average_precision_score(self.y_true, self.y_scores), places=10)
+        np.testing.assert_allclose(curves['fpr'], fpr)
+        np.testing.assert_allclose(curves['tpr'], tpr)
+        np.testing.assert_allclose(curves['precision'], precision)
+        np.testing.assert_allclose(curves['recall'], recall)
+
+    def test_thins_curves_but_keeps_endpoints(self):
+        y_scores = self.rng.random(5000) + 0.3 * self.y_true
+        curves = binary_curves(self.y_true, y_scores, max_points=100)
+
+        self.assertAlmostEqual(curves['roc_auc'], roc_auc_score(self.y_true, y_scores), places=10)
+        for name in ['fpr', 'tpr', 'precision', 'recall']:
+            self.assertLessEqual(len(curves[name]), 100)
+        self.assertEqual((curves['fpr'][0], curves['tpr'][0]), (0.0, 0.0))
+        self.assertEqual((curves['fpr'][-1], curves['tpr'][-1]), (1.0, 1.0))
+        self.assertEqual((curves['recall'][-1], curves['precision'][-1]), (0.0, 1.0))
+
+    def test_string_labels_use_larger_label_as_positive(self):
+        labels = np.where(self.y_true == 1, 'yes', 'no')
+        curves = binary_curves(labels, self.y_scores)
+        self.assertAlmostEqual(curves['roc_auc'], roc_auc_score(self.y_true, self.y_scores), places=10)
+
+    def test_calculate_curves_skips_non_binary_tasks(self):
+        evaluator = MetricsEvaluator()
+        self.assertEqual(evaluator.calculate_curves('classification', [0, 1, 2], [0.1, 0.5, 0.9]), ({}, {}))
+        self.assertEqual(evaluator.calculate_curves('classification', [0, 1], None), ({}, {}))
+        self.assertEqual(evaluator.calculate_curves('regression', [0.5, 1.5], [0.1, 0.5]), ({}, {}))
+
+        metrics, curves = evaluator.calculate_curves('classification', self.y_true, self.y_scores)
+        self.assertEqual(set(metrics), {'roc_auc', 'average_precision'})
+        self.assertEqual(set(curves), {'fpr', 'tpr', 'precision', 'recall'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,24 @@
+import sys
+import subprocess
+import unittest
+
+CHECK_IMPORTS = """
+import sys
+import app
+import config
+import app.model_evaluation.process_request
+import app.model_evaluation.model_registry
+print(','.join(name for name in ['keras', 'tensorflow', 'boto3'] if name in sys.modules))
+"""
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_heavy_modules_are_not_imported_at_startup(self):
+        # A fresh interpreter, since other tests may already have imported them
+        output = subprocess.run([sys.executable, '-c', CHECK_IMPORTS],
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+
+from app import instrumentation
+
+
+def _allocate_and_record(size_mb):
+    with instrumentation.stage('allocate', size=size_mb):
+        block = bytearray(size_mb * 1024 * 1024)
+        block[::4096] = b'x' * len(block[::4096])
+    return len(block)
+
+
+class TestStages(unittest.TestCase):
+    def setUp(self):
+        self.registry_patch = patch.object(instrumentation, 'REGISTRY', instrumentation.MetricsRegistry())
+        self.registry_patch.start()
+
+    def tearDown(self):
+        self.registry_patch.stop()
+
+    def test_request_collects_nested_stages(self):
+        with instrumentation.record_request('request-1', task_type='regression') as request_record:
+            with instrumentation.stage('train', model='LinearRegression'):
+                with instrumentation.stage('metrics'):
+                    pass
+
+        self.assertEqual(request_record['request_id'], 'request-1')
+        self.assertEqual(request_record['task_type'], 'regression')
+        stages = [(record['stage'], record['labels']) for record in request_record['stages']]
+        self.assertEqual(stages, [('metrics', {}), ('train', {'model': 'LinearRegression'}), ('request', {})])
+        for record in request_record['stages']:
+            self.assertGreaterEqual(record['wall_seconds'], 0)
+            self.assertGreaterEqual(record['cpu_seconds'], 0)
+            self.assertGreater(record['peak_rss_mb'], 0)
+        # Nothing is aggregated until the record is exported
+        self.assertNotIn('stage="train"', instrumentation.REGISTRY.render())
+
+    def test_peak_rss_propagates_to_enclosing_stage(self):
+        with instrumentation.record_request('request-1') as request_record:
+            _allocate_and_record(64)
+            with instrumentation.stage('small'):
+                pass
+
+        records = {record['stage']: record for record in request_record['stages']}
+        self.assertGreaterEqual(records['request']['peak_rss_mb'], records['allocate']['peak_rss_mb'])
+        self.assertGreaterEqual(records['allocate']['peak_rss_mb'], 64)
+
+    def test_failed_stage_is_recorded_as_error(self):
+        with self.assertRaises(ValueError):
+            with instrumentation.stage('load_dataset', file_type='train'):
+                raise ValueError('bad csv')
+
+        rendered = instrumentation.REGISTRY.render()
+        self.assertIn('metrica_stage_wall_seconds_count{file_type="train",stage="load_dataset",status="error"} 1',
+                      rendered)
+
+    def test_records_from_worker_processes_join_the_request(self):
+        with instrumentation.record_request('request-1') as request_record:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result, records = executor.submit(instrumentation.run_recorded, _allocate_and_record, 1).result()
+            instrumentation.add_records(records)
+
+        self.assertEqual(result, 1024 * 1024)
+        self.assertIn('allocate', [record['stage'] for record in request_record['stages']])
+
+    def test_stages_on_other_threads(self):
+        with instrumentation.record_request('request-1') as request_record:
+            thread = threading.Thread(target=_allocate_and_record, args=(1,))
+            thread.start()
+            thread.join()
+
+        self.assertEqual([record['stage'] for record in request_record['stages']], ['allocate', 'request'])
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.records_path = os.path.join(self.temp_dir, 'records.jsonl')
+        self.registry = instrumentation.MetricsRegistry()
+        self.registry_patch = patch.object(instrumentation, 'REGISTRY', self.registry)
+        self.registry_patch.start()
+        self.path_patch = patch.object(instrumentation, 'RECORDS_PATH', self.records_path)
+        self.path_patch.start()
+
+    def tearDown(self):
+        self.path_patch.stop()
+        self.registry_patch.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_export_writes_record_and_aggregates_histograms(self):
+        for request_id in ['request-1', 'request-2']:
+            with instrumentation.record_request(request_id) as request_record:
+                with instrumentation.stage('report', backend='fpdf'):
+                    pass
+            instrumentation.export_request(request_record)
+
+        with open(self.records_path) as file:
+            lines = [json.loads(line) for line in file]
+        self.assertEqual([line['request_id'] for line in lines], ['request-1', 'request-2'])
+
+        rendered = self.registry.render()
+        self.assertIn('# TYPE metrica_stage_cpu_seconds histogram', rendered)
+        self.assertIn('metrica_stage_wall_seconds_bucket{backend="fpdf",stage="report",status="ok",le="+Inf"} 2',
+                      rendered)
+        self.assertIn('metrica_stage_peak_rss_megabytes_count{stage="request",status="ok"} 2', rendered)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = instrumentation.Histogram('duration', "Durations.", (1, 10))
+        for value in [0.5, 5, 50]:
+            histogram.observe({'stage': 'train'}, value)
+
+        lines = histogram.render()
+        self.assertIn('duration_bucket{stage="train",le="1"} 1', lines)
+        self.assertIn('duration_bucket{stage="train",le="10"} 2', lines)
+        self.assertIn('duration_bucket{stage="train",le="+Inf"} 3', lines)
+        self.assertIn('duration_sum{stage="train"} 55.5', lines)
+
+    def test_metrics_server(self):
+        with instrumentation.stage('smtp_send'):
+            pass
+        server = instrumentation.start_metrics_server(0, self.registry, host='127.0.0.1')
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+            with urllib.request.urlopen(f"{url}/metrics") as response:
+                body = response.read().decode()
+            self.assertIn('metrica_stage_wall_seconds_count{stage="smtp_send",status="ok"} 1', body)
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"{url}/other")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
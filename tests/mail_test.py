@@ -0,0 +1,150 @@
+import os
+import shutil
+import smtplib
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.data_management.database as database
+from app.mail import ATTACHMENT_FILES, MailSender, SMTPConnection, retry_delay
+
+
+class FakeSMTP:
+    """Local stand-in for smtplib.SMTP that records connections and sent messages."""
+
+    connections = []
+    fail_next = []
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.sent = []
+        self.logged_in = False
+        self.closed = False
+        FakeSMTP.connections.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        self.logged_in = True
+
+    def sendmail(self, from_address, to_address, message):
+        if FakeSMTP.fail_next:
+            raise FakeSMTP.fail_next.pop(0)
+        self.sent.append((from_address, to_address, message))
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+class TestMailSender(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.temp_dir, 'requests.db')}")
+        database.BaseRequests.metadata.create_all(self.engine)
+        self.session_patch = patch.object(database, 'SessionRequests', sessionmaker(bind=self.engine))
+        self.session_patch.start()
+        self.smtp_patch = patch('app.mail.smtplib.SMTP', FakeSMTP)
+        self.smtp_patch.start()
+        FakeSMTP.connections = []
+        FakeSMTP.fail_next = []
+
+        self.attachment_path = os.path.join(self.temp_dir, 'visuals')
+        os.makedirs(self.attachment_path)
+        for file_name in ATTACHMENT_FILES['regression']:
+            with open(os.path.join(self.attachment_path, file_name), 'wb') as file:
+                file.write(b'content')
+
+        self.sender = MailSender(SMTPConnection('metrica@example.com', 'secret'),
+                                 'metrica@example.com', 'sender-1', batch_size=2)
+
+    def tearDown(self):
+        self.smtp_patch.stop()
+        self.session_patch.stop()
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir)
+
+    def get_deliveries(self):
+        session = database.SessionRequests()
+        try:
+            return {delivery.user_id: delivery for delivery in session.query(database.Delivery).all()}
+        finally:
+            session.close()
+
+    def test_drains_batches_over_one_connection(self):
+        for index in range(5):
+            database.enqueue_delivery(f'request-{index}', f'user{index}@example.com', 'regression',
+                                      self.attachment_path)
+
+        self.assertEqual(self.sender.drain(), 5)
+
+        self.assertEqual(len(FakeSMTP.connections), 1)
+        self.assertTrue(FakeSMTP.connections[0].logged_in)
+        self.assertEqual([to for _, to, _ in FakeSMTP.connections[0].sent],
+                         [f'user{index}@example.com' for index in range(5)])
+        self.assertTrue(all(delivery.status == 'SENT' for delivery in self.get_deliveries().values()))
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        database.enqueue_delivery('request', 'user@example.com', 'regression', self.attachment_path)
+        FakeSMTP.fail_next = [smtplib.SMTPDataError(451, b'try again later')]
+
+        self.assertEqual(self.sender.drain(), 1)
+
+        delivery = self.get_deliveries()['request']
+        self.assertEqual(delivery.status, 'PENDING')
+        self.assertEqual(delivery.attempts, 1)
+        self.assertGreater(delivery.next_attempt_at, time.time() + retry_delay(1) - 5)
+        # Not due yet, so nothing else is sent
+        self.assertEqual(self.sender.drain(), 0)
+
+    def test_gives_up_after_max_attempts(self):
+        database.enqueue_delivery('request', 'user@example.com', 'regression', self.attachment_path)
+        self.sender.max_attempts = 2
+        FakeSMTP.fail_next = [smtplib.SMTPDataError(451, b'try again later')] * 2
+
+        self.sender.drain()
+        session = database.SessionRequests()
+        session.query(database.Delivery).update({'next_attempt_at': 0})
+        session.commit()
+        session.close()
+        self.sender.drain()
+
+        delivery = self.get_deliveries()['request']
+        self.assertEqual(delivery.status, 'FAILED')
+        self.assertEqual(delivery.attempts, 2)
+
+    def test_missing_attachments_fail_permanently(self):
+        database.enqueue_delivery('request', 'user@example.com', 'classification', self.attachment_path)
+
+        self.sender.drain()
+
+        delivery = self.get_deliveries()['request']
+        self.assertEqual(delivery.status, 'FAILED')
+        self.assertIn('not found', delivery.last_error)
+
+    def test_reconnects_when_server_drops_connection(self):
+        database.enqueue_delivery('request', 'user@example.com', 'regression', self.attachment_path)
+        FakeSMTP.fail_next = [smtplib.SMTPServerDisconnected('timed out')]
+
+        self.sender.drain()
+
+        self.assertEqual(len(FakeSMTP.connections), 2)
+        self.assertEqual(self.get_deliveries()['request'].status, 'SENT')
+
+    def test_delivery_is_claimed_once(self):
+        database.enqueue_delivery('request', 'user@example.com', 'regression', self.attachment_path)
+
+        self.assertEqual(len(database.claim_deliveries('sender-1', 10)), 1)
+        self.assertEqual(database.claim_deliveries('sender-2', 10), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
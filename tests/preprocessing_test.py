@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+import types
+import unittest
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from app.data_management.dataset_loader import load_lean_csv
+from app.model_evaluation.preprocessing import MAX_ONE_HOT_CATEGORIES, build_preprocessor
+from app.model_evaluation.process_request import RequestProcessor
+
+
+def make_features(num_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    amount = rng.normal(1000, 300, num_rows)
+    amount[::10] = np.nan
+    return pd.DataFrame({
+        'amount': amount,
+        'count': rng.integers(0, 5, num_rows),
+        'color': pd.Series(rng.choice(['red', 'green', 'blue'], num_rows), dtype=object),
+        'flag': rng.integers(0, 2, num_rows).astype(bool),
+    })
+
+
+class TestBuildPreprocessor(unittest.TestCase):
+    def test_imputes_scales_and_encodes(self):
+        X = make_features(200)
+
+        transformed = build_preprocessor().fit_transform(X)
+
+        # Two scaled numeric columns, three colors and two flag values
+        self.assertEqual(transformed.shape, (200, 7))
+        self.assertFalse(np.isnan(transformed).any())
+        np.testing.assert_allclose(transformed[:, :2].mean(axis=0), 0, atol=1e-9)
+        np.testing.assert_allclose(transformed[:, :2].std(axis=0), 1)
+
+    def test_boolean_columns_without_categorical_ones(self):
+        X = pd.DataFrame({'a': [1., 2, 3], 'd': [True, False, True],
+                          'n': pd.array([True, None, True], dtype='boolean')})
+
+        transformed = build_preprocessor().fit_transform(X)
+
+        # One scaled column, two values of d and the one value of n once imputed
+        np.testing.assert_array_equal(transformed[:, 1:], [[0, 1, 1], [1, 0, 1], [0, 1, 1]])
+
+    def test_lean_loaded_booleans_and_categoricals(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        path = os.path.join(temp_dir, 'train.csv')
+        pd.DataFrame({'flag': [True, False] * 50, 'color': ['red', 'green', 'blue', 'red'] * 25,
+                      'label': [0, 1] * 50}).to_csv(path, index=False)
+        X, _, _ = load_lean_csv(path)
+
+        transformed = build_preprocessor().fit_transform(X)
+
+        self.assertEqual(X['flag'].dtype, bool)
+        self.assertIsInstance(X['color'].dtype, pd.CategoricalDtype)
+        # Two flag values and three colors
+        self.assertEqual(transformed.shape, (100, 5))
+
+    def test_unseen_and_rare_categories(self):
+        X = pd.DataFrame({'city': [f'city{index % 50}' for index in range(500)]})
+        preprocessor = build_preprocessor().fit(X)
+
+        transformed = preprocessor.transform(pd.DataFrame({'city': ['city1', 'unseen']}))
+
+        self.assertEqual(transformed.shape[1], MAX_ONE_HOT_CATEGORIES)
+        self.assertEqual(transformed[0].sum(), 1)
+
+    def test_sparse_features_stay_sparse(self):
+        X = sparse.random(100, 40, density=0.05, format='csr', random_state=0) * 10
+        X.data[0] = np.nan
+
+        transformed = build_preprocessor(sparse_input=True).fit_transform(X)
+
+        self.assertTrue(sparse.issparse(transformed))
+        self.assertFalse(np.isnan(transformed.data).any())
+        self.assertLessEqual(abs(transformed).max(), 1)
+        self.assertLessEqual(transformed.nnz, X.nnz)
+
+
+class TestSharedPreprocessing(unittest.TestCase):
+    def setUp(self):
+        self.save_path = tempfile.mkdtemp()
+        request = types.SimpleNamespace(user_id='user', task_type='classification')
+        self.processor = RequestProcessor(request, None, self.save_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.save_path)
+
+    def test_baselines_are_saved_with_the_preprocessing(self):
+        X_train, X_test = make_features(300), make_features(100, seed=1)
+        y_train = pd.Series((X_train['count'] > 2).astype(int))
+        y_test = pd.Series((X_test['count'] > 2).astype(int))
+
+        X_train_processed, X_test_processed = self.processor.preprocess_features(X_train, X_test)
+        evaluation = self.processor._train_and_evaluate('LogisticRegression', {}, X_train_processed, y_train,
+                                                        X_test_processed, y_test)
+
+        self.assertGreater(evaluation['accuracy'], 0.9)
+        saved_model = joblib.load(os.path.join(self.save_path, 'ml_models', 'LogisticRegression.joblib'))
+        np.testing.assert_array_equal(saved_model.predict(X_test), evaluation['predictions'])
+
+    def test_sparse_features_reach_the_baselines_sparse(self):
+        X_train = sparse.random(300, 120, density=0.05, format='csr', random_state=0)
+        X_test = sparse.random(100, 120, density=0.05, format='csr', random_state=1)
+        y_train = pd.Series((X_train[:, :10].sum(axis=1).A1 > 0).astype(int))
+        y_test = pd.Series((X_test[:, :10].sum(axis=1).A1 > 0).astype(int))
+
+        X_train_processed, X_test_processed = self.processor.preprocess_features(X_train, X_test)
+        self.assertTrue(sparse.issparse(X_train_processed))
+        self.assertTrue(sparse.issparse(X_test_processed))
+        evaluation = self.processor._train_and_evaluate('LogisticRegression', {}, X_train_processed, y_train,
+                                                        X_test_processed, y_test)
+
+        self.assertEqual(len(evaluation['predictions']), 100)
+
+    def test_models_rejecting_sparse_input_get_dense_chunks(self):
+        class DenseOnlyModel:
+            def predict(self, X):
+                if sparse.issparse(X):
+                    raise TypeError('A sparse matrix was passed, but dense data is required')
+                return (X['token0'] > 0).astype(int).to_numpy()
+
+        X_test = sparse.random(50, 30, density=0.2, format='csr', random_state=0)
+        self.processor.feature_names = [f'token{index}' for index in range(30)]
+        self.processor.predict_batch_size = 20
+
+        predictions, y_scores = self.processor.predict_in_batches(DenseOnlyModel(), X_test)
+
+        np.testing.assert_array_equal(predictions, (X_test[:, 0].toarray().ravel() > 0).astype(int))
+        self.assertIsNone(y_scores)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+import os
+import shutil
+import tempfile
+import types
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_classification
+from sklearn.linear_model import LinearRegression, LogisticRegression
+
+from app.data_management.dataset_cache import DatasetCache
+from app.model_evaluation.process_request import RequestProcessor
+from app.model_evaluation.results import EvaluationResults
+
+
+class FakeS3Client:
+    def __init__(self):
+        self.hash_lookups = []
+
+    def get_content_hash(self, file_name):
+        self.hash_lookups.append(file_name)
+        return f"hash-{file_name}"
+
+    def download_files(self, files):
+        pass
+
+
+class TestDownloadInputs(unittest.TestCase):
+    def setUp(self):
+        self.save_path = tempfile.mkdtemp()
+        self.s3_client = FakeS3Client()
+        request = types.SimpleNamespace(user_id='user', task_type='classification')
+        self.processor = RequestProcessor(request, self.s3_client, self.save_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.save_path)
+
+    def test_dataset_key_is_computed_before_processing(self):
+        self.assertIsNone(self.processor.dataset_key)
+
+        self.processor.download_inputs()
+
+        self.assertEqual(self.processor.dataset_key, self.processor.get_dataset_key())
+        # The key is kept, so nothing is looked up in S3 after the evaluation
+        self.assertEqual(sorted(self.s3_client.hash_lookups), ['user_test', 'user_train'])
+
+
+class TestDatasetLoading(unittest.TestCase):
+    def setUp(self):
+        self.save_path = tempfile.mkdtemp()
+        self.cache = DatasetCache(tempfile.mkdtemp())
+        pd.DataFrame({'a': np.arange(100), 'b': ['x', 'y'] * 50, 'label': [0, 1] * 50}) \
+            .to_csv(os.path.join(self.save_path, 'train.csv'), index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.save_path)
+        shutil.rmtree(self.cache.cache_dir)
+
+    def load(self, lean_loading):
+        request = types.SimpleNamespace(user_id='user', task_type='classification')
+        processor = RequestProcessor(request, FakeS3Client(), self.save_path, dataset_cache=self.cache,
+                                     lean_loading=lean_loading)
+        processor.download_inputs()
+        X, _ = processor.load_dataset('train')
+        return processor, X
+
+    def test_loading_modes_are_cached_separately(self):
+        _, default_X = self.load(lean_loading=False)
+        lean_processor, lean_X = self.load(lean_loading=True)
+
+        self.assertEqual(default_X['a'].dtype, np.int64)
+        self.assertNotEqual(lean_X['a'].dtype, np.int64)
+        self.assertIn('train', lean_processor.dataset_memory)
+
+        # Served from the cache, with the memory report of the parse that stored it
+        os.remove(os.path.join(self.save_path, 'train.csv'))
+        cached_processor, cached_X = self.load(lean_loading=True)
+        pd.testing.assert_frame_equal(cached_X, lean_X)
+        self.assertEqual(cached_processor.dataset_memory, lean_processor.dataset_memory)
+
+
+class TestBaselineTraining(unittest.TestCase):
+    def setUp(self):
+        self.save_path = tempfile.mkdtemp()
+        request = types.SimpleNamespace(user_id='user', task_type='classification')
+        self.processor = RequestProcessor(request, None, self.save_path)
+        X, y = make_classification(300, 6, random_state=0)
+        X = pd.DataFrame(X, columns=[f'x{index}' for index in range(6)])
+        y = pd.Series(y)
+        X_train, X_test = self.processor.preprocess_features(X.iloc[:200], X.iloc[200:])
+        self.data = (X_train, y.iloc[:200], X_test, y.iloc[200:])
+        self.jobs = [
+            ('LogisticRegression', {}),
+            ('DecisionTree_Classification', {'random_state': 0}),
+            ('RandomForest_Classification', {'n_estimators': 10, 'random_state': 0}),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.save_path)
+
+    def train(self, jobs, max_workers=None):
+        results = EvaluationResults('classification', self.data[3], [model_name for model_name, _ in jobs])
+        if max_workers is None:
+            self.processor._train_baselines_serial(jobs, results, *self.data)
+        else:
+            self.processor._train_baselines_parallel(jobs, max_workers, results, *self.data)
+        results.compact()
+        return results
+
+    def test_parallel_matches_serial_in_job_order(self):
+        serial = self.train(self.jobs)
+        parallel = self.train(self.jobs, max_workers=3)
+
+        self.assertEqual(serial.model_names, [model_name for model_name, _ in self.jobs])
+        self.assertEqual(parallel.model_names, serial.model_names)
+        np.testing.assert_array_equal(parallel.predictions, serial.predictions)
+        np.testing.assert_array_equal(parallel.y_scores, serial.y_scores)
+        self.assertEqual(parallel.metrics, serial.metrics)
+
+    def test_failing_model_does_not_drop_other_baselines(self):
+        jobs = self.jobs[:1] + [('AdaBoost', {'n_estimators': -1})] + self.jobs[1:]
+        for max_workers in [None, 2]:
+            results = self.train(jobs, max_workers=max_workers)
+            self.assertEqual(results.model_names, [model_name for model_name, _ in self.jobs])
+
+    def test_worker_count_is_capped(self):
+        with patch('app.model_evaluation.process_request.os.cpu_count', return_value=4):
+            self.processor.n_jobs = -1
+            self.assertEqual(self.processor._get_max_workers(9), 4)
+            self.assertEqual(self.processor._get_max_workers(2), 2)
+            self.processor.n_jobs = 8
+            self.assertEqual(self.processor._get_max_workers(9), 4)
+            self.processor.n_jobs = 3
+            self.assertEqual(self.processor._get_max_workers(9), 3)
+            self.processor.n_jobs = 0
+            self.assertEqual(self.processor._get_max_workers(9), 1)
+
+
+class TestPredictInBatches(unittest.TestCase):
+    def setUp(self):
+        self.save_path = tempfile.mkdtemp()
+        request = types.SimpleNamespace(user_id='user', task_type='classification')
+        self.processor = RequestProcessor(request, None, self.save_path, predict_batch_size=7)
+        X, y = make_classification(50, 4, random_state=0)
+        self.X = pd.DataFrame(X, columns=['a', 'b', 'c', 'd'])
+        self.y = y
+
+    def tearDown(self):
+        shutil.rmtree(self.save_path)
+
+    def test_chunks_match_unchunked_predictions(self):
+        model = LogisticRegression().fit(self.X, self.y)
+
+        predictions, y_scores = self.processor.predict_in_batches(model, self.X)
+
+        np.testing.assert_array_equal(predictions, model.predict(self.X))
+        np.testing.assert_allclose(y_scores, model.predict_proba(self.X)[:, 1])
+
+    def test_labels_come_from_probabilities_in_one_pass(self):
+        model = LogisticRegression().fit(self.X, np.where(self.y == 1, 'yes', 'no'))
+        expected = model.predict(self.X)
+
+        with patch.object(model, 'predict', side_effect=AssertionError('predict was called')):
+            predictions, _ = self.processor.predict_in_batches(model, self.X)
+
+        np.testing.assert_array_equal(predictions, expected)
+
+    def test_later_chunks_widen_the_label_dtype(self):
+        class GrowingLabelModel:
+            def predict(self, X):
+                return np.array(['a' * (1 + int(X['a'].index[0] >= 7))] * len(X))
+
+        predictions, y_scores = self.processor.predict_in_batches(GrowingLabelModel(), self.X)
+
+        self.assertEqual(predictions[0], 'a')
+        self.assertEqual(predictions[-1], 'aa')
+        self.assertIsNone(y_scores)
+
+    def test_empty_test_set(self):
+        model = LogisticRegression().fit(self.X, self.y)
+
+        predictions, y_scores = self.processor.predict_in_batches(model, self.X.iloc[:0])
+
+        self.assertEqual(len(predictions), 0)
+        self.assertIsNone(y_scores)
+
+    def test_model_without_probabilities(self):
+        model = LinearRegression().fit(self.X, self.y)
+
+        predictions, y_scores = self.processor.predict_in_batches(model, self.X)
+
+        np.testing.assert_allclose(predictions, model.predict(self.X))
+        self.assertIsNone(y_scores)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.model_evaluation.report import LatexReportBackend, build_report, get_report_backends
+from app.model_evaluation.visualization import ModelVisualizer
+from tests.visualization_test import make_classification_results, make_regression_results
+
+
+class FailingBackend:
+    name = 'failing'
+
+    def build(self, task_type, images, results_table, output_path):
+        raise RuntimeError('broken')
+
+
+class TestReportBackends(unittest.TestCase):
+    def setUp(self):
+        self.save_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.save_path)
+
+    def create_report(self, results):
+        visualizer = ModelVisualizer(self.save_path)
+        visualizer.create_visualizations(results)
+        return visualizer.create_report(results, backends=['fpdf'])
+
+    def test_fpdf_builds_classification_and_regression_reports(self):
+        for results in [make_classification_results(), make_regression_results()]:
+            with self.subTest(task_type=next(iter(results.values()))['task_type']):
+                report_path = self.create_report(results)
+                with open(report_path, 'rb') as file:
+                    self.assertEqual(file.read(5), b'%PDF-')
+
+    def test_falls_back_to_next_backend(self):
+        results = make_regression_results()
+        visualizer = ModelVisualizer(self.save_path)
+        visualizer.create_visualizations(results)
+        backends = [FailingBackend()] + get_report_backends(['fpdf'])
+
+        report_path = build_report('regression', visualizer._get_report_images(),
+                                   visualizer._results_dataframe(results),
+                                   os.path.join(self.save_path, 'report.pdf'), backends)
+
+        self.assertTrue(os.path.exists(report_path))
+
+    def test_raises_when_every_backend_fails(self):
+        with self.assertRaises(RuntimeError):
+            build_report('regression', {}, None, os.path.join(self.save_path, 'report.pdf'), [FailingBackend()])
+
+    def test_rejects_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_report_backends(['word'])
+
+    @patch('app.model_evaluation.report.subprocess.run')
+    def test_latex_timeout_raises(self, mock_run):
+        mock_run.side_effect = subprocess.TimeoutExpired('pdflatex', 1)
+        backend = LatexReportBackend(timeout=1)
+
+        with self.assertRaises(RuntimeError):
+            backend.build('regression', ModelVisualizer(self.save_path)._get_report_images(), None,
+                          os.path.join(self.save_path, 'report.pdf'))
+
+        self.assertEqual(mock_run.call_args.kwargs['timeout'], 1)
+        self.assertEqual(mock_run.call_args.kwargs['stdin'], subprocess.DEVNULL)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import pickle
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from app.model_evaluation.results import EvaluationResults
+
+
+def _evaluation(y_test, predictions, y_scores=None, **metrics):
+    evaluation = {'y_test': y_test, 'predictions': predictions, 'y_scores': y_scores,
+                  'task_type': 'classification'}
+    evaluation.update(metrics)
+    return evaluation
+
+
+class TestEvaluationResults(unittest.TestCase):
+    def setUp(self):
+        self.y_test = pd.Series([0, 1, 1, 0])
+        self.results = EvaluationResults('classification', self.y_test, ['user_model', 'LogisticRegression', 'AdaBoost'])
+        self.results.add('user_model', _evaluation(self.y_test, np.array([0, 1, 0, 0]), np.array([0.1, 0.9, 0.4, 0.2]),
+                                                   accuracy=0.75))
+        self.results.add('AdaBoost', _evaluation(self.y_test, np.array([0, 1, 1, 0]), accuracy=1.0))
+
+    def test_arrays_are_shared(self):
+        self.assertTrue(np.shares_memory(self.results.y_true, self.y_test.to_numpy()))
+        self.assertEqual(self.results.predictions.shape, (3, 4))
+        self.assertTrue(np.shares_memory(self.results['AdaBoost']['predictions'], self.results.predictions))
+        self.assertIs(self.results['AdaBoost']['y_test'], self.results['user_model']['y_test'])
+
+    def test_behaves_like_dict_of_evaluations(self):
+        self.assertEqual(list(self.results), ['user_model', 'AdaBoost'])
+        self.assertEqual(len(self.results), 2)
+        user_model = self.results['user_model']
+        self.assertEqual(user_model['accuracy'], 0.75)
+        self.assertEqual(user_model['task_type'], 'classification')
+        np.testing.assert_array_equal(user_model['y_scores'], [0.1, 0.9, 0.4, 0.2])
+        self.assertIsNone(self.results['AdaBoost']['y_scores'])
+        self.assertNotIn('curves', self.results['AdaBoost'])
+        self.assertEqual(dict(self.results['AdaBoost'])['accuracy'], 1.0)
+        with self.assertRaises(KeyError):
+            self.results['LogisticRegression']
+
+    def test_compact_drops_models_never_added(self):
+        self.results.compact()
+
+        self.assertEqual(self.results.model_names, ['user_model', 'AdaBoost'])
+        self.assertEqual(self.results.predictions.shape, (2, 4))
+        np.testing.assert_array_equal(self.results.predictions_of('AdaBoost'), [0, 1, 1, 0])
+        np.testing.assert_array_equal(self.results.has_scores, [True, False])
+
+    def test_predictions_of_different_dtypes(self):
+        results = EvaluationResults('classification', ['a', 'bb'], ['user_model', 'DecisionTree_Classification'])
+        results.add('user_model', _evaluation(None, np.array(['a', 'a'])))
+        results.add('DecisionTree_Classification', _evaluation(None, np.array(['bb', 'bb'])))
+
+        np.testing.assert_array_equal(results.predictions_of('DecisionTree_Classification'), ['bb', 'bb'])
+        np.testing.assert_array_equal(results.predictions_of('user_model'), ['a', 'a'])
+
+    def test_rejects_predictions_of_wrong_length(self):
+        with self.assertRaises(ValueError):
+            self.results.add('LogisticRegression', _evaluation(self.y_test, np.array([0, 1])))
+
+    def test_from_dict_and_pickle(self):
+        results = EvaluationResults.from_dict({
+            'user_model': _evaluation(self.y_test, np.array([0, 1, 0, 0]), accuracy=0.75),
+        })
+        self.assertIs(EvaluationResults.from_dict(results), results)
+
+        restored = pickle.loads(pickle.dumps(results))
+        self.assertEqual(restored.metrics, {'user_model': {'accuracy': 0.75}})
+        np.testing.assert_array_equal(restored.predictions_of('user_model'), [0, 1, 0, 0])
+
+    def test_from_empty_dict(self):
+        with self.assertRaises(ValueError):
+            EvaluationResults.from_dict({})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,246 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import botocore.session
+from botocore.exceptions import ClientError
+
+from config import S3Client
+
+S3_SERVICE_MODEL = botocore.session.get_session().get_service_model('s3')
+
+
+class FakeS3:
+    """In-memory stand-in for the subset of the boto3 S3 client used by S3Client."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.meta = type('Meta', (), {'service_model': S3_SERVICE_MODEL})()
+        self.uploads = {}
+        self.initiated = {}
+        self.complete_errors = []
+        self.calls = []
+        self.configs = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def download_file(self, Bucket, Key, Filename, Config=None):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.configs.append(Config)
+        try:
+            time.sleep(0.05)
+            if Key not in self.objects:
+                raise FileNotFoundError(Key)
+            with open(Filename, 'wb') as file:
+                file.write(self.objects[Key])
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def _check_absent(self, Key, IfNoneMatch=None):
+        if IfNoneMatch == '*' and Key in self.objects:
+            raise ClientError({'Error': {'Code': 'PreconditionFailed'}}, 'PutObject')
+
+    def head_object(self, Bucket, Key):
+        self.calls.append('head_object')
+        if Key not in self.objects:
+            raise ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+
+    def put_object(self, Bucket, Key, Body, IfNoneMatch=None):
+        self.calls.append('put_object')
+        self._check_absent(Key, IfNoneMatch)
+        self.objects[Key] = Body
+
+    def create_multipart_upload(self, Bucket, Key):
+        self.calls.append('create_multipart_upload')
+        upload_id = f"upload-{len(self.initiated)}"
+        self.uploads[upload_id] = {}
+        self.initiated[upload_id] = (Key, datetime.now(timezone.utc))
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = Body
+        return {'ETag': f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, IfNoneMatch=None):
+        self.calls.append('complete_multipart_upload')
+        if self.complete_errors:
+            raise self.complete_errors.pop(0)
+        if UploadId not in self.uploads:
+            raise ClientError({'Error': {'Code': 'NoSuchUpload'}}, 'CompleteMultipartUpload')
+        self._check_absent(Key, IfNoneMatch)
+        parts = self.uploads.pop(UploadId)
+        self.objects[Key] = b''.join(parts[part['PartNumber']] for part in MultipartUpload['Parts'])
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn):
+        return f"https://bucket.s3/{Params['Key']}?uploadId={Params['UploadId']}&partNumber={Params['PartNumber']}"
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.calls.append('abort_multipart_upload')
+        self.uploads.pop(UploadId)
+
+    def get_paginator(self, operation_name):
+        uploads = [{'Key': key, 'UploadId': upload_id, 'Initiated': initiated}
+                   for upload_id, (key, initiated) in self.initiated.items() if upload_id in self.uploads]
+        return type('Paginator', (), {'paginate': lambda paginator, Bucket: iter([{'Uploads': uploads}])})()
+
+
+class TestS3ClientTransfers(unittest.TestCase):
+    def setUp(self):
+        self.local_dir = tempfile.mkdtemp()
+        self.objects = {'a_model': b'model', 'a_train': b'train', 'a_test': b'test'}
+        self.fake_s3 = FakeS3(self.objects)
+        self.client = S3Client(self.fake_s3, 'bucket', multipart_chunksize=8 * 1024 * 1024,
+                               max_concurrency=4, max_parallel_files=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.local_dir)
+
+    def test_download_files_fetches_concurrently(self):
+        files = {key: os.path.join(self.local_dir, key) for key in self.objects}
+        self.client.download_files(files)
+
+        for key, local_path in files.items():
+            with open(local_path, 'rb') as file:
+                self.assertEqual(file.read(), self.objects[key])
+        self.assertEqual(self.fake_s3.max_active, 3)
+
+    def test_transfer_config_is_tuned(self):
+        self.client.download_file('a_model', os.path.join(self.local_dir, 'model'))
+
+        config = self.fake_s3.configs[0]
+        self.assertEqual(config.multipart_chunksize, 8 * 1024 * 1024)
+        self.assertEqual(config.max_concurrency, 4)
+
+    def test_download_files_raises_after_all_finish(self):
+        files = {key: os.path.join(self.local_dir, key) for key in ['a_model', 'missing']}
+        with self.assertRaises(FileNotFoundError):
+            self.client.download_files(files)
+        self.assertTrue(os.path.exists(files['a_model']))
+
+    def test_small_file_is_put_without_existence_check(self):
+        self.client.upload_file(io.BytesIO(b'data'), 'b_model')
+
+        self.assertEqual(self.objects['b_model'], b'data')
+        self.assertEqual(self.fake_s3.calls, ['put_object'])
+
+    def test_large_file_is_streamed_in_parts(self):
+        client = S3Client(self.fake_s3, 'bucket', multipart_chunksize=4, max_concurrency=2)
+        client.upload_file(io.BytesIO(b'0123456789'), 'b_train')
+
+        self.assertEqual(self.objects['b_train'], b'0123456789')
+        self.assertIn('complete_multipart_upload', self.fake_s3.calls)
+        self.assertNotIn('head_object', self.fake_s3.calls)
+
+    def test_parts_in_flight_are_bounded(self):
+        class CountingFile(io.BytesIO):
+            def __init__(self, data, fake_s3):
+                super().__init__(data)
+                self.fake_s3 = fake_s3
+
+            def read(self, size=-1):
+                chunk = super().read(size)
+                if chunk:
+                    with self.fake_s3.lock:
+                        self.fake_s3.active += 1
+                        self.fake_s3.max_active = max(self.fake_s3.max_active, self.fake_s3.active)
+                return chunk
+
+        upload_part = self.fake_s3.upload_part
+
+        def slow_upload_part(**kwargs):
+            time.sleep(0.01)
+            response = upload_part(**kwargs)
+            with self.fake_s3.lock:
+                self.fake_s3.active -= 1
+            return response
+
+        self.fake_s3.upload_part = slow_upload_part
+        client = S3Client(self.fake_s3, 'bucket', multipart_chunksize=4, max_concurrency=10,
+                          max_parts_in_flight=2)
+        data = bytes(range(100))
+        client.upload_file(CountingFile(data, self.fake_s3), 'b_train')
+
+        self.assertEqual(self.objects['b_train'], data)
+        # Parts read from the file but not yet uploaded
+        self.assertEqual(self.fake_s3.max_active, 2)
+
+    def test_existing_file_is_not_overwritten(self):
+        self.client.upload_file(io.BytesIO(b'new'), 'a_model')
+        self.assertEqual(self.objects['a_model'], b'model')
+
+    def test_upload_files(self):
+        self.client.upload_files({f"c_{name}": io.BytesIO(name.encode()) for name in ['model', 'train', 'test']})
+        for name in ['model', 'train', 'test']:
+            self.assertEqual(self.objects[f"c_{name}"], name.encode())
+
+    def test_presigned_upload_round_trip(self):
+        client = S3Client(self.fake_s3, 'bucket', multipart_chunksize=4)
+        upload = client.create_presigned_upload('d_train', 10)
+        self.assertEqual(len(upload['part_urls']), 3)
+
+        # The browser sends each part straight to the presigned URLs
+        parts = []
+        for part_number, start in enumerate(range(0, 10, upload['part_size']), start=1):
+            response = self.fake_s3.upload_part('bucket', 'd_train', upload['upload_id'],
+                                                part_number, b'0123456789'[start:start + 4])
+            parts.append({'PartNumber': part_number, 'ETag': response['ETag']})
+
+        self.assertTrue(client.complete_presigned_upload('d_train', upload['upload_id'], parts[::-1]))
+        self.assertEqual(self.objects['d_train'], b'0123456789')
+
+
+class TestPresignedUploadCompletion(unittest.TestCase):
+    def setUp(self):
+        self.objects = {}
+        self.fake_s3 = FakeS3(self.objects)
+        self.client = S3Client(self.fake_s3, 'bucket', multipart_chunksize=4)
+        self.upload = self.client.create_presigned_upload('e_train', 4)
+        response = self.fake_s3.upload_part('bucket', 'e_train', self.upload['upload_id'], 1, b'data')
+        self.parts = [{'PartNumber': 1, 'ETag': response['ETag']}]
+
+    def complete(self):
+        return self.client.complete_presigned_upload('e_train', self.upload['upload_id'], self.parts)
+
+    def test_retry_after_lost_response_succeeds(self):
+        self.assertTrue(self.complete())
+        self.assertTrue(self.complete())
+        self.assertEqual(self.objects['e_train'], b'data')
+
+    def test_transient_error_keeps_parts_for_a_retry(self):
+        self.fake_s3.complete_errors.append(ClientError(
+            {'Error': {'Code': 'InternalError'}, 'ResponseMetadata': {'HTTPStatusCode': 500}},
+            'CompleteMultipartUpload'))
+
+        with self.assertRaises(ClientError):
+            self.complete()
+        self.assertNotIn('abort_multipart_upload', self.fake_s3.calls)
+        self.assertTrue(self.complete())
+
+    def test_permanent_error_aborts_upload(self):
+        self.fake_s3.complete_errors.append(ClientError({'Error': {'Code': 'InvalidPart'}},
+                                                        'CompleteMultipartUpload'))
+
+        self.assertFalse(self.complete())
+        self.assertIn('abort_multipart_upload', self.fake_s3.calls)
+        self.assertEqual(self.fake_s3.uploads, {})
+
+    def test_stale_uploads_are_aborted(self):
+        fresh = self.client.create_presigned_upload('f_train', 4)
+        key, _ = self.fake_s3.initiated[self.upload['upload_id']]
+        self.fake_s3.initiated[self.upload['upload_id']] = (key, datetime.now(timezone.utc) - timedelta(days=2))
+
+        self.assertEqual(self.client.abort_stale_uploads(max_age=24 * 3600), 1)
+        self.assertEqual(list(self.fake_s3.uploads), [fresh['upload_id']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import signal
+import socket
+import threading
+import time
+import types
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from scripts import script
+from scripts.script import LeaseHeartbeat
+
+
+class TestLeaseHeartbeat(unittest.TestCase):
+    @patch('scripts.script.database.renew_lease')
+    def test_renews_until_stopped(self, mock_renew_lease):
+        renewed = threading.Event()
+        mock_renew_lease.side_effect = lambda user_id, worker_id: renewed.set() or True
+
+        with LeaseHeartbeat('user', 'worker-1', interval=0.01):
+            self.assertTrue(renewed.wait(5))
+
+        calls = mock_renew_lease.call_count
+        self.assertGreaterEqual(calls, 1)
+        mock_renew_lease.assert_called_with('user', 'worker-1')
+        # No renewals once the request has been processed
+        threading.Event().wait(0.05)
+        self.assertEqual(mock_renew_lease.call_count, calls)
+
+    @patch('scripts.script.database.renew_lease', return_value=False)
+    def test_stops_when_lease_is_lost(self, mock_renew_lease):
+        heartbeat = LeaseHeartbeat('user', 'worker-1', interval=0.01)
+        with heartbeat:
+            heartbeat._thread.join(5)
+            self.assertFalse(heartbeat._thread.is_alive())
+
+        self.assertEqual(mock_renew_lease.call_count, 1)
+
+
+class TestProcessRequest(unittest.TestCase):
+    @patch('scripts.script.utils.ensure_directory_exists')
+    @patch('scripts.script.RequestProcessor', side_effect=RuntimeError('training failed'))
+    @patch('scripts.script.database.update_claimed_request_status', side_effect=RuntimeError('database is locked'))
+    def test_failure_to_mark_failed_is_logged(self, mock_update, mock_processor, mock_ensure_directory):
+        request = types.SimpleNamespace(user_id='user', task_type='classification', email='a@example.com')
+        context = dict.fromkeys(['s3_client', 'n_jobs', 'dataset_cache', 'baseline_cache', 'lean_loading',
+                                 'sparse_density_threshold'])
+
+        record = script.process_request(request, 'worker-1', context)
+
+        self.assertEqual(record['status'], 'FAILED')
+        mock_update.assert_called_once_with('user', 'worker-1', 'FAILED')
+
+
+class TestRunDaemon(unittest.TestCase):
+    def setUp(self):
+        self.requests = [types.SimpleNamespace(user_id=user_id) for user_id in ['first', 'second']]
+        self.processed = []
+        self.original_handlers = {signum: signal.getsignal(signum) for signum in [signal.SIGINT, signal.SIGTERM]}
+
+    def tearDown(self):
+        for signum, handler in self.original_handlers.items():
+            signal.signal(signum, handler)
+
+    def claim_request(self, worker_id):
+        if self.requests:
+            return self.requests.pop(0)
+        # Nothing left to claim: stop like a supervisor would
+        os.kill(os.getpid(), signal.SIGTERM)
+        return None
+
+    def process_in_worker(self, request, worker_id):
+        time.sleep(0.1)
+        self.processed.append(request.user_id)
+        return {'request_id': request.user_id}
+
+    def test_claims_dispatches_and_renews_leases(self):
+        with patch('scripts.script.ProcessPoolExecutor', ThreadPoolExecutor), \
+                patch('scripts.script._init_worker'), \
+                patch('scripts.script._process_in_worker', side_effect=self.process_in_worker), \
+                patch('scripts.script.abort_stale_uploads'), \
+                patch('scripts.script.database.LEASE_DURATION_SECONDS', 0.03), \
+                patch('scripts.script.database.claim_request', side_effect=self.claim_request), \
+                patch('scripts.script.database.renew_lease', return_value=True) as mock_renew_lease, \
+                patch('scripts.script.instrumentation.export_request') as mock_export_request:
+            script.run_daemon(concurrency=2, poll_interval=0.01)
+
+        self.assertEqual(sorted(self.processed), ['first', 'second'])
+        self.assertEqual(sorted(call.args[0]['request_id'] for call in mock_export_request.call_args_list),
+                         ['first', 'second'])
+        # Both requests ran longer than a third of the lease, so both leases were renewed
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        renewed = {call.args for call in mock_renew_lease.call_args_list}
+        self.assertLessEqual({('first', worker_id), ('second', worker_id)}, renewed)
+
+
+if __name__ == '__main__':
+    unittest.main()
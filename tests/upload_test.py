@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy.exc import IntegrityError
+
+from app import create_app
+from tests.s3_client_test import FakeS3
+
+FILES = {
+    'model': {'filename': 'model.joblib', 'size': 5},
+    'train_set': {'filename': 'train.csv', 'size': 5},
+    'test_set': {'filename': 'test.csv', 'size': 4},
+}
+
+
+class TestPresignedSubmission(unittest.TestCase):
+    def setUp(self):
+        self.objects = {}
+        self.fake_s3 = FakeS3(self.objects)
+        patches = [
+            patch.dict('os.environ', {'SECRET_KEY': 'test-secret'}),
+            patch('app.utils.get_s3_client', return_value=self.fake_s3),
+            patch('app.utils.database.add_request', side_effect=self.add_request),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.added = False
+        self.client = create_app().test_client()
+
+    def add_request(self, user_id, email, submission_time, task_type):
+        # The requests table's primary key rejects a second insert of the same submission
+        if self.added:
+            raise IntegrityError('INSERT INTO requests', {}, Exception('UNIQUE constraint failed'))
+        self.added = True
+        self.request = (user_id, email, task_type)
+
+    def initiate_and_upload(self):
+        submission = self.client.post('/uploads/initiate', json={
+            'email': 'User@example.com', 'task_type': 'classification', 'files': FILES}).get_json()
+        uploads = {}
+        for field, upload in submission['uploads'].items():
+            key = f"{submission['user_id']}_{field.split('_')[0]}"
+            response = self.fake_s3.upload_part('bucket', key, upload['upload_id'], 1, b'data')
+            uploads[field] = {'parts': [{'PartNumber': 1, 'ETag': response['ETag']}]}
+        return submission, uploads
+
+    def test_signed_token_completes_submission_once(self):
+        submission, uploads = self.initiate_and_upload()
+        body = {'upload_token': submission['upload_token'], 'uploads': uploads}
+
+        self.assertEqual(self.client.post('/uploads/complete', json=body).status_code, 200)
+        # A retry whose first response was lost, or a concurrent completion
+        response = self.client.post('/uploads/complete', json=body)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['message'], "Model submitted successfully")
+        self.assertEqual(self.request, (submission['user_id'], 'user@example.com', 'classification'))
+
+    def test_forged_token_is_rejected(self):
+        submission, uploads = self.initiate_and_upload()
+        body = {'upload_token': submission['upload_token'][:-2] + 'xx', 'uploads': uploads}
+
+        self.assertEqual(self.client.post('/uploads/complete', json=body).status_code, 400)
+        self.assertFalse(self.added)
+
+
+
+class TestHistory(unittest.TestCase):
+    def setUp(self):
+        self.client = create_app().test_client()
+
+    @patch('app.utils.database.get_user_history', return_value=[{'user_id': 'first', 'models': {}}])
+    def test_history_is_served_by_email(self, get_user_history):
+        response = self.client.get('/history?email=a@example.com&limit=500')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['entries'], [{'user_id': 'first', 'models': {}}])
+        get_user_history.assert_called_once_with('a@example.com', limit=100)
+
+    def test_history_requires_an_email(self):
+        self.assertEqual(self.client.get('/history').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
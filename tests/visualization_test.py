@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from app.model_evaluation.visualization import ModelVisualizer, downsample_points
+
+
+def make_classification_results(num_samples=200):
+    rng = np.random.default_rng(0)
+    y_test = rng.integers(0, 2, num_samples)
+    results = {}
+    for model_name in ['user_model', 'LogisticRegression', 'AdaBoost']:
+        y_scores = np.clip(y_test * 0.6 + rng.random(num_samples) * 0.5, 0, 1)
+        results[model_name] = {'y_test': y_test, 'predictions': (y_scores > 0.5).astype(int),
+                               'y_scores': y_scores, 'task_type': 'classification',
+                               'accuracy': 0.9}
+    return results
+
+
+def make_regression_results(num_samples=200):
+    rng = np.random.default_rng(0)
+    y_test = rng.normal(size=num_samples)
+    results = {}
+    for model_name in ['user_model', 'LinearRegression']:
+        results[model_name] = {'y_test': y_test, 'predictions': y_test + rng.normal(scale=0.1, size=num_samples),
+                               'y_scores': None, 'task_type': 'regression', 'mse': 0.01}
+    return results
+
+
+class TestModelVisualizer(unittest.TestCase):
+    def setUp(self):
+        self.save_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.save_path)
+
+    def assert_figures_created(self, results, expected_files, max_workers):
+        ModelVisualizer(self.save_path, max_workers=max_workers).create_visualizations(results)
+        for file_name in expected_files:
+            path = os.path.join(self.save_path, file_name)
+            self.assertTrue(os.path.getsize(path) > 0, file_name)
+
+    def test_classification_figures(self):
+        expected_files = ['roc_curve.png', 'precision_recall_curve.png', 'results_table.png',
+                          'all_confusion_matrices.png']
+        for max_workers in [1, 4]:
+            with self.subTest(max_workers=max_workers):
+                self.assert_figures_created(make_classification_results(), expected_files, max_workers)
+
+    def test_regression_figures(self):
+        expected_files = ['residuals_all_models.png', 'prediction_vs_actual_all_models.png',
+                          'results_table.png']
+        for max_workers in [1, 4]:
+            with self.subTest(max_workers=max_workers):
+                self.assert_figures_created(make_regression_results(), expected_files, max_workers)
+
+    def test_single_model_grid(self):
+        results = make_regression_results()
+        del results['LinearRegression']
+        self.assert_figures_created(results, ['residuals_all_models.png'], max_workers=1)
+
+    def test_large_regression_plots_stay_within_budget(self):
+        results = make_regression_results(num_samples=200_000)
+        expected_files = ['residuals_all_models.png', 'prediction_vs_actual_all_models.png']
+        for scatter_mode in ['sample', 'hexbin']:
+            with self.subTest(scatter_mode=scatter_mode):
+                visualizer = ModelVisualizer(self.save_path, point_budget=1000, scatter_mode=scatter_mode)
+                visualizer.create_visualizations(results)
+                for file_name in expected_files:
+                    self.assertTrue(os.path.getsize(os.path.join(self.save_path, file_name)) > 0)
+
+    def test_rejects_unknown_scatter_mode(self):
+        with self.assertRaises(ValueError):
+            ModelVisualizer(self.save_path, scatter_mode='contour')
+
+
+class TestDownsamplePoints(unittest.TestCase):
+    def test_keeps_all_points_within_budget(self):
+        x = np.arange(10.0)
+        np.testing.assert_array_equal(downsample_points(x, x, 10), np.arange(10))
+
+    def test_respects_budget_and_keeps_outliers(self):
+        rng = np.random.default_rng(1)
+        x = rng.normal(size=100_000)
+        y = rng.normal(size=100_000)
+        x[:5] = [50, -50, 0, 0, 40]
+        y[:5] = [0, 0, 50, -50, 40]
+
+        indices = downsample_points(x, y, 2000)
+
+        self.assertLessEqual(len(indices), 2000)
+        self.assertGreater(len(indices), 1500)
+        self.assertEqual(len(np.unique(indices)), len(indices))
+        self.assertTrue(set(range(5)).issubset(indices))
+
+    def test_constant_values(self):
+        x = np.zeros(5000)
+        self.assertEqual(len(downsample_points(x, x, 100)), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()